@@ -0,0 +1,7 @@
+"""
+Offline benchmarks for the BCRA pipeline.
+
+Run from the repository root, e.g. ``python -m benchmarks.cold_start``.
+Every benchmark prints a JSON document so results can be compared between
+commits.
+"""
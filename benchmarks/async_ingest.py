@@ -0,0 +1,97 @@
+"""
+Benchmark: wall-clock time of the sync vs async ingest for N endpoints.
+
+Every endpoint is a dataset served by a local ``FakeBCRA`` with
+``--latency-ms`` per request; the store is a ``MemoryStore`` that sleeps
+``--store-latency-ms`` per write to stand in for a blob round trip.  Each run
+starts from an empty store, so every endpoint writes its snapshot, delta and
+state.
+
+Usage::
+
+    python -m benchmarks.async_ingest --endpoints 8 --variables 2000 --latency-ms 100
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from src.functions.shared_code import ingest
+from src.functions.shared_code.storage import AsyncStoreAdapter, MemoryStore
+
+from .fake_bcra import FakeBCRA
+
+
+class SlowStore(MemoryStore):
+    """``MemoryStore`` with a fixed delay per write."""
+
+    def __init__(self, latency_ms):
+        super().__init__()
+        self.latency_ms = latency_ms
+
+    def write_bytes(self, path, data, content_type="application/json", content_encoding=None, metadata=None):
+        time.sleep(self.latency_ms / 1000)
+        super().write_bytes(path, data, content_type, content_encoding, metadata)
+
+
+def run_sync(endpoints, store_latency_ms):
+    store = SlowStore(store_latency_ms)
+    started = time.perf_counter()
+    ingest.ingest_endpoints(store, endpoints)
+    return time.perf_counter() - started, store
+
+
+def run_async(endpoints, store_latency_ms, fetch_concurrency, upload_concurrency):
+    import aiohttp
+
+    store = SlowStore(store_latency_ms)
+
+    async def go():
+        async with aiohttp.ClientSession() as session:
+            started = time.perf_counter()
+            await ingest.ingest_endpoints_async(
+                AsyncStoreAdapter(store), endpoints, session=session,
+                fetch_concurrency=fetch_concurrency, upload_concurrency=upload_concurrency,
+            )
+            return time.perf_counter() - started
+
+    return asyncio.run(go()), store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync vs async ingest wall-clock time")
+    parser.add_argument("--endpoints", type=int, default=8)
+    parser.add_argument("--variables", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=100, help="fake API latency per request")
+    parser.add_argument("--store-latency-ms", type=float, default=20, help="delay per blob write")
+    parser.add_argument("--fetch-concurrency", type=int, default=4)
+    parser.add_argument("--upload-concurrency", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with FakeBCRA(n_variables=args.variables, latency_ms=args.latency_ms) as server:
+        endpoints = {f"bench_{i}": server.base_url for i in range(args.endpoints)}
+        sync_runs, async_runs = [], []
+        for _ in range(args.runs):
+            elapsed, sync_store = run_sync(endpoints, args.store_latency_ms)
+            sync_runs.append(elapsed)
+            elapsed, async_store = run_async(endpoints, args.store_latency_ms,
+                                             args.fetch_concurrency, args.upload_concurrency)
+            async_runs.append(elapsed)
+    assert len(sync_store.blobs) == len(async_store.blobs)
+
+    sync_s, async_s = statistics.median(sync_runs), statistics.median(async_runs)
+    print(json.dumps({
+        "benchmark": "async_ingest",
+        "params": vars(args),
+        "blobs_written": len(async_store.blobs),
+        "sync_seconds": round(sync_s, 3),
+        "async_seconds": round(async_s, 3),
+        "speedup": round(sync_s / async_s, 2),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""
+Micro-benchmark: events/second for blob_alert's single and batch paths.
+
+The single path invokes ``function_app.blob_alert`` once per event (as the
+Event Grid trigger does); the batch path posts the same events to
+``blob_alert_batch`` in arrays of ``--batch-size``.  Logging goes to a null
+stream at INFO so formatting costs are included, as on the Functions host.
+
+Usage::
+
+    python -m benchmarks.blob_alert_throughput --events 20000 --batch-size 500
+"""
+import argparse
+import io
+import json
+import logging
+import time
+from unittest.mock import Mock, patch
+
+import azure.functions as func
+
+import function_app
+from src.functions.shared_code import dedup, events
+from src.functions.shared_code.storage import MemoryStore
+
+
+def make_events(n):
+    raw = []
+    for i in range(n):
+        day = 1 + i % 28
+        prefix = "raw/monetarias" if i % 10 else "raw/other"
+        blob_name = f"{prefix}/year=2025/month=07/day={day:02d}/vars_{i}.json"
+        raw.append({
+            "id": str(i),
+            "eventType": "Microsoft.Storage.BlobCreated",
+            "subject": f"/blobServices/default/containers/datalake/blobs/{blob_name}",
+            "eventTime": "2025-07-29T15:30:00Z",
+            "url": f"https://cotizacionesbrfd.blob.core.windows.net/datalake/{blob_name}",
+            "data": {"url": f"https://cotizacionesbrfd.blob.core.windows.net/datalake/{blob_name}"},
+        })
+    return raw
+
+
+def bench_single(raw_events):
+    mocks = []
+    for raw in raw_events:
+        event = Mock(spec=func.EventGridEvent)
+        event.get_json.return_value = raw
+        mocks.append(event)
+    started = time.perf_counter()
+    for event in mocks:
+        function_app.blob_alert(event)
+    return time.perf_counter() - started
+
+
+def bench_batch(raw_events, batch_size):
+    requests = [
+        func.HttpRequest(method="POST", url="/api/blob_alert/batch", headers={},
+                         body=json.dumps(raw_events[i:i + batch_size]).encode())
+        for i in range(0, len(raw_events), batch_size)
+    ]
+    started = time.perf_counter()
+    for req in requests:
+        function_app.blob_alert_batch(req)
+    return time.perf_counter() - started
+
+
+def make_store(raw_events):
+    """Store with a small blob behind every event, for the manifest updates."""
+    store = MemoryStore()
+    body = json.dumps([{"idVariable": 1, "fecha": "2025-07-29", "valor": 1.0}])
+    for raw in raw_events:
+        store.write_bytes(raw["subject"].replace(events.SUBJECT_PREFIX, ""), body)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="blob_alert single vs batch throughput")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    root = logging.getLogger()
+    root.handlers = [logging.StreamHandler(io.StringIO())]
+    root.setLevel(logging.INFO)
+
+    raw_events = make_events(args.events)
+    with patch.object(function_app, "get_store", return_value=make_store(raw_events)):
+        # cada camino con su propio store de dedup: si no, el batch vería todo como duplicado
+        with patch.object(dedup, "_deduplicator", dedup.Deduplicator()):
+            single = bench_single(raw_events)
+    with patch.object(function_app, "get_store", return_value=make_store(raw_events)):
+        with patch.object(dedup, "_deduplicator", dedup.Deduplicator()):
+            batch = bench_batch(raw_events, args.batch_size)
+    print(json.dumps({
+        "benchmark": "blob_alert_throughput",
+        "events": args.events,
+        "batch_size": args.batch_size,
+        "single_events_per_second": round(args.events / single),
+        "batch_events_per_second": round(args.events / batch),
+        "speedup": round(single / batch, 2),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
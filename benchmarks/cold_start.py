@@ -0,0 +1,130 @@
+"""
+Cold start benchmark for the function entry points.
+
+Each run spawns a fresh interpreter (a cold worker) and measures:
+
+* ``import_ms``: importing the entry module,
+* ``first_invocation_ms``: the first call (client construction, TLS/keep-alive
+  setup, first upload),
+* ``warm_invocation_ms``: a second call in the same process.
+
+``ingest_bcra`` runs against a local fake BCRA API and writes to a temporary
+local store; ``blob_alert`` is fed ``func.EventGridEvent`` BlobCreated events
+for the snapshot that ingest wrote.
+
+Usage::
+
+    python -m benchmarks.cold_start --runs 5 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from .fake_bcra import FakeBCRA
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+from unittest.mock import patch
+
+t0 = time.perf_counter()
+import src.functions.ingest_bcra as ingest
+t1 = time.perf_counter()
+from src.functions.shared_code.storage import LocalStore
+store = LocalStore(sys.argv[1])
+with patch.object(ingest, "get_store", return_value=store):
+    ingest.main(None)
+    t2 = time.perf_counter()
+    ingest.main(None)
+    t3 = time.perf_counter()
+
+t4 = time.perf_counter()
+import datetime
+import azure.functions as func
+import function_app
+t5 = time.perf_counter()
+# el evento apunta al snapshot que acaba de escribir ingest: el manifest lo lee
+blob = sorted(p for p in store.list("raw/monetarias/") if "/vars_" in p)[-1]
+
+def blob_created(event_id):
+    return func.EventGridEvent(
+        id=event_id, data={"url": f"https://example/datalake/{blob}"}, topic="/storage",
+        subject=f"/blobServices/default/containers/datalake/blobs/{blob}",
+        event_type="Microsoft.Storage.BlobCreated", event_time=datetime.datetime.utcnow(), data_version="1.0",
+    )
+
+with patch.object(function_app, "get_store", return_value=store):
+    function_app.blob_alert(blob_created("cold-1"))
+    t6 = time.perf_counter()
+    function_app.blob_alert(blob_created("cold-2"))
+    t7 = time.perf_counter()
+# si el evento no llega a los handlers el benchmark mediría un no-op
+from src.functions.shared_code import manifest
+entries = store.read_bytes(manifest.manifest_path(manifest.day_of(blob)))
+assert entries and blob.rsplit("/", 1)[-1] in str(entries), "blob_alert did not record the snapshot in the manifest"
+
+ms = lambda a, b: round((b - a) * 1000, 3)
+print(json.dumps({
+    "ingest_bcra": {"import_ms": ms(t0, t1), "first_invocation_ms": ms(t1, t2), "warm_invocation_ms": ms(t2, t3)},
+    "blob_alert": {"import_ms": ms(t4, t5), "first_invocation_ms": ms(t5, t6), "warm_invocation_ms": ms(t6, t7)},
+}))
+"""
+
+
+def run_once(base_url):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, BCRA_API_URL=base_url, PYTHONPATH=ROOT,
+                   NOTIFY_BUFFER_FILE=os.path.join(tmp, "notifications.jsonl"))
+        env.pop("AZURE_STORAGE_CONN", None)
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, tmp], cwd=ROOT, env=env,
+            capture_output=True, text=True, check=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    summary = {}
+    for function in runs[0]:
+        summary[function] = {
+            metric: {
+                "median": round(statistics.median(r[function][metric] for r in runs), 3),
+                "max": max(r[function][metric] for r in runs),
+            }
+            for metric in runs[0][function]
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start of the function entry points")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--variables", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float,
+                        help="fail if median import + first invocation exceeds this budget")
+    args = parser.parse_args(argv)
+
+    with FakeBCRA(n_variables=args.variables) as server:
+        runs = [run_once(server.base_url) for _ in range(args.runs)]
+
+    summary = summarize(runs)
+    result = {"benchmark": "cold_start", "runs": args.runs, "results": summary}
+    over_budget = []
+    if args.budget_ms:
+        for function, metrics in summary.items():
+            cold = metrics["import_ms"]["median"] + metrics["first_invocation_ms"]["median"]
+            if cold > args.budget_ms:
+                over_budget.append(function)
+        result["budget_ms"] = args.budget_ms
+        result["over_budget"] = over_budget
+    print(json.dumps(result, indent=2))
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
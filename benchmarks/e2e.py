@@ -0,0 +1,189 @@
+"""
+Offline end-to-end benchmark: ingest_bcra → blob_alert → Parquet compaction.
+
+Everything runs in-process against a local ``FakeBCRA`` server and a
+``MemoryStore`` (or a temporary ``LocalStore`` with ``--store local``), so no
+network, Azure account or ``az`` CLI is needed:
+
+1. ``ingest``: ``--snapshots`` calls of ``ingest_bcra.main``; the fake API
+   moves every value between calls, so each one writes a full snapshot.
+2. ``blob_alert``: one BlobCreated event per written blob, repeated until
+   ``--events`` events, through ``function_app.blob_alert`` with the
+   partition manifests and the notification digest in the same store.
+3. ``compact``: ``compactor.compact_day`` over every ingested partition.
+
+Each stage reports throughput, latency percentiles per call and the process
+peak RSS after the stage; ``stage_metrics`` holds the p50/p99 of the
+pipeline's own stage timers.  Results are JSON (``--output`` writes them to a
+file) tagged with the git commit, to compare runs between commits::
+
+    python -m benchmarks.e2e --variables 2000 --snapshots 200 --events 5000 --output e2e.json
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import Mock, patch
+
+from src.functions.shared_code import compactor, dedup, events, metrics, notifications
+from src.functions.shared_code.storage import LocalStore, MemoryStore
+
+from .fake_bcra import FakeBCRA
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_bytes():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def stage_result(latencies_ms, elapsed, items, unit):
+    return {
+        unit: items,
+        "calls": len(latencies_ms),
+        "elapsed_seconds": round(elapsed, 3),
+        f"{unit}_per_second": round(items / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(metrics.percentile(latencies_ms, 50), 3),
+            "p90": round(metrics.percentile(latencies_ms, 90), 3),
+            "p99": round(metrics.percentile(latencies_ms, 99), 3),
+            "max": round(max(latencies_ms), 3),
+        } if latencies_ms else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def _timed_calls(calls):
+    latencies = []
+    started = time.perf_counter()
+    for call in calls:
+        t0 = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies, time.perf_counter() - started
+
+
+def run_ingest(store, server, snapshots):
+    import src.functions.ingest_bcra as ingest
+
+    def call():
+        server.advance()
+        ingest.main(None)
+
+    with patch.object(ingest, "get_store", return_value=store), \
+         patch.object(ingest, "BCRA_URL", server.base_url):
+        latencies, elapsed = _timed_calls([call] * snapshots)
+    return stage_result(latencies, elapsed, snapshots * server.n_variables, "records")
+
+
+def blob_events(store, n_events):
+    names = [p for p in store.list(compactor.RAW_PREFIX + "/") if "/vars_" in p]
+    mocks = []
+    for i in range(n_events):
+        name = names[i % len(names)]
+        event = Mock()
+        event.get_json.return_value = {
+            "id": str(i),
+            "eventType": events.BLOB_CREATED,
+            "subject": f"{events.SUBJECT_PREFIX}{name}",
+            "eventTime": "2025-07-29T15:30:00Z",
+            "url": f"https://cotizacionesbrfd.blob.core.windows.net/datalake/{name}",
+        }
+        mocks.append(event)
+    return mocks
+
+
+def run_blob_alert(store, n_events):
+    import function_app
+
+    notifier = notifications.NotificationDigest(
+        notifications.StoreBuffer(store), [notifications.LogSink()], max_items=100,
+    )
+    mocks = blob_events(store, n_events)
+    with patch.object(notifications, "_notifier", notifier), \
+         patch.object(dedup, "_deduplicator", dedup.Deduplicator()), \
+         patch.object(function_app, "get_store", return_value=store):
+        latencies, elapsed = _timed_calls([lambda e=e: function_app.blob_alert(e) for e in mocks])
+    return stage_result(latencies, elapsed, n_events, "events")
+
+
+def run_compact(store, input_records):
+    days = sorted({
+        datetime.date(*(int(v) for v in events.parse_partition(p).values()))
+        for p in store.list(compactor.RAW_PREFIX + "/")
+    })
+    rows = []
+    latencies, elapsed = _timed_calls([
+        lambda day=day: rows.append(compactor.compact_day(store, day)) for day in days
+    ])
+    # el throughput se mide sobre los registros crudos leídos, no sobre las filas deduplicadas
+    result = stage_result(latencies, elapsed, input_records, "records")
+    result.update(partitions=len(days), rows_written=sum(rows),
+                  input_blobs=sum(len(compactor.day_inputs(store, day)) for day in days))
+    return result
+
+
+def run(args, store):
+    exporter = metrics.set_exporter(metrics.InMemoryExporter())
+    with FakeBCRA(n_variables=args.variables, latency_ms=args.latency_ms,
+                  description_bytes=args.description_bytes) as server:
+        stages = {"ingest": run_ingest(store, server, args.snapshots)}
+    stages["blob_alert"] = run_blob_alert(store, args.events)
+    stages["compact"] = run_compact(store, stages["ingest"]["records"])
+    return stages, exporter.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ingest → blob_alert → Parquet benchmark")
+    parser.add_argument("--variables", type=int, default=2000)
+    parser.add_argument("--snapshots", type=int, default=100)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0, help="fake API latency per request")
+    parser.add_argument("--description-bytes", type=int, default=0, help="padding per record")
+    parser.add_argument("--store", choices=["memory", "local"], default="memory")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args(argv)
+
+    root = logging.getLogger()
+    root.handlers = [logging.StreamHandler(io.StringIO())]
+    root.setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalStore(tmp) if args.store == "local" else MemoryStore()
+        stages, stage_metrics = run(args, store)
+
+    result = {
+        "benchmark": "e2e",
+        "commit": git_commit(),
+        "params": vars(args),
+        "stages": stages,
+        "stage_metrics": stage_metrics,
+    }
+    text = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+"""
+Fake BCRA statistics API for tests and benchmarks.
+
+Serves the latest-values list, the per-variable series endpoint and the
+exchange-rate quotes (``cotizaciones_url``) with deterministic synthetic data::
+
+    with FakeBCRA(n_variables=500) as server:
+        requests.get(server.base_url)
+
+``latency_ms`` delays every response and ``description_bytes`` pads each
+record to grow the payload.  List responses carry an ``ETag`` (the
+version) and answer ``If-None-Match`` with ``304`` unless ``etags=False``.  ``advance()`` moves every value so that the next
+list response is a new snapshot for the CDC check in ``ingest_bcra``.
+"""
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeBCRA:
+    """Local HTTP server that mimics ``/estadisticas/v3.0/monetarias``."""
+
+    PREFIX = "/estadisticas/v3.0/monetarias"
+    COTIZACIONES_PATH = "/estadisticascambiarias/v1.0/Cotizaciones"
+    CURRENCIES = ("USD", "EUR", "BRL")
+
+    def __init__(self, n_variables=3, fail_first=0, latency_ms=0, description_bytes=0, etags=True):
+        self.n_variables = n_variables
+        self.etags = etags
+        self.fail_first = fail_first
+        self.latency_ms = latency_ms
+        self.description_bytes = description_bytes
+        self.version = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}{self.PREFIX}"
+
+    @property
+    def cotizaciones_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}{self.COTIZACIONES_PATH}"
+
+    def advance(self):
+        with self.lock:
+            self.version += 1
+
+    def variables(self):
+        padding = "x" * self.description_bytes
+        return [
+            {"idVariable": i, "cdSerie": str(7000 + i), "descripcion": f"Variable {i}{padding}",
+             "fecha": "2025-07-29", "valor": float(i) + self.version}
+            for i in range(1, self.n_variables + 1)
+        ]
+
+    def cotizaciones(self):
+        return {"fecha": "2025-07-29", "detalle": [
+            {"codigoMoneda": code, "descripcion": f"Moneda {code}", "tipoPase": 1.0,
+             "tipoCotizacion": 100.0 * (n + 1) + self.version}
+            for n, code in enumerate(self.CURRENCIES)
+        ]}
+
+    def series(self, id_variable, desde, hasta):
+        days = (hasta - desde).days + 1
+        return [
+            {"idVariable": id_variable,
+             "fecha": (desde + datetime.timedelta(days=n)).isoformat(),
+             "valor": id_variable * 1000 + n}
+            for n in range(days)
+        ]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with fake.lock:
+                    fake.requests.append(self.path)
+                    failing = len(fake.requests) <= fake.fail_first
+                if fake.latency_ms:
+                    time.sleep(fake.latency_ms / 1000)
+                if failing:
+                    return self._send(503, {"status": 503})
+
+                rest = url.path[len(FakeBCRA.PREFIX):].strip("/")
+                if url.path == FakeBCRA.COTIZACIONES_PATH or not rest:
+                    etag = f'"v{fake.version}"' if fake.etags else None
+                    if etag and self.headers.get("If-None-Match") == etag:
+                        return self._send(304, None, etag)
+                    if url.path == FakeBCRA.COTIZACIONES_PATH:
+                        return self._send(200, {"status": 200, "results": fake.cotizaciones()}, etag)
+                    return self._send(200, {"status": 200, "results": fake.variables()}, etag)
+
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                rows = fake.series(
+                    int(rest),
+                    datetime.date.fromisoformat(query["desde"]),
+                    datetime.date.fromisoformat(query["hasta"]),
+                )
+                offset, limit = int(query.get("offset", 0)), int(query.get("limit", 1000))
+                self._send(200, {
+                    "status": 200,
+                    "metadata": {"resultset": {"count": len(rows), "offset": offset, "limit": limit}},
+                    "results": rows[offset:offset + limit],
+                })
+
+            def _send(self, status, body, etag=None):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
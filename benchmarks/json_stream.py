@@ -0,0 +1,97 @@
+"""
+Benchmark: peak memory and time of full vs streaming JSON parsing.
+
+Writes a synthetic history blob (``{"status", "metadata", "results": [...]}``)
+for each size in ``--records`` to a ``LocalStore`` and reads it back three
+ways, measuring peak memory with ``tracemalloc``:
+
+* ``full``: ``read_bytes`` + ``json.loads`` + ``cdc.extract_records`` (the old
+  reader; the list of dicts is kept, as the compactor did)
+* ``stream``: ``jsonstream.iter_records`` over ``iter_chunks``, counting
+* ``arrow``: ``compactor.iter_record_batches``, one record batch at a time
+
+The ``stream`` and ``arrow`` peaks should stay flat as the blob grows, bounded
+by the chunk and batch sizes; ``full`` grows with the file.
+
+Usage::
+
+    python -m benchmarks.json_stream --records 10000 100000 500000 --batch-records 10000
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+
+from src.functions.shared_code import cdc, compactor, jsonstream
+from src.functions.shared_code.storage import LocalStore
+
+
+def make_history(n):
+    return {
+        "status": 200,
+        "metadata": {"resultset": {"count": n, "offset": 0, "limit": n}},
+        "results": [
+            {"idVariable": 1 + i % 50, "cdSerie": str(7000 + i % 50), "descripcion": f"Variable monetaria {i % 50}",
+             "fecha": f"20{10 + i // 36500 % 15:02d}-{1 + i // 3000 % 12:02d}-{1 + i % 28:02d}",
+             "valor": 1000.0 + i * 0.25}
+            for i in range(n)
+        ],
+    }
+
+
+def _measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, round(elapsed_ms, 2), peak
+
+
+def bench_size(store, n, chunk_size, batch_records):
+    path = f"raw/bench/vars_hist_{n}.json"
+    store.write_bytes(path, json.dumps(make_history(n)))
+
+    def full():
+        return len(cdc.extract_records(json.loads(store.read_bytes(path))))
+
+    def stream():
+        return sum(1 for _ in jsonstream.iter_records(store.iter_chunks(path, chunk_size)))
+
+    def arrow():
+        return sum(b.num_rows for b in compactor.iter_record_batches(store, path, batch_records))
+
+    result = {"records": n, "bytes": len(store.read_bytes(path))}
+    for name, fn in (("full", full), ("stream", stream), ("arrow", arrow)):
+        count, elapsed_ms, peak = _measure(fn)
+        assert count == n, (name, count)
+        result[name] = {"ms": elapsed_ms, "peak_bytes": peak}
+    store.delete(path)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full vs streaming JSON parsing memory")
+    parser.add_argument("--records", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--chunk-size", type=int, default=1024 * 1024)
+    parser.add_argument("--batch-records", type=int, default=compactor.BATCH_RECORDS)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalStore(tmp)
+        # primera llamada a pyarrow.compute: inicializa kernels fuera de la medición
+        bench_size(store, 10, args.chunk_size, args.batch_records)
+        sizes = [bench_size(store, n, args.chunk_size, args.batch_records) for n in args.records]
+    print(json.dumps({
+        "benchmark": "json_stream",
+        "chunk_size": args.chunk_size,
+        "batch_records": args.batch_records,
+        "sizes": sizes,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
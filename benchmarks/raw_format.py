@@ -0,0 +1,84 @@
+"""
+Benchmark: stored bytes, encode/write time and peak memory per raw format.
+
+Builds a synthetic monetarias response with ``--variables`` records, writes it
+with each ``rawformat`` format to a ``LocalStore`` and streams it back.  Peak
+memory is measured with ``tracemalloc`` around the encode and the read.
+
+Usage::
+
+    python -m benchmarks.raw_format --variables 20000 --repeat 5
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+
+from src.functions.shared_code import rawformat
+from src.functions.shared_code.storage import LocalStore
+
+
+def make_payload(n):
+    return {
+        "status": 200,
+        "results": [
+            {"idVariable": i, "cdSerie": str(7000 + i), "descripcion": f"Variable monetaria {i}",
+             "fecha": "2025-07-29", "valor": 1000.0 + i * 0.25}
+            for i in range(n)
+        ],
+    }
+
+
+def _measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed_ms, peak
+
+
+def bench_format(store, payload, fmt, repeat):
+    write_ms, read_ms = [], []
+    for i in range(repeat):
+        path, elapsed, write_peak = _measure(
+            lambda: rawformat.write_snapshot(store, f"raw/bench/vars_{fmt}_{i}", payload, fmt))
+        write_ms.append(elapsed)
+        count, elapsed, read_peak = _measure(
+            lambda: sum(1 for _ in rawformat.read_records(store, path, chunk_size=256 * 1024)))
+        read_ms.append(elapsed)
+    return {
+        "bytes": len(store.read_bytes(path)),
+        "write_ms": round(min(write_ms), 2),
+        "read_ms": round(min(read_ms), 2),
+        "write_peak_bytes": write_peak,
+        "read_peak_bytes": read_peak,
+        "records": count,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Raw snapshot format comparison")
+    parser.add_argument("--variables", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    payload = make_payload(args.variables)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalStore(tmp)
+        formats = {fmt: bench_format(store, payload, fmt, args.repeat) for fmt in rawformat.FORMATS}
+    baseline = formats["json"]["bytes"]
+    for result in formats.values():
+        result["ratio"] = round(result["bytes"] / baseline, 3)
+    print(json.dumps({
+        "benchmark": "raw_format",
+        "variables": args.variables,
+        "formats": formats,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,103 +3,129 @@ import datetime
 import json
 import logging
 
+from src.functions.shared_code import metrics
+
 app = func.FunctionApp()
 
+
+def get_store():
+    from src.functions.shared_code.storage import open_store
+
+    return open_store()
+
+
 @app.event_grid_trigger(arg_name="event")
+@metrics.timer("blob_alert.handle_ms")
 def blob_alert(event: func.EventGridEvent):
     """
     Event Grid trigger function for blob creation events.
     Triggered when new blobs are created in the datalake container
-    with prefix raw/monetarias/
+    under raw/<dataset>/ for every dataset of the endpoint registry.
+    Filtering, dedup and the handlers (manifest, notification digest)
+    live in the shared dispatch core.
+    """
+    from src.functions.shared_code import dispatch, events
+
+    dispatch.handle_event(events.envelope(event), get_store)
+
+
+@app.route(route="blob_alert/batch", methods=["POST", "OPTIONS"], auth_level=func.AuthLevel.FUNCTION)
+def blob_alert_batch(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Webhook endpoint for batched Event Grid deliveries.
+    Accepts an array of Event Grid or CloudEvents 1.0 events, dispatches the
+    whole batch at once and emits a single aggregated telemetry record.
+    """
+    from src.functions.shared_code import dispatch
+
+    # CloudEvents abuse protection handshake
+    if req.method == 'OPTIONS':
+        origin = req.headers.get('WebHook-Request-Origin', '*')
+        return func.HttpResponse(status_code=200, headers={'WebHook-Allowed-Origin': origin})
+
+    body = req.get_json()
+    raw_events = body if isinstance(body, list) else [body]
+
+    # Event Grid subscription validation handshake
+    for raw in raw_events:
+        if raw.get('eventType') == 'Microsoft.EventGrid.SubscriptionValidationEvent':
+            code = raw.get('data', {}).get('validationCode')
+            return func.HttpResponse(json.dumps({'validationResponse': code}), mimetype='application/json')
+
+    try:
+        telemetry = dispatch.handle_batch(raw_events, get_store)
+    except dispatch.HandlerFailed as e:
+        # un 5xx hace que Event Grid reintente el batch
+        logging.error(f"Batch delivery failed, asking Event Grid to retry: {e}")
+        return func.HttpResponse(json.dumps({'error': str(e)}), status_code=503, mimetype='application/json')
+    return func.HttpResponse(json.dumps(telemetry), mimetype='application/json')
+
+
+@app.route(route="latest", methods=["GET"], auth_level=func.AuthLevel.FUNCTION)
+def latest_values(req: func.HttpRequest) -> func.HttpResponse:
     """
-    
-    logging.info('Python EventGrid trigger processed an event')
-    
-    # Parse the Event Grid event
-    event_data = event.get_json()
-    
-    # Extract blob information
-    blob_url = event_data.get('url', '')
-    blob_name = event_data.get('subject', '').replace('/blobServices/default/containers/datalake/blobs/', '')
-    event_type = event_data.get('eventType', '')
-    event_time = event_data.get('eventTime', '')
-    
-    logging.info(f"Event Type: {event_type}")
-    logging.info(f"Blob Name: {blob_name}")
-    logging.info(f"Blob URL: {blob_url}")
-    logging.info(f"Event Time: {event_time}")
-    
-    # Only process BlobCreated events for monetarias data
-    if event_type == 'Microsoft.Storage.BlobCreated' and 'raw/monetarias/' in blob_name:
-        
-        # Extract metadata from blob path
-        # Expected format: raw/monetarias/year=YYYY/month=MM/day=DD/vars_timestamp.json
-        path_parts = blob_name.split('/')
-        
-        metadata = {
-            'blob_name': blob_name,
-            'blob_url': blob_url,
-            'event_time': event_time,
-            'processed_time': datetime.datetime.utcnow().isoformat(),
-            'data_source': 'bcra_monetarias',
-            'event_type': event_type
-        }
-        
-        # Extract date information if available
-        try:
-            for part in path_parts:
-                if part.startswith('year='):
-                    metadata['year'] = part.split('=')[1]
-                elif part.startswith('month='):
-                    metadata['month'] = part.split('=')[1]
-                elif part.startswith('day='):
-                    metadata['day'] = part.split('=')[1]
-        except Exception as e:
-            logging.warning(f"Could not parse date from path: {e}")
-        
-        # Log the metadata for monitoring
-        logging.info(f"Processed blob metadata: {json.dumps(metadata, indent=2)}")
-        
-        # Send detailed notification with metadata
-        notification_message = f"""
-🔔 BCRA Pipeline Alert - Nuevo archivo procesado
-
-📁 Archivo: {blob_name}
-🕐 Hora del evento: {event_time}
-🕐 Hora de procesamiento: {metadata['processed_time']}
-📊 Fuente: {metadata['data_source']}
-🔗 URL: {blob_url}
-
-📅 Fecha: {metadata.get('year', 'N/A')}-{metadata.get('month', 'N/A')}-{metadata.get('day', 'N/A')}
-
-✅ Estado: Procesado exitosamente
-🏛️ Pipeline: Azure BCRA Monetarias
-        """
-        
-        # Log the detailed notification
-        logging.info(f"BCRA_NOTIFICATION: {notification_message}")
-        
-        # Create custom telemetry event for Application Insights
-        custom_properties = {
-            'blob_name': blob_name,
-            'event_type': event_type,
-            'data_source': metadata['data_source'],
-            'year': metadata.get('year', ''),
-            'month': metadata.get('month', ''),
-            'day': metadata.get('day', ''),
-            'notification_sent': 'true'
-        }
-        
-        # Log custom event for monitoring dashboard
-        logging.info(f"CUSTOM_EVENT_BCRA_BLOB_PROCESSED: {json.dumps(custom_properties)}")
-        
-        # For future enhancement: Send to external notification systems
-        # - Teams webhook
-        # - Slack notification  
-        # - Email via SendGrid
-        # - SMS via Twilio
-        
-        logging.info(f"Successfully processed blob creation event for: {blob_name}")
-        
-    else:
-        logging.info(f"Ignoring event - Type: {event_type}, Blob: {blob_name}")
\ No newline at end of file
+    HTTP endpoint with the latest value of every monetarias variable.
+    Served from an in-process cache refreshed every LATEST_CACHE_TTL_SECONDS.
+    Optional filters: ?id=1,4&serie=7935. Supports If-None-Match (304).
+    """
+    from src.functions.shared_code import latest
+
+    snapshot = latest.get_cache().get()
+    if snapshot is None:
+        return func.HttpResponse(json.dumps({'status': 404, 'error': 'no snapshot yet'}),
+                                 status_code=404, mimetype='application/json')
+
+    ids = set(filter(None, req.params.get('id', '').split(',')))
+    series = set(filter(None, req.params.get('serie', '').split(',')))
+    body, etag = snapshot.render(ids, series)
+
+    headers = {'ETag': etag, 'Cache-Control': 'public, max-age=60'}
+    if req.headers.get('If-None-Match') == etag:
+        return func.HttpResponse(status_code=304, headers=headers)
+    return func.HttpResponse(body, mimetype='application/json', headers=headers)
+
+
+@app.timer_trigger(schedule="0 */5 * * * *", arg_name="timer")
+def notification_digest(timer: func.TimerRequest):
+    """
+    Timer trigger that flushes the notification digest once its window
+    has elapsed, so quiet periods still get their summary.
+    """
+    from src.functions.shared_code import notifications
+
+    digest = notifications.get_notifier().maybe_flush()
+    if digest:
+        logging.info(f"Flushed notification digest with {digest['total']} blobs")
+
+
+@app.timer_trigger(schedule="0 15 * * * *", arg_name="timer")
+def compact_monetarias(timer: func.TimerRequest):
+    """
+    Timer trigger that compacts the raw JSON snapshots into Parquet.
+    Runs 10 minutes after ingest and rewrites today's
+    processed/monetarias/year=/month=/day= partition (and yesterday's
+    right after midnight, to pick up the last snapshots of the day),
+    then updates the derived indicators incrementally and compacts the
+    per-variable series files (when SERIES_DIR is set).
+    """
+    from src.functions.shared_code import compactor, indicators, registry, timeseries
+    from src.functions.shared_code.storage import open_store
+
+    now = datetime.datetime.utcnow()
+    today = now.date()
+    desde = today - datetime.timedelta(days=1) if now.hour == 0 else today
+
+    store = open_store()
+    result = compactor.compact_range(desde, today, processes=1, store=store)
+    rows = {day.isoformat(): count for day, count in result.items()}
+    logging.info(f"Compacted partitions: {json.dumps(rows)}")
+
+    for day, count in result.items():
+        if count:
+            written = indicators.update_day(store, day)
+            logging.info(f"Indicators updated for {len(written)} days after {day.isoformat()}")
+
+    series = timeseries.get_series_store()
+    if series is not None:
+        for dataset in sorted(registry.datasets()):
+            series.compact_all(dataset)
@@ -132,6 +132,9 @@ resource "azurerm_data_factory_trigger_schedule" "daily_transform_trigger" {
   data_factory_id = azurerm_data_factory.bcra_adf.id
   pipeline_name   = azurerm_data_factory_pipeline.bcra_transform_pipeline.name
 
+  # Reemplazado por la función compact_monetarias (JSON → Parquet en Python)
+  activated = false
+
   frequency = "Hour"
   interval  = 1
   start_time = "2025-07-29T16:00:00Z"
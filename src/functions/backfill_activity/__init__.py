@@ -0,0 +1,35 @@
+import datetime
+
+from ..shared_code import backfill
+from ..shared_code.storage import open_store
+
+
+def main(payload: dict):
+    """Activity for backfill_orchestrator: ``plan`` the chunks or fetch one ``chunk``.
+
+    ``rate`` is this activity's share of the requests per second (the
+    orchestrator splits its ``rate`` among the activities of a wave).
+    """
+    base_url = payload.get("base_url", backfill.BASE_URL)
+    session = backfill.make_session(1)
+    bucket = backfill.TokenBucket(float(payload.get("rate", backfill.DEFAULT_RATE)))
+
+    if payload["action"] == "plan":
+        variables = backfill.list_variables(session, base_url, bucket)
+        if payload.get("variables"):
+            wanted = {int(v) for v in payload["variables"]}
+            variables = [v for v in variables if int(v["idVariable"]) in wanted]
+        desde = datetime.date.fromisoformat(payload["desde"])
+        hasta = datetime.date.fromisoformat(payload.get("hasta") or datetime.date.today().isoformat())
+        return [
+            {"variable": variable, "desde": start.isoformat(), "hasta": end.isoformat()}
+            for _, variable, start, end in backfill.plan_chunks(
+                variables, desde, hasta, int(payload.get("chunk_days", 365)))
+        ]
+
+    return backfill.run_chunk(
+        session, open_store(), base_url, payload["variable"],
+        datetime.date.fromisoformat(payload["desde"]),
+        datetime.date.fromisoformat(payload["hasta"]),
+        bucket,
+    )
@@ -0,0 +1,34 @@
+import azure.durable_functions as df
+
+from ..shared_code import backfill
+
+RETRY = df.RetryOptions(first_retry_interval_in_milliseconds=5000, max_number_of_attempts=4)
+
+
+def orchestrator_function(context: df.DurableOrchestrationContext):
+    """
+    Fan out the backfill chunks in waves of ``workers`` activities.
+
+    The orchestration history is the checkpoint: if the host restarts, the
+    replay skips every wave that already completed.  ``rate`` (requests per
+    second against BCRA) is split among the activities of a wave, so a wave
+    never exceeds it in total.
+    """
+    params = context.get_input()
+    workers = int(params.get("workers", 8))
+    rate = float(params.get("rate", backfill.DEFAULT_RATE))
+
+    tasks = yield context.call_activity("backfill_activity", dict(params, action="plan"))
+    summary = {"chunks": len(tasks), "records": 0}
+    for i in range(0, len(tasks), workers):
+        wave = [
+            context.call_activity_with_retry("backfill_activity", RETRY,
+                                             dict(task, action="chunk", rate=rate / workers))
+            for task in tasks[i:i + workers]
+        ]
+        results = yield context.task_all(wave)
+        summary["records"] += sum(results)
+    return summary
+
+
+main = df.Orchestrator.create(orchestrator_function)
@@ -0,0 +1,25 @@
+import logging
+import azure.functions as func
+import azure.durable_functions as df
+
+
+async def main(req: func.HttpRequest, starter: str) -> func.HttpResponse:
+    """
+    Start a historical backfill.
+
+    Body: {"desde": "2020-01-01", "hasta": "2025-07-29", "variables": [1, 2],
+           "chunk_days": 365, "workers": 8, "rate": 10}
+    """
+    try:
+        params = req.get_json()
+    except ValueError:
+        return func.HttpResponse('Body must be JSON, e.g. {"desde": "2020-01-01"}', status_code=400)
+    if not isinstance(params, dict):
+        return func.HttpResponse("Body must be a JSON object", status_code=400)
+    if "desde" not in params:
+        return func.HttpResponse("'desde' is required", status_code=400)
+
+    client = df.DurableOrchestrationClient(starter)
+    instance_id = await client.start_new("backfill_orchestrator", None, params)
+    logging.info("Started backfill orchestration %s: %s", instance_id, params)
+    return client.create_check_status_response(req, instance_id)
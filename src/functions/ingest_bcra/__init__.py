@@ -1,32 +1,71 @@
-import os, json, datetime, logging, requests, urllib3
+import os, logging
 import azure.functions as func
-from azure.storage.blob import BlobServiceClient
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from ..shared_code import clients, ingest, scheduler
+from ..shared_code.storage import AsyncBlobStore, BlobStore
+
+BCRA_URL = os.environ.get("BCRA_API_URL", "https://api.bcra.gob.ar/estadisticas/v3.0/monetarias")
+RAW_FORMAT = os.environ.get("RAW_FORMAT", "json")   # json | ndjson.gz | ndjson.zst
+
+
+def get_store():
+    return BlobStore(clients.get_container())
+
+
+def get_async_store():
+    return AsyncBlobStore(clients.get_async_container())
+
+
+def endpoints():
+    return {"monetarias": BCRA_URL}
 
-STORAGE_CONN = os.environ["AZURE_STORAGE_CONN"]
 
 def main(mytimer: func.TimerRequest) -> None:
-    now = datetime.datetime.utcnow()
-    y, m, d = now.year, f"{now.month:02d}", f"{now.day:02d}"
-    ts_iso = now.isoformat()
-
-    # ── llamada a la API ───────────────────────────────────────────
-    url  = "https://api.bcra.gob.ar/estadisticas/v3.0/monetarias"
-    resp = requests.get(url, timeout=10, verify=False)   # ← desactiva SSL
-    resp.raise_for_status()
-    data = resp.json()
-
-    # ── destino en ADLS Gen2 ──────────────────────────────────────
-    blob_path = (
-        f"raw/monetarias/year={y}/month={m}/day={d}/"
-        f"vars_{ts_iso}.json"
-    )
-    blob_service = BlobServiceClient.from_connection_string(STORAGE_CONN)
-    blob_service.get_container_client("datalake").upload_blob(
-        name=blob_path,
-        data=json.dumps(data),
-        overwrite=True,
+    """Synchronous single-shot ingest of ``BCRA_API_URL`` (``"entryPoint": "main"``).
+
+    Not the deployed entry point (``main_scheduled`` is): it ingests one
+    endpoint on every call, without the scheduler, so its timer should be
+    hourly (``"0 5 * * * *"``).  ``benchmarks.e2e`` and ``benchmarks.cold_start``
+    call it directly.
+    """
+    # ── llamada a la API (sesión keep-alive compartida) + CDC + upload a ADLS Gen2 ──
+    ingest.ingest_endpoints(get_store(), endpoints(), raw_format=RAW_FORMAT)
+
+
+async def main_async(mytimer: func.TimerRequest) -> None:
+    """Async variant of ``main`` (``"entryPoint": "main_async"`` in function.json).
+
+    Fetches share one aiohttp session and uploads go through the aio blob
+    client, concurrently and bounded by ``INGEST_FETCH_CONCURRENCY`` /
+    ``INGEST_UPLOAD_CONCURRENCY``.
+    """
+    results = await ingest.ingest_endpoints_async(
+        get_async_store(),
+        endpoints(),
+        raw_format=RAW_FORMAT,
+        fetch_concurrency=int(os.environ.get("INGEST_FETCH_CONCURRENCY", 4)),
+        upload_concurrency=int(os.environ.get("INGEST_UPLOAD_CONCURRENCY", 8)),
     )
-    logging.info("Saved %d records → %s", len(data), blob_path)
+    logging.info("Async ingest finished: %s", results)
 
+
+async def main_scheduled(mytimer: func.TimerRequest) -> None:
+    """Scheduler for every endpoint of the registry (``"entryPoint": "main_scheduled"``).
+
+    Runs every 5 minutes and ingests the endpoints due since their last run
+    (``INGEST_ENDPOINTS``), with ``INGEST_HOST_CONCURRENCY`` requests in
+    flight and ``INGEST_HOST_RATE`` requests per second per API host.
+    Requests are conditional; once the publication windows are learned,
+    endpoints are polled every ``POLL_HOT_MINUTES`` inside them and every
+    ``POLL_COLD_MINUTES`` outside.
+    """
+    results = await scheduler.run_due(
+        get_async_store(),
+        raw_format=RAW_FORMAT,
+        host_concurrency=int(os.environ.get("INGEST_HOST_CONCURRENCY", 4)),
+        host_rate=float(os.environ.get("INGEST_HOST_RATE", 5)),
+        upload_concurrency=int(os.environ.get("INGEST_UPLOAD_CONCURRENCY", 8)),
+        hot_minutes=int(os.environ.get("POLL_HOT_MINUTES", 5)),
+        cold_minutes=int(os.environ.get("POLL_COLD_MINUTES", 120)),
+    )
+    logging.info("Scheduled ingest finished: %s", results)
@@ -0,0 +1,7 @@
+"""
+Shared helpers for the BCRA pipeline functions.
+
+Modules here are imported by the function entry points (``ingest_bcra``,
+``function_app.py``) and by the command line tools; they must not depend on
+``azure.functions`` so they can run outside the Functions host.
+"""
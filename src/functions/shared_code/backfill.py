@@ -0,0 +1,317 @@
+"""
+Parallel historical backfill for per-variable BCRA series.
+
+The latest-values endpoint only tells us "now".  History comes from the
+per-variable endpoint ``/monetarias/{idVariable}?desde=&hasta=``; we split each
+variable's date range into chunks and fetch them on a bounded thread pool,
+behind a shared token bucket so BCRA does not throttle us, retrying transient
+failures with exponential backoff.  Pages are parsed while they download
+(``jsonstream``), so a large response body is never held in memory.
+Completed chunks are recorded in a checkpoint so an interrupted run resumes
+where it stopped.
+
+Output lands in the same ``raw/monetarias/year=/month=/day=`` layout as
+``ingest_bcra``, one ``vars_hist_<idVariable>_<desde>_<hasta>.json`` per chunk
+and day (chunk keys carry both ends too, so a run with a different
+``chunk_days`` never takes another run's chunk for its own).
+
+Usage::
+
+    python -m src.functions.shared_code.backfill --desde 2020-01-01 --hasta 2025-07-29 \\
+        --local-dir ./datalake --workers 16 --rate 20
+"""
+import argparse
+import datetime
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import cdc, jsonstream, manifest
+
+BASE_URL = "https://api.bcra.gob.ar/estadisticas/v3.0/monetarias"
+CHECKPOINT_PATH = "state/backfill/checkpoint.json"
+PAGE_LIMIT = 3000
+RETRY_STATUS = {429, 500, 502, 503, 504}
+STREAM_CHUNK_BYTES = 64 * 1024
+DEFAULT_RATE = 10.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``.
+
+    ``capacity`` is at least one token, so a ``rate`` below 1 still admits a
+    request every ``1 / rate`` seconds.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity or rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """Set of completed chunk keys persisted to the store every ``flush_every`` marks."""
+
+    def __init__(self, store, path=CHECKPOINT_PATH, flush_every=25):
+        self.store = store
+        self.path = path
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        raw = store.read_bytes(path)
+        self.done = set(json.loads(raw)["done"]) if raw else set()
+        self.pending = 0
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def mark(self, key):
+        with self.lock:
+            self.done.add(key)
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.store.write_bytes(self.path, json.dumps({"done": sorted(self.done)}))
+        self.pending = 0
+
+
+def date_chunks(desde, hasta, days):
+    """Split the inclusive ``[desde, hasta]`` range into chunks of at most ``days`` days."""
+    chunks = []
+    start = desde
+    while start <= hasta:
+        end = min(start + datetime.timedelta(days=days - 1), hasta)
+        chunks.append((start, end))
+        start = end + datetime.timedelta(days=1)
+    return chunks
+
+
+def make_session(pool_size=10):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _get(session, url, params, bucket, parse, retries=5, backoff=0.5, timeout=30, stream=False):
+    """GET ``url`` and ``parse(resp)``, retrying 429/5xx and connection errors."""
+    import requests
+
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            resp = session.get(url, params=params, timeout=timeout, verify=False, stream=stream)
+            with resp:
+                if resp.status_code not in RETRY_STATUS:
+                    resp.raise_for_status()
+                    return parse(resp)
+            error = requests.HTTPError(f"{resp.status_code} for {url}", response=resp)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            error = e
+        if attempt == retries:
+            raise error
+        delay = backoff * (2 ** attempt) * (1 + random.random())
+        logging.warning("Retrying %s in %.2fs (%s)", url, delay, error)
+        time.sleep(delay)
+
+
+def fetch_json(session, url, params=None, bucket=None, **kwargs):
+    """GET ``url`` and decode JSON, retrying 429/5xx and connection errors."""
+    return _get(session, url, params, bucket, lambda resp: resp.json(), **kwargs)
+
+
+def fetch_records(session, url, params=None, bucket=None, **kwargs):
+    """GET ``url`` and parse its records while the body downloads; returns ``(records, envelope)``.
+
+    The body is read in ``STREAM_CHUNK_BYTES`` chunks and never held whole,
+    only the decoded records are.
+    """
+    def parse(resp):
+        stream = jsonstream.RecordStream(resp.iter_content(STREAM_CHUNK_BYTES))
+        return list(stream), stream.envelope
+
+    return _get(session, url, params, bucket, parse, stream=True, **kwargs)
+
+
+def fetch_series(session, base_url, id_variable, desde, hasta, bucket=None, **kwargs):
+    """Fetch every page of one variable's series between ``desde`` and ``hasta``."""
+    records = []
+    offset = 0
+    while True:
+        params = {"desde": desde.isoformat(), "hasta": hasta.isoformat(),
+                  "offset": offset, "limit": PAGE_LIMIT}
+        page, envelope = fetch_records(session, f"{base_url}/{id_variable}", params, bucket, **kwargs)
+        records.extend(page)
+        count = envelope.get("metadata", {}).get("resultset", {}).get("count")
+        offset += len(page)
+        if not page or len(page) < PAGE_LIMIT or (count is not None and offset >= count):
+            return records
+
+
+def chunk_key(id_variable, start, end):
+    return f"{id_variable}:{start.isoformat()}:{end.isoformat()}"
+
+
+def write_chunk(store, variable, chunk_start, chunk_end, records):
+    """Write one chunk's records split by ``fecha`` into the raw partitions."""
+    by_day = {}
+    for record in records:
+        full = {
+            "idVariable": variable["idVariable"],
+            "cdSerie": variable.get("cdSerie"),
+            "descripcion": variable.get("descripcion"),
+            "fecha": record["fecha"],
+            "valor": record["valor"],
+        }
+        by_day.setdefault(record["fecha"][:10], []).append(full)
+
+    for day, rows in by_day.items():
+        y, m, d = day.split("-")
+        store.write_bytes(
+            f"raw/monetarias/year={y}/month={m}/day={d}/"
+            f"vars_hist_{variable['idVariable']}_{chunk_start.isoformat()}_{chunk_end.isoformat()}.json",
+            json.dumps(rows),
+        )
+    return len(by_day)
+
+
+def list_variables(session, base_url=BASE_URL, bucket=None):
+    return cdc.extract_records(fetch_json(session, base_url, bucket=bucket))
+
+
+def plan_chunks(variables, desde, hasta, chunk_days):
+    """Return ``(key, variable, start, end)`` tasks for every variable and chunk."""
+    return [
+        (chunk_key(v["idVariable"], start, end), v, start, end)
+        for v in variables
+        for start, end in date_chunks(desde, hasta, chunk_days)
+    ]
+
+
+def run_chunk(session, store, base_url, variable, start, end, bucket=None):
+    records = fetch_series(session, base_url, variable["idVariable"], start, end, bucket)
+    write_chunk(store, variable, start, end, records)
+    return len(records)
+
+
+def existing_chunks(store, desde, hasta):
+    """Keys of the chunks already written in ``[desde, hasta]``, from the partition manifests."""
+    keys = set()
+    for day in manifest.days_with_fechas(manifest.load_index(store), desde, hasta):
+        for name in (manifest.load_manifest(store, day) or {}).get("files", {}):
+            if name.startswith("vars_hist_") and name.endswith(".json"):
+                parts = name[len("vars_hist_"):-len(".json")].split("_")
+                # los blobs viejos sin fin de chunk no dicen qué rango cubren: se vuelven a pedir
+                if len(parts) == 3:
+                    keys.add(":".join(parts))
+    return keys
+
+
+def run_backfill(store, desde, hasta, base_url=BASE_URL, workers=8, rate=DEFAULT_RATE,
+                 chunk_days=365, variable_ids=None, session=None,
+                 checkpoint_path=CHECKPOINT_PATH, skip_existing=False):
+    """Backfill ``[desde, hasta]`` for all (or ``variable_ids``) variables.
+
+    With ``skip_existing`` chunks whose blobs are already in the partition
+    manifests are skipped too (e.g. after losing the checkpoint).  Returns a
+    summary with the number of chunks fetched, skipped and failed, and the
+    number of records written.
+    """
+    session = session or make_session(workers)
+    bucket = TokenBucket(rate)
+    checkpoint = Checkpoint(store, checkpoint_path)
+
+    variables = list_variables(session, base_url, bucket)
+    if variable_ids:
+        wanted = {int(v) for v in variable_ids}
+        variables = [v for v in variables if int(v["idVariable"]) in wanted]
+
+    tasks = plan_chunks(variables, desde, hasta, chunk_days)
+    done = existing_chunks(store, desde, hasta) if skip_existing else set()
+    pending = [t for t in tasks if t[0] not in checkpoint and t[0] not in done]
+    summary = {"variables": len(variables), "chunks": len(tasks),
+               "skipped": len(tasks) - len(pending), "fetched": 0, "failed": 0, "records": 0}
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_chunk, session, store, base_url, variable, start, end, bucket): key
+            for key, variable, start, end in pending
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                summary["records"] += future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                logging.error("Backfill chunk %s failed: %s", key, e)
+                continue
+            summary["fetched"] += 1
+            checkpoint.mark(key)
+    checkpoint.flush()
+
+    summary["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    logging.info("Backfill finished: %s", summary)
+    return summary
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value)
+
+
+def main(argv=None):
+    from .storage import open_store
+
+    parser = argparse.ArgumentParser(description="Backfill BCRA monetarias history")
+    parser.add_argument("--desde", type=_parse_date, required=True)
+    parser.add_argument("--hasta", type=_parse_date, default=datetime.date.today())
+    parser.add_argument("--variables", help="comma separated idVariable list (default: all)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="max requests per second")
+    parser.add_argument("--chunk-days", type=int, default=365)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--local-dir", help="write to a local directory instead of AZURE_STORAGE_CONN")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="also skip chunks already recorded in the partition manifests")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    summary = run_backfill(
+        open_store(args.local_dir), args.desde, args.hasta, base_url=args.base_url, workers=args.workers,
+        rate=args.rate, chunk_days=args.chunk_days,
+        variable_ids=args.variables.split(",") if args.variables else None,
+        skip_existing=args.skip_existing,
+    )
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
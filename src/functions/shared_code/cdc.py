@@ -0,0 +1,58 @@
+"""
+Change-data-capture for monetarias snapshots.
+
+The latest-values endpoint returns the whole variable list on every call,
+while most variables only move once a day.  We keep the last ``(fecha,
+valor)`` seen for each ``idVariable`` in a small state blob and compare every
+new snapshot against it, so ingest only writes when something changed.
+"""
+import json
+
+STATE_PATH = "state/monetarias/fingerprints.json"
+
+
+def extract_records(payload):
+    """Return the list of variables from a BCRA response.
+
+    The v3.0 API wraps the list as ``{"status": 200, "results": [...]}``;
+    older responses (and our own raw blobs) are the bare list.
+    """
+    if isinstance(payload, dict):
+        return payload.get("results") or []
+    return payload or []
+
+
+def fingerprint(record):
+    """Fingerprint of a single variable: its ``fecha`` and ``valor``."""
+    return [record.get("fecha"), record.get("valor")]
+
+
+def load_state(store, path=STATE_PATH):
+    """Load the ``{idVariable: [fecha, valor]}`` map (empty on first run)."""
+    raw = store.read_bytes(path)
+    if not raw:
+        return {}
+    return json.loads(raw)
+
+
+def save_state(store, state, path=STATE_PATH):
+    store.write_bytes(path, json.dumps(state, separators=(",", ":")))
+
+
+def diff_records(records, state):
+    """Return the records whose fingerprint differs from ``state``.
+
+    Variables never seen before count as changed.
+    """
+    return [
+        record for record in records
+        if state.get(str(record.get("idVariable"))) != fingerprint(record)
+    ]
+
+
+def update_state(state, records):
+    """Return a new state with the fingerprints of ``records`` applied."""
+    new_state = dict(state)
+    for record in records:
+        new_state[str(record.get("idVariable"))] = fingerprint(record)
+    return new_state
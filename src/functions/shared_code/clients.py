@@ -0,0 +1,132 @@
+"""
+Process-wide clients, created on first use and reused across invocations.
+
+A warm Functions worker keeps this module loaded, so caching the blob client
+and a keep-alive ``requests.Session`` here saves the client construction and
+the TLS handshake on every run.  The SDKs themselves are imported lazily so
+that importing an entry point stays cheap on a cold start.
+
+The async clients (``aiohttp`` session, ``azure.storage.blob.aio``) are bound
+to the event loop that created them, so they are cached per running loop; the
+Functions worker keeps one loop for every ``async def`` invocation.
+"""
+import asyncio
+import os
+import threading
+
+DEFAULT_CONTAINER = "datalake"
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_lock = threading.Lock()
+_blob_services = {}
+_session = None
+_async_clients = {}
+
+
+def get_blob_service(conn_str=None):
+    """Cached ``BlobServiceClient`` for ``conn_str`` (default ``AZURE_STORAGE_CONN``)."""
+    conn_str = conn_str or os.environ["AZURE_STORAGE_CONN"]
+    service = _blob_services.get(conn_str)
+    if service is None:
+        with _lock:
+            service = _blob_services.get(conn_str)
+            if service is None:
+                from azure.storage.blob import BlobServiceClient
+
+                service = BlobServiceClient.from_connection_string(conn_str)
+                _blob_services[conn_str] = service
+    return service
+
+
+def get_container(name=DEFAULT_CONTAINER, conn_str=None):
+    return get_blob_service(conn_str).get_container_client(name)
+
+
+def get_http_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """Cached keep-alive session with a retry policy for idempotent requests."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                import urllib3
+                from requests.adapters import HTTPAdapter
+
+                # la API del BCRA se llama con verify=False
+                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+                retry = urllib3.Retry(
+                    total=retries,
+                    backoff_factor=backoff_factor,
+                    status_forcelist=RETRY_STATUS,
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _loop_cached(key, factory):
+    loop = asyncio.get_running_loop()
+    cached = _async_clients.get(key)
+    if cached is None or cached[0] is not loop:
+        cached = _async_clients[key] = (loop, factory())
+    return cached[1]
+
+
+def get_aiohttp_session(pool_size=20, per_host=0):
+    """Keep-alive ``aiohttp.ClientSession`` for the running event loop.
+
+    ``per_host`` caps the pooled connections to any single host (0: no cap).
+    One session is cached per ``(pool_size, per_host)``, so callers asking for
+    different limits never share a connector.
+    """
+    key = ("aiohttp", pool_size, per_host)
+
+    def create():
+        import aiohttp
+
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size,
+                                                                    limit_per_host=per_host))
+
+    session = _loop_cached(key, create)
+    if session.closed:
+        _async_clients.pop(key)
+        session = _loop_cached(key, create)
+    return session
+
+
+def get_async_container(name=DEFAULT_CONTAINER, conn_str=None):
+    """``azure.storage.blob.aio.ContainerClient`` for the running event loop."""
+    conn_str = conn_str or os.environ["AZURE_STORAGE_CONN"]
+
+    def create():
+        from azure.storage.blob.aio import BlobServiceClient
+
+        return BlobServiceClient.from_connection_string(conn_str).get_container_client(name)
+
+    return _loop_cached(("blob", conn_str, name), create)
+
+
+async def aclose():
+    """Close the async clients of the running loop."""
+    loop = asyncio.get_running_loop()
+    for key, (owner, client) in list(_async_clients.items()):
+        if owner is loop:
+            await client.close()
+            del _async_clients[key]
+
+
+def reset():
+    """Drop the cached clients (tests, or after a connection string rotation)."""
+    global _session
+    with _lock:
+        _blob_services.clear()
+        _async_clients.clear()
+        if _session is not None:
+            _session.close()
+        _session = None
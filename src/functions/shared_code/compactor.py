@@ -0,0 +1,211 @@
+"""
+JSON → Parquet compactor for the monetarias raw partitions.
+
+Replaces the ``CopyJSONToParquet`` ADF activity: every ``vars_*`` snapshot
+(``.json``, ``.ndjson.gz`` or ``.ndjson.zst``) of a
+``raw/monetarias/year=/month=/day=`` partition is read one blob at a time and
+written as a single Parquet file under ``processed/monetarias/`` with the same
+column mapping (``id_variable``, ``codigo_serie``, ``descripcion``, ``fecha``,
+``valor``).  Snapshots are parsed incrementally and converted to Arrow
+record batches of ``BATCH_RECORDS`` rows, so a large historical blob is never
+held as a list of dicts.  Hourly snapshots repeat the same ``(id_variable, fecha)`` rows,
+so they are deduplicated (last file wins) before writing.
+
+Usage::
+
+    python -m src.functions.shared_code.compactor --desde 2025-07-01 --hasta 2025-07-29 \\
+        --local-dir ./datalake --processes 8
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from . import manifest, metrics, rawformat
+
+RAW_PREFIX = "raw/monetarias"
+CURATED_PREFIX = "processed/monetarias"
+CURATED_FILE = "part-0.parquet"
+BATCH_RECORDS = int(os.environ.get("COMPACTOR_BATCH_RECORDS", 10_000))
+
+SCHEMA = pa.schema([
+    ("id_variable", pa.int32()),
+    ("codigo_serie", pa.dictionary(pa.int32(), pa.string())),
+    ("descripcion", pa.dictionary(pa.int32(), pa.string())),
+    ("fecha", pa.date32()),
+    ("valor", pa.decimal128(28, 8)),
+])
+
+
+def partition_path(prefix, day):
+    return f"{prefix}/year={day.year}/month={day.month:02d}/day={day.day:02d}"
+
+
+def day_inputs(store, day):
+    """Raw snapshot blobs of ``day`` in name (= ingest time) order.
+
+    Resolved from the partition manifest when there is one (merged with a
+    listing while the partition is still open, see ``manifest.partition_blobs``),
+    by listing otherwise.
+    """
+    paths = manifest.partition_blobs(store, day, prefix="vars_")
+    if paths is not None:
+        return paths
+    prefix = partition_path(RAW_PREFIX, day) + "/"
+    return [p for p in store.list(prefix) if p.rsplit("/", 1)[-1].startswith("vars_")]
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def records_to_table(records):
+    """Convert raw BCRA records to a table with the curated ``SCHEMA``.
+
+    ``cdSerie`` is an integer in the v3.0 API; like the ADF mapping it
+    replaces, it is stored as a string.  Records whose ``fecha`` is not a
+    ``YYYY-MM-DD`` date are dropped (and counted) instead of failing the day.
+    """
+    fechas = pa.array([(r.get("fecha") or "")[:10] or None for r in records], pa.string())
+    parsed = pc.strptime(fechas, format="%Y-%m-%d", unit="s", error_is_null=True)
+    invalid = pc.and_(pc.is_null(parsed), pc.is_valid(fechas))
+    columns = {
+        "id_variable": pa.array([r.get("idVariable") for r in records], pa.int32()),
+        "codigo_serie": pa.array([_text(r.get("cdSerie")) for r in records], pa.string()).dictionary_encode(),
+        "descripcion": pa.array([_text(r.get("descripcion")) for r in records], pa.string()).dictionary_encode(),
+        "fecha": pc.cast(parsed, pa.date32()),
+        "valor": pc.round(pa.array([r.get("valor") for r in records], pa.float64()), 8)
+                   .cast(SCHEMA.field("valor").type),
+    }
+    table = pa.table(columns).cast(SCHEMA)
+    dropped = pc.sum(invalid).as_py() or 0
+    if dropped:
+        metrics.incr("compactor.invalid_fecha", dropped)
+        logging.warning("Dropped %d records with an invalid fecha", dropped)
+        table = table.filter(pc.invert(invalid))
+    return table
+
+
+def dedupe_and_sort(table):
+    """Keep the last row per ``(id_variable, fecha)`` and sort by that key."""
+    table = table.append_column("_row", pa.array(range(table.num_rows), pa.int64()))
+    last = table.group_by(["id_variable", "fecha"]).aggregate([("_row", "max")])
+    table = table.take(last["_row_max"]).drop_columns(["_row"])
+    return table.sort_by([("id_variable", "ascending"), ("fecha", "ascending")])
+
+
+def iter_record_batches(store, path, batch_records=BATCH_RECORDS):
+    """Stream a raw snapshot as ``SCHEMA`` record batches of at most ``batch_records`` rows."""
+    for records in rawformat.read_batches(store, path, batch_records):
+        yield from records_to_table(records).to_batches()
+
+
+def read_day(store, day, paths=None):
+    """Read every raw snapshot of ``day`` (or ``paths``) into one deduplicated, sorted table."""
+    tables = []
+    for path in day_inputs(store, day) if paths is None else paths:
+        batches = list(iter_record_batches(store, path))
+        if batches:
+            tables.append(pa.Table.from_batches(batches, SCHEMA))
+    if not tables:
+        return None
+    return dedupe_and_sort(pa.concat_tables(tables).unify_dictionaries())
+
+
+def write_parquet(table, row_group_size=64_000):
+    buffer = io.BytesIO()
+    pq.write_table(
+        table,
+        buffer,
+        compression="snappy",
+        use_dictionary=["codigo_serie", "descripcion"],
+        write_statistics=True,
+        row_group_size=row_group_size,
+    )
+    return buffer.getvalue()
+
+
+def compact_day(store, day, now=None):
+    """Compact one raw partition; returns the number of rows written (0 if empty).
+
+    The Parquet blob carries its ``compacted_at`` time (and the newest
+    ``ingested_at`` among its inputs) as metadata, and the time is added to
+    the partition manifest's ``compactions`` for ``freshness``.
+    """
+    inputs = day_inputs(store, day)
+    with metrics.timer("compactor.read_ms"):
+        table = read_day(store, day, inputs)
+    if table is None:
+        logging.info("No raw snapshots for %s", day)
+        return 0
+    path = f"{partition_path(CURATED_PREFIX, day)}/{CURATED_FILE}"
+    compacted_at = (now or datetime.datetime.utcnow()).isoformat()
+    ingested = [ts for ts in map(manifest.ingested_at, inputs) if ts]
+    lineage = {"compacted_at": compacted_at, "inputs": str(len(inputs))}
+    if ingested:
+        lineage["max_ingested_at"] = max(ingested)
+    with metrics.timer("compactor.write_ms"):
+        store.write_bytes(path, write_parquet(table), content_type="application/vnd.apache.parquet",
+                          metadata=lineage)
+    manifest.record_compaction(store, day, compacted_at)
+    metrics.record("compactor.rows", table.num_rows)
+    logging.info("Compacted %d rows → %s", table.num_rows, path)
+    return table.num_rows
+
+
+def _compact_day_worker(local_dir, day):
+    from .storage import open_store
+
+    return compact_day(open_store(local_dir), day)
+
+
+def compact_range(desde, hasta, local_dir=None, processes=None, store=None):
+    """Compact every day in ``[desde, hasta]``; returns ``{day: rows}``.
+
+    With ``processes`` > 1 days are spread over a process pool; each worker
+    opens its own store (``local_dir`` or ``AZURE_STORAGE_CONN``).  A ``store``
+    cannot be handed to the workers, so passing one runs in-process (and
+    asking for more processes with it is an error).
+    """
+    days = [desde + datetime.timedelta(days=n) for n in range((hasta - desde).days + 1)]
+    if store is not None:
+        if processes not in (None, 1):
+            raise ValueError("compact_range: a store is only used in-process; "
+                             "pass local_dir to compact with several processes")
+        processes = 1
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(days) == 1:
+        if store is None:
+            from .storage import open_store
+
+            store = open_store(local_dir)
+        return {day: compact_day(store, day) for day in days}
+
+    with ProcessPoolExecutor(max_workers=min(processes, len(days))) as pool:
+        rows = pool.map(_compact_day_worker, [local_dir] * len(days), days)
+        return dict(zip(days, rows))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact raw monetarias JSON into Parquet")
+    parser.add_argument("--desde", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--hasta", type=datetime.date.fromisoformat)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--local-dir", help="read/write a local directory instead of AZURE_STORAGE_CONN")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    result = compact_range(args.desde, args.hasta or args.desde, args.local_dir, args.processes)
+    print(json.dumps({day.isoformat(): rows for day, rows in result.items()}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,233 @@
+"""
+Duplicate suppression for ``blob_alert``.
+
+Event Grid delivers at least once, and ``ingest_bcra`` uploads with
+``overwrite=True``, so the same blob can be announced more than once.  An
+event is a duplicate when its ``id`` was already processed (a redelivery) or
+when the same blob was already processed with the same ``eTag`` (another
+event for unchanged content).
+
+Two bounded layers, checked in order:
+
+* ``LRUSet``: the most recent keys seen by this worker, no I/O.
+* ``RotatingBloomFilter``: shared by every worker, persisted at
+  ``DEDUP_PATH`` and updated with ETag-conditional writes.  Two generations
+  of ``bits`` bits; the older one is dropped every ``rotate_seconds``, so a
+  key is remembered between one and two rotations.  Its size does not depend
+  on the event rate; a false positive (an event wrongly suppressed) has
+  probability ``(1 - e^(-k·n/m))^k`` for ``n`` keys per generation: with
+  the defaults (2^18 bits, 7 hashes) under 1% up to ~27k keys a day.
+
+Keys are marked only after the event was processed, so a failed invocation
+retried by Event Grid is not suppressed.
+"""
+import hashlib
+import logging
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from . import metrics
+from .storage import PreconditionFailed
+
+DEDUP_PATH = "state/blob_alert/seen.bloom"
+MAGIC = b"BLM1"
+HEADER = struct.Struct("<4sIId")
+
+
+def event_keys(event_id, blob_name, etag):
+    """Dedup keys of one event (none if it carries neither ``id`` nor ``eTag``)."""
+    keys = []
+    if event_id:
+        keys.append(f"id:{event_id}")
+    if etag:
+        keys.append(f"etag:{blob_name}:{etag}")
+    return keys
+
+
+class LRUSet:
+    """Set of at most ``maxsize`` keys, evicting the least recently seen (thread-safe)."""
+
+    def __init__(self, maxsize=10_000):
+        self.maxsize = maxsize
+        self.keys = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            if key in self.keys:
+                self.keys.move_to_end(key)
+                return True
+            return False
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        with self.lock:
+            self.keys[key] = None
+            self.keys.move_to_end(key)
+            while len(self.keys) > self.maxsize:
+                self.keys.popitem(last=False)
+
+
+class RotatingBloomFilter:
+    """Bloom filter with a current and a previous generation of ``bits`` bits each."""
+
+    def __init__(self, bits=1 << 18, hashes=7, rotate_seconds=86_400, started_at=0.0,
+                 current=None, previous=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.rotate_seconds = rotate_seconds
+        self.started_at = started_at
+        self.current = current if current is not None else bytearray(bits // 8)
+        self.previous = previous if previous is not None else bytearray(bits // 8)
+
+    def _positions(self, key):
+        # doble hashing: k posiciones a partir de dos enteros de 64 bits
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _test(generation, positions):
+        return all(generation[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, key):
+        positions = self._positions(key)
+        return self._test(self.current, positions) or self._test(self.previous, positions)
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.current[p >> 3] |= 1 << (p & 7)
+
+    def rotate(self, now):
+        """Start a new generation if the current one is older than ``rotate_seconds``."""
+        if now - self.started_at < self.rotate_seconds:
+            return False
+        # más de dos rotaciones sin eventos: la generación actual también venció
+        stale = now - self.started_at >= 2 * self.rotate_seconds
+        self.previous = bytearray(self.bits // 8) if stale else self.current
+        self.current = bytearray(self.bits // 8)
+        self.started_at = now
+        return True
+
+    def copy(self):
+        return RotatingBloomFilter(self.bits, self.hashes, self.rotate_seconds, self.started_at,
+                                   bytearray(self.current), bytearray(self.previous))
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, self.bits, self.hashes, self.started_at)
+        # casi todo el filtro son ceros: comprimido pesa una fracción
+        compressor = zlib.compressobj(1)
+        return header + compressor.compress(self.current) + compressor.compress(self.previous) + compressor.flush()
+
+    @classmethod
+    def from_bytes(cls, raw, rotate_seconds=86_400):
+        magic, bits, hashes, started_at = HEADER.unpack_from(raw)
+        if magic != MAGIC:
+            raise ValueError("not a rotating Bloom filter")
+        body = zlib.decompress(raw[HEADER.size:])
+        size = bits // 8
+        return cls(bits, hashes, rotate_seconds, started_at,
+                   bytearray(body[:size]), bytearray(body[size:]))
+
+
+class Deduplicator:
+    """In-process LRU in front of the persistent ``RotatingBloomFilter`` of a store."""
+
+    def __init__(self, lru_size=10_000, bits=1 << 18, hashes=7, rotate_seconds=86_400,
+                 path=DEDUP_PATH, clock=time.time):
+        self.lru = LRUSet(lru_size)
+        self.bits = bits
+        self.hashes = hashes
+        self.rotate_seconds = rotate_seconds
+        self.path = path
+        self.clock = clock
+        self.cached = (None, None)
+        self.cache_lock = threading.Lock()
+
+    def _load(self, raw, etag=None):
+        """Parse the persisted filter; the last one read or written is reused by ETag."""
+        with self.cache_lock:
+            cached_etag, cached = self.cached
+        if etag and etag == cached_etag:
+            return cached.copy()
+        if raw:
+            bloom = RotatingBloomFilter.from_bytes(raw, self.rotate_seconds)
+            if (bloom.bits, bloom.hashes) == (self.bits, self.hashes):
+                return bloom
+            logging.warning("Dedup filter size changed, starting a new one")
+        return RotatingBloomFilter(self.bits, self.hashes, self.rotate_seconds, self.clock())
+
+    def duplicates(self, store, keysets):
+        """For each event's keys, whether it was already processed.
+
+        Repeated keys inside ``keysets`` count as duplicates of their first
+        occurrence.  The store is only read if some event is not in the LRU.
+        """
+        bloom = None
+        pending = set()
+        result = []
+        for keys in keysets:
+            duplicate = any(key in self.lru or key in pending for key in keys)
+            if not duplicate and keys:
+                if bloom is None:
+                    with metrics.timer("dedup.load_ms"):
+                        bloom = self._load(*store.read_versioned(self.path))
+                duplicate = any(key in bloom for key in keys)
+                if duplicate:
+                    # lo procesó otro worker: se recuerda localmente
+                    for key in keys:
+                        self.lru.add(key)
+            pending.update(keys)
+            result.append(duplicate)
+        return result
+
+    def mark(self, store, keysets, retries=20, backoff=0.05):
+        """Record processed events in the LRU and in the persistent filter."""
+        keys = [key for ks in keysets for key in ks]
+        if not keys:
+            return
+        for key in keys:
+            self.lru.add(key)
+        with metrics.timer("dedup.mark_ms"):
+            for attempt in range(retries):
+                raw, etag = store.read_versioned(self.path)
+                bloom = self._load(raw, etag)
+                bloom.rotate(self.clock())
+                for key in keys:
+                    bloom.add(key)
+                try:
+                    new_etag = store.write_if_match(self.path, bloom.to_bytes(), etag,
+                                                    content_type="application/octet-stream")
+                    with self.cache_lock:
+                        self.cached = (new_etag, bloom)
+                    return
+                except PreconditionFailed:
+                    metrics.incr("dedup.write_conflicts")
+                    time.sleep(backoff * random.uniform(0.5, 1.5) * min(2 ** attempt, 32))
+        raise PreconditionFailed(f"{self.path}: gave up after {retries} conflicting writes")
+
+
+_deduplicator = None
+
+
+def get_deduplicator():
+    """Process-wide ``Deduplicator`` configured from the environment.
+
+    ``DEDUP_LRU_SIZE`` (default 10000), ``DEDUP_BLOOM_BITS`` (default 2^18)
+    and ``DEDUP_TTL_SECONDS`` (default 86400, the rotation period).
+    """
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = Deduplicator(
+            lru_size=int(os.environ.get("DEDUP_LRU_SIZE", 10_000)),
+            bits=int(os.environ.get("DEDUP_BLOOM_BITS", 1 << 18)),
+            rotate_seconds=int(os.environ.get("DEDUP_TTL_SECONDS", 86_400)),
+        )
+    return _deduplicator
@@ -0,0 +1,326 @@
+"""
+Blob-created event processing shared by every ``blob_alert`` entry point.
+
+``function_app.blob_alert`` (v2, one event), ``function_app.blob_alert_batch``
+(webhook, many events) and the v1 ``blob_alert/__init__.py`` only unwrap their
+trigger and call ``handle_event`` / ``handle_batch``:
+
+1. fast path: ``events.is_candidate`` looks at two fields of the raw envelope
+   and drops anything that is not a BlobCreated under ``raw/`` before it is
+   normalized, formatted or logged in detail
+2. ``events.classify`` keeps the registered datasets and ``dedup`` suppresses
+   the events already processed
+3. the remaining events go to every registered handler at once, each on the
+   shared thread pool with its own timeout; a handler that fails or times out
+   is logged and counted and does not affect the others
+4. if every handler succeeded the events are marked as processed; one
+   telemetry record is logged either way.  Events whose handlers failed are
+   not marked and are buffered as ``failed`` for the notification digest,
+   and a failed ``RETRY_HANDLERS`` handler (the manifest update) raises
+   ``HandlerFailed`` so the host / Event Grid redelivers them
+
+Handlers are ``fn(context) -> result`` registered with ``register``.  They
+receive every event of the call, so per-partition work (the manifest update)
+is done once per batch.  A timed-out handler cannot be cancelled: it keeps
+its worker thread until it returns (``EVENT_HANDLER_WORKERS``, default 8).
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from . import events, metrics
+
+DEFAULT_TIMEOUT = float(os.environ.get("EVENT_HANDLER_TIMEOUT_SECONDS", 10))
+
+Handler = namedtuple("Handler", "name fn timeout")
+HandlerResult = namedtuple("HandlerResult", "status value")
+
+HANDLERS = {}
+# handlers whose failure fails the invocation, so the host / Event Grid redelivers
+RETRY_HANDLERS = ("manifest",)
+
+
+class HandlerFailed(Exception):
+    """A handler in ``RETRY_HANDLERS`` failed; the events were not marked as processed."""
+
+
+def register(name, timeout=None):
+    """Decorator adding ``fn(context)`` to the handlers run for every accepted event."""
+    def decorator(fn):
+        HANDLERS[name] = Handler(name, fn, timeout)
+        return fn
+    return decorator
+
+
+class Context:
+    """Accepted events of one call, their metadata and a store opened on first use."""
+
+    def __init__(self, blob_events, store_factory, processed_time=None):
+        self.events = blob_events
+        self.store_factory = store_factory
+        self.processed_time = processed_time or datetime.datetime.utcnow().isoformat()
+        self.lock = threading.Lock()
+        self._store = None
+        self._metadata = None
+
+    @property
+    def store(self):
+        with self.lock:
+            if self._store is None:
+                self._store = self.store_factory()
+            return self._store
+
+    @property
+    def metadata(self):
+        """Notification / telemetry metadata of every event."""
+        if self._metadata is None:
+            self._metadata = [metadata(e, self.processed_time) for e in self.events]
+        return self._metadata
+
+
+def metadata(blob_event, processed_time):
+    data = {
+        'blob_name': blob_event.blob_name,
+        'blob_url': blob_event.url,
+        'event_time': blob_event.event_time,
+        'processed_time': processed_time,
+        'data_source': events.data_source(blob_event.dataset),
+        'event_type': events.BLOB_CREATED,
+    }
+    if blob_event.year:
+        data.update(year=blob_event.year, month=blob_event.month, day=blob_event.day)
+    return data
+
+
+# ── handlers ──────────────────────────────────────────────────────
+@register("manifest")
+def update_manifests(context):
+    """Record new raw blobs in their partition manifests (only ``raw/monetarias``).
+
+    Each entry gets the Event Grid ``event_time`` and the ``recorded_at``
+    time of this call, for ``freshness``.
+    """
+    from . import manifest
+
+    lineage = {e.blob_name: {"event_time": e.event_time, "recorded_at": context.processed_time}
+               for e in context.events if e.blob_name.startswith(manifest.RAW_PREFIX + "/")}
+    if not lineage:
+        return False
+    manifest.record_blobs(context.store, sorted(lineage), lineage)
+    return True
+
+
+@register("notify")
+def queue_notifications(context):
+    """Buffer every blob for the next notification digest (one message per window).
+
+    Quarantined snapshots are buffered as ``quarantined``.
+    """
+    from . import notifications, quality
+
+    quarantine = quality.QUARANTINE_PREFIX + "/"
+    notifications.get_notifier().add_many(
+        (data, "quarantined", "quarantine") if data["blob_name"].startswith(quarantine) else (data, "ok", None)
+        for data in context.metadata
+    )
+    return len(context.metadata)
+
+
+def notify_failures(context, results, failed):
+    """Buffer the events of ``context`` as ``failed`` with the errors of the ``failed`` handlers."""
+    from . import notifications
+
+    error = "; ".join(f"{name}: {results[name].value or results[name].status}" for name in failed)
+    try:
+        notifications.get_notifier().add_many((data, "failed", error) for data in context.metadata)
+    except Exception as e:
+        logging.error(f"Could not buffer {len(context.events)} failed events for notification: {e}")
+
+
+# ── runner ────────────────────────────────────────────────────────
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.environ.get("EVENT_HANDLER_WORKERS", 8)),
+                                           thread_name_prefix="blob-handler")
+        return _executor
+
+
+def _call(handler, context):
+    with metrics.timer("blob_alert.handler_ms", handler=handler.name):
+        return handler.fn(context)
+
+
+def run_handlers(context, handlers=None):
+    """Run every handler concurrently; returns ``{name: HandlerResult}``.
+
+    ``status`` is ``ok``, ``failed`` or ``timeout``; ``value`` is the handler's
+    return value (the exception when it failed).
+    """
+    handlers = list((handlers or HANDLERS).values())
+    executor = get_executor()
+    started = time.monotonic()
+    futures = [(h, executor.submit(_call, h, context)) for h in handlers]
+    results = {}
+    for handler, future in futures:
+        timeout = handler.timeout if handler.timeout is not None else DEFAULT_TIMEOUT
+        try:
+            results[handler.name] = HandlerResult("ok", future.result(max(0.0, started + timeout - time.monotonic())))
+        except FutureTimeout:
+            metrics.incr("blob_alert.handler_timeouts", handler=handler.name)
+            logging.error(f"Handler {handler.name} timed out after {timeout}s for {len(context.events)} events")
+            results[handler.name] = HandlerResult("timeout", None)
+        except Exception as e:
+            metrics.incr("blob_alert.handler_failed", handler=handler.name)
+            logging.error(f"Handler {handler.name} failed for {len(context.events)} events: {e}")
+            results[handler.name] = HandlerResult("failed", e)
+    return results
+
+
+# ── dedup ─────────────────────────────────────────────────────────
+def find_duplicates(store_factory, keysets):
+    """Whether each event (given by its dedup keys) was already processed.
+
+    If the shared filter cannot be read nothing is suppressed: a duplicate
+    notification is better than a lost one.
+    """
+    from . import dedup
+
+    try:
+        return dedup.get_deduplicator().duplicates(store_factory(), keysets)
+    except Exception as e:
+        logging.error(f"Duplicate check failed for {len(keysets)} events: {e}")
+        metrics.incr("dedup.check_failed")
+        return [False] * len(keysets)
+
+
+def mark_processed(store_factory, keysets):
+    """Remember processed events; failures are logged, not raised."""
+    from . import dedup
+
+    try:
+        dedup.get_deduplicator().mark(store_factory(), keysets)
+    except Exception as e:
+        logging.error(f"Could not record {len(keysets)} processed events: {e}")
+        metrics.incr("dedup.mark_failed")
+
+
+# ── core ──────────────────────────────────────────────────────────
+def process(raw_events, store_factory, handlers=None):
+    """Filter, dedup and dispatch raw events; returns ``(context, results, telemetry)``.
+
+    ``context`` is ``None`` when no event was accepted (handlers did not run).
+    """
+    from . import dedup, registry
+
+    started = time.perf_counter()
+    candidates = [raw for raw in raw_events if events.is_candidate(raw)]
+    blob_events = []
+    if candidates:
+        datasets = registry.datasets()
+        blob_events = [e for e in (events.classify(raw, datasets) for raw in candidates) if e is not None]
+
+    suppressed = 0
+    if blob_events:
+        # Event Grid entrega al menos una vez: redeliveries y blobs sin cambios se descartan
+        keysets = [dedup.event_keys(e.id, e.blob_name, e.etag) for e in blob_events]
+        duplicates = find_duplicates(store_factory, keysets)
+        suppressed = sum(duplicates)
+        if suppressed:
+            for e, dup in zip(blob_events, duplicates):
+                if dup:
+                    logging.info(f"Suppressed duplicate event {e.id} for: {e.blob_name}")
+            blob_events = [e for e, dup in zip(blob_events, duplicates) if not dup]
+            keysets = [k for k, dup in zip(keysets, duplicates) if not dup]
+
+    context, results = None, {}
+    if blob_events:
+        context = Context(blob_events, store_factory)
+        results = run_handlers(context, handlers)
+        failed = sorted(name for name, result in results.items() if result.status != "ok")
+        if failed:
+            # sin marcar: una redelivery de Event Grid vuelve a correr los handlers
+            metrics.incr("blob_alert.events_unmarked", len(keysets))
+            logging.warning(f"Not marking {len(keysets)} events as processed, handlers failed: {failed}")
+            notify_failures(context, results, failed)
+        else:
+            mark_processed(store_factory, keysets)
+
+    telemetry = {
+        "data_source": events.DATA_SOURCE,
+        "received": len(raw_events),
+        "processed": len(blob_events),
+        "ignored": len(raw_events) - len(blob_events) - suppressed,
+        "suppressed": suppressed,
+        "partitions": events.partition_counts(blob_events),
+        "datasets": events.dataset_counts(blob_events),
+        "handlers": {name: result.status for name, result in results.items()},
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    metrics.incr("blob_alert.events_processed", telemetry["processed"])
+    metrics.incr("blob_alert.events_ignored", telemetry["ignored"])
+    metrics.incr("blob_alert.events_suppressed", telemetry["suppressed"])
+    return context, results, telemetry
+
+
+def _raise_for_retry(results, telemetry):
+    """Raise ``HandlerFailed`` if a handler in ``RETRY_HANDLERS`` did not succeed."""
+    failed = [name for name in RETRY_HANDLERS if name in results and results[name].status != "ok"]
+    if failed:
+        raise HandlerFailed(f"Handlers {failed} failed for {telemetry['processed']} events")
+
+
+def _succeeded(results, name):
+    result = results.get(name)
+    return bool(result and result.status == "ok" and result.value)
+
+
+def handle_event(raw, store_factory, handlers=None):
+    """One Event Grid event (the v1 and v2 ``blob_alert`` triggers); returns the telemetry."""
+    logging.info('Python EventGrid trigger processed an event')
+    context, results, telemetry = process([raw], store_factory, handlers)
+    if context is None:
+        if not telemetry["suppressed"]:
+            logging.info("Ignoring event - Type: %s, Blob: %s", raw.get('eventType') or raw.get('type', ''),
+                         raw.get('subject', '').replace(events.SUBJECT_PREFIX, ''))
+        return telemetry
+
+    data = context.metadata[0]
+    logging.info(f"Processed blob metadata: {json.dumps(data, indent=2)}")
+    custom_properties = {
+        'blob_name': data['blob_name'],
+        'event_type': data['event_type'],
+        'data_source': data['data_source'],
+        'year': data.get('year', ''),
+        'month': data.get('month', ''),
+        'day': data.get('day', ''),
+        'notification_queued': str(_succeeded(results, "notify")).lower(),
+        'manifest_updated': str(_succeeded(results, "manifest")).lower(),
+    }
+    # Log custom event for monitoring dashboard
+    logging.info(f"CUSTOM_EVENT_BCRA_BLOB_PROCESSED: {json.dumps(custom_properties)}")
+    _raise_for_retry(results, telemetry)
+    logging.info(f"Successfully processed blob creation event for: {data['blob_name']}")
+    return telemetry
+
+
+def handle_batch(raw_events, store_factory, handlers=None):
+    """A batched delivery (the ``blob_alert/batch`` webhook); returns the aggregated telemetry."""
+    with metrics.timer("blob_alert.batch_handle_ms"):
+        context, results, telemetry = process(raw_events, store_factory, handlers)
+    if context is not None:
+        telemetry["manifest_updated"] = _succeeded(results, "manifest")
+    metrics.record("blob_alert.batch_size", len(raw_events))
+    logging.info(f"CUSTOM_EVENT_BCRA_BLOB_BATCH_PROCESSED: {json.dumps(telemetry)}")
+    _raise_for_retry(results, telemetry)
+    return telemetry
@@ -0,0 +1,230 @@
+"""
+End-to-end freshness of the monetarias data, from BCRA to curated Parquet.
+
+Every stage leaves a timestamp behind:
+
+* ``fecha`` of each record, the BCRA publication date (taken as the start of
+  that day in Buenos Aires, ``BCRA_TZ``)
+* ``ingested_at``: the ``vars_<ts>`` blob name, also set as blob metadata by
+  ``ingest``
+* ``event_time``: the Event Grid BlobCreated time and ``recorded_at``: when
+  ``blob_alert`` recorded the blob, both in its manifest entry
+* ``compactions``: when the partition was written to Parquet, in the manifest
+  (and ``compacted_at`` in the Parquet blob metadata)
+
+From the manifests (and the small ``changes/`` deltas written with each
+snapshot, for the per-variable lags) ``report`` computes the lag of each stage:
+
+* ``polling``: publication → ingest, per changed row (polling schedule)
+* ``event_grid``: ingest → Event Grid event, per raw blob
+* ``blob_alert``: Event Grid event → ``blob_alert``, per raw blob
+* ``transform``: ingest → first compaction after it, per snapshot
+* ``end_to_end``: publication → first compaction after ingest, per changed row
+
+with a histogram (``BUCKETS``) and p50/p99/max per stage, ``polling`` and
+``end_to_end`` per ``idVariable``, and the lags over the stage SLO
+(``FRESHNESS_SLO_SECONDS="stage=seconds,..."`` over ``DEFAULT_SLO``).
+
+Usage::
+
+    python -m src.functions.shared_code.freshness --desde 2025-07-01 --hasta 2025-07-29 \\
+        --local-dir ./datalake --slo end_to_end=172800
+"""
+import argparse
+import bisect
+import datetime
+import json
+import logging
+import os
+import re
+
+from . import ingest, manifest, metrics
+
+DATASET = "monetarias"
+STAGES = ("polling", "event_grid", "blob_alert", "transform", "end_to_end")
+VARIABLE_STAGES = ("polling", "end_to_end")
+BCRA_TZ = datetime.timezone(datetime.timedelta(hours=-3))
+BUCKETS = (60, 300, 900, 3600, 4 * 3600, 24 * 3600, 48 * 3600, 7 * 24 * 3600)
+DEFAULT_SLO = {
+    "polling": 48 * 3600,
+    "event_grid": 300,
+    "blob_alert": 300,
+    "transform": 2 * 3600,
+    "end_to_end": 50 * 3600,
+}
+MAX_LISTED = 20
+FRACTION_RE = re.compile(r"(\.\d{6})\d+")
+
+
+def parse_time(value):
+    """ISO timestamp → naive UTC ``datetime`` (``None`` if empty or invalid).
+
+    Accepts a ``Z`` suffix, offsets and Event Grid's 7 fractional digits.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(FRACTION_RE.sub(r"\1", value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def published_at(fecha):
+    """Reference publication time of a ``fecha``: its start in Buenos Aires, as naive UTC."""
+    try:
+        day = datetime.date.fromisoformat(fecha[:10])
+    except (TypeError, ValueError):
+        return None
+    start = datetime.datetime.combine(day, datetime.time(), BCRA_TZ)
+    return start.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def load_slo(value=None):
+    """``DEFAULT_SLO`` overridden by ``"stage=seconds,..."`` (``FRESHNESS_SLO_SECONDS``)."""
+    slo = dict(DEFAULT_SLO)
+    value = os.environ.get("FRESHNESS_SLO_SECONDS", "") if value is None else value
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        stage, seconds = item.split("=", 1)
+        if stage.strip() not in STAGES:
+            raise ValueError(f"Unknown freshness stage: {stage}")
+        slo[stage.strip()] = float(seconds)
+    return slo
+
+
+def histogram(lags):
+    """Counts per upper bound in seconds (``le_<s>``) plus ``inf``."""
+    counts = [0] * (len(BUCKETS) + 1)
+    for lag in lags:
+        counts[bisect.bisect_left(BUCKETS, lag)] += 1
+    return dict(zip([f"le_{b}" for b in BUCKETS] + ["inf"], counts))
+
+
+def summarize(lags):
+    if not lags:
+        return {"count": 0}
+    return {
+        "count": len(lags),
+        "p50": metrics.percentile(lags, 50),
+        "p99": metrics.percentile(lags, 99),
+        "max": max(lags),
+        "histogram": histogram(lags),
+    }
+
+
+def _seconds(start, end):
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds()
+
+
+def first_compaction(compactions, ingested):
+    """First compaction at or after ``ingested`` (``None`` if not compacted since)."""
+    i = bisect.bisect_left(compactions, ingested)
+    return compactions[i] if i < len(compactions) else None
+
+
+class Report:
+    """Lags collected per stage and per variable, with the SLO breaches."""
+
+    def __init__(self, slo):
+        self.slo = slo
+        self.lags = {stage: [] for stage in STAGES}
+        self.variables = {}
+        self.breaches = {stage: 0 for stage in STAGES}
+        self.listed = []
+
+    def add(self, stage, lag, **where):
+        if lag is None:
+            return
+        self.lags[stage].append(lag)
+        metrics.record("freshness.lag_s", lag, unit="s", stage=stage)
+        if "idVariable" in where and stage in VARIABLE_STAGES:
+            per_stage = self.variables.setdefault(str(where["idVariable"]), {s: [] for s in VARIABLE_STAGES})
+            per_stage[stage].append(lag)
+        if lag > self.slo.get(stage, float("inf")):
+            self.breaches[stage] += 1
+            metrics.incr("freshness.slo_breaches", stage=stage)
+            if len(self.listed) < MAX_LISTED:
+                self.listed.append(dict(where, stage=stage, lag_s=lag, slo_s=self.slo[stage]))
+
+    def to_dict(self):
+        return {
+            "stages": {stage: summarize(lags) for stage, lags in self.lags.items()},
+            "variables": {
+                id_variable: {stage: summarize(lags) for stage, lags in stages.items()}
+                for id_variable, stages in sorted(self.variables.items(), key=lambda kv: int(kv[0]))
+            },
+            "slo": self.slo,
+            "breaches": {stage: n for stage, n in self.breaches.items() if n},
+            "breach_samples": self.listed,
+        }
+
+
+def _changed_rows(store, ingested):
+    raw = store.read_bytes(ingest.changes_path(DATASET, ingested))
+    return json.loads(raw) if raw else []
+
+
+def scan_partition(store, day, report):
+    """Add the lags of one partition to ``report``; ``False`` if it has no manifest."""
+    doc = manifest.load_manifest(store, day)
+    if doc is None:
+        return False
+    partition = manifest.partition_key(day)
+    compactions = sorted(filter(None, map(parse_time, doc.get("compactions", []))))
+    for name, entry in sorted(doc.get("files", {}).items()):
+        ingested = parse_time(entry.get("ingested_at"))
+        if ingested is None:
+            continue
+        event = parse_time(entry.get("event_time"))
+        report.add("event_grid", _seconds(ingested, event), partition=partition, blob=name)
+        report.add("blob_alert", _seconds(event, parse_time(entry.get("recorded_at"))),
+                   partition=partition, blob=name)
+        compacted = first_compaction(compactions, ingested)
+        if name.startswith("vars_"):
+            report.add("transform", _seconds(ingested, compacted), partition=partition, blob=name)
+            for row in _changed_rows(store, ingested):
+                published = published_at(row.get("fecha"))
+                where = dict(partition=partition, blob=name, idVariable=row.get("idVariable"))
+                report.add("polling", _seconds(published, ingested), **where)
+                report.add("end_to_end", _seconds(published, compacted), **where)
+    return True
+
+
+def report(store, desde, hasta, slo=None):
+    """Freshness report of the partitions in ``[desde, hasta]`` (see the module docstring)."""
+    result = Report(slo or load_slo())
+    scanned = missing = 0
+    for n in range((hasta - desde).days + 1):
+        if scan_partition(store, desde + datetime.timedelta(days=n), result):
+            scanned += 1
+        else:
+            missing += 1
+    doc = dict(result.to_dict(), desde=desde.isoformat(), hasta=hasta.isoformat(),
+               partitions=scanned, partitions_without_manifest=missing)
+    for stage, count in doc["breaches"].items():
+        logging.warning("Freshness SLO breached %d times for %s (> %ss)", count, stage, doc["slo"][stage])
+    return doc
+
+
+def main(argv=None):
+    from .storage import open_store
+
+    parser = argparse.ArgumentParser(description="Lag per stage from BCRA publication to curated Parquet")
+    parser.add_argument("--desde", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--hasta", type=datetime.date.fromisoformat)
+    parser.add_argument("--slo", default=None, help='"stage=seconds,..." over the defaults')
+    parser.add_argument("--local-dir", help="read a local directory instead of AZURE_STORAGE_CONN")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    doc = report(open_store(args.local_dir), args.desde, args.hasta or args.desde, load_slo(args.slo))
+    print(json.dumps(doc, indent=2))
+    return 1 if doc["breaches"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,364 @@
+"""
+Derived indicators for every monetarias variable, computed on aligned arrays.
+
+Curated rows (``id_variable``, ``fecha``, ``valor``) are pivoted into a
+``Panel``: a float64 matrix of variables × calendar days with NaN where BCRA
+published nothing.  Before computing, values are carried forward for up to
+``ffill_limit`` days so weekly and monthly series have a value every day, and
+every indicator is a single NumPy expression over the whole matrix:
+
+* ``diff_1d``: absolute change vs the previous day
+* ``pct_1d`` / ``pct_30d`` / ``pct_yoy``: % change vs 1, 30 and 365 days before
+* ``ma_7`` / ``ma_30``: rolling means over 7 and 30 days
+
+Updates are incremental.  The last ``window_days`` of observed values are kept
+in ``PANEL_PATH``; ``update`` merges the new curated rows into it and only
+recomputes the days from the earliest changed ``fecha`` (an indicator for day
+D only reads ``lookback_days`` before D).  Results are written under
+``processed/indicadores/year=/month=/day=/part-0.parquet``, partitioned by
+``fecha``, so a revision rewrites just the days it affects.
+
+Usage (rebuild from the curated Parquet)::
+
+    python -m src.functions.shared_code.indicators --desde 2024-07-01 --hasta 2025-07-29 \\
+        --local-dir ./datalake
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from . import metrics
+from .compactor import CURATED_FILE, CURATED_PREFIX, dedupe_and_sort, partition_path
+
+INDICATORS_PREFIX = "processed/indicadores"
+PANEL_PATH = "state/indicadores/panel.npz"
+FFILL_LIMIT_DAYS = 45
+REVISION_DAYS = 45
+EPOCH = datetime.date(1970, 1, 1)
+
+Indicator = namedtuple("Indicator", "lookback fn")
+
+
+def _shift(values, lag):
+    shifted = np.full_like(values, np.nan)
+    shifted[:, lag:] = values[:, :-lag]
+    return shifted
+
+
+def diff(lag):
+    return Indicator(lag, lambda v: v - _shift(v, lag))
+
+
+def pct_change(lag):
+    def fn(v):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = v / _shift(v, lag) - 1
+        result[~np.isfinite(result)] = np.nan
+        return result
+    return Indicator(lag, fn)
+
+
+def rolling_mean(window):
+    def fn(v):
+        valid = ~np.isnan(v)
+        sums = np.cumsum(np.where(valid, v, 0.0), axis=1)
+        counts = np.cumsum(valid, axis=1)
+        sums[:, window:] -= sums[:, :-window].copy()
+        counts[:, window:] -= counts[:, :-window].copy()
+        with np.errstate(invalid="ignore"):
+            return np.where(counts == window, sums / window, np.nan)
+    return Indicator(window - 1, fn)
+
+
+DEFAULT_INDICATORS = {
+    "diff_1d": diff(1),
+    "pct_1d": pct_change(1),
+    "pct_30d": pct_change(30),
+    "pct_yoy": pct_change(365),
+    "ma_7": rolling_mean(7),
+    "ma_30": rolling_mean(30),
+}
+
+
+def forward_fill(values, limit):
+    """Carry the last observed value forward for at most ``limit`` columns."""
+    n = values.shape[1]
+    columns = np.arange(n)
+    last = np.where(~np.isnan(values), columns, -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    rows = np.arange(values.shape[0])[:, None]
+    filled = values[rows, np.maximum(last, 0)]
+    filled[(last < 0) | (columns - last > limit)] = np.nan
+    return filled
+
+
+def _days(dates):
+    """``date32``/``datetime64[D]`` array → int64 days since epoch."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class Panel:
+    """Observed values of ``ids`` (rows) for consecutive days from ``start``."""
+
+    def __init__(self, ids, start, values):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.start = int(start)
+        self.values = values
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, np.int64), 0, np.empty((0, 0)))
+
+    @property
+    def end(self):
+        """Last day (days since epoch) covered by the panel."""
+        return self.start + self.values.shape[1] - 1
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    def merge(self, table):
+        """Return ``(panel, first_changed_day)`` with the rows of ``table`` applied.
+
+        ``first_changed_day`` is ``None`` when nothing changed; days appended at
+        the end count as changed even without observations (forward fill).
+        """
+        if not table.num_rows:
+            return self, None
+        ids = table["id_variable"].to_numpy().astype(np.int64)
+        days = _days(table["fecha"].to_numpy())
+        values = pc.cast(table["valor"], pa.float64()).to_numpy(zero_copy_only=False)
+
+        new_ids = np.union1d(self.ids, ids)
+        if len(self):
+            start, end = min(self.start, days.min()), max(self.end, days.max())
+        else:
+            start, end = days.min(), days.max()
+        merged = np.full((len(new_ids), end - start + 1), np.nan)
+        if len(self):
+            rows = np.searchsorted(new_ids, self.ids)
+            merged[rows, self.start - start:self.start - start + len(self)] = self.values
+
+        rows, cols = np.searchsorted(new_ids, ids), days - start
+        previous = merged[rows, cols]
+        changed = ~((previous == values) | (np.isnan(previous) & np.isnan(values)))
+        merged[rows, cols] = values
+
+        candidates = list(days[changed])
+        if len(self) and end > self.end:
+            candidates.append(self.end + 1)
+        elif not len(self):
+            candidates.append(start)
+        first_changed = int(min(candidates)) if candidates else None
+        return Panel(new_ids, start, merged), first_changed
+
+    def trim(self, window_days):
+        """Keep only the last ``window_days`` days."""
+        drop = max(0, len(self) - window_days)
+        if not drop:
+            return self
+        return Panel(self.ids, self.start + drop, self.values[:, drop:])
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(buffer, ids=self.ids, start=np.int64(self.start), values=self.values)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, raw):
+        with np.load(io.BytesIO(raw)) as data:
+            return cls(data["ids"], int(data["start"]), data["values"])
+
+    @classmethod
+    def from_table(cls, table):
+        return cls.empty().merge(table)[0]
+
+
+class IndicatorEngine:
+    """Compute a set of indicators over a ``Panel``, optionally only for its tail."""
+
+    def __init__(self, indicators=None, ffill_limit=FFILL_LIMIT_DAYS):
+        self.indicators = indicators or DEFAULT_INDICATORS
+        self.ffill_limit = ffill_limit
+
+    @property
+    def lookback_days(self):
+        return max(ind.lookback for ind in self.indicators.values())
+
+    @property
+    def window_days(self):
+        """Days of history to keep so that any revision in the last ``REVISION_DAYS`` can be recomputed."""
+        return self.lookback_days + self.ffill_limit + REVISION_DAYS + 1
+
+    def compute(self, panel, since=None):
+        """Indicators of every variable for the days ``>= since`` (all days if ``None``).
+
+        Only ``lookback_days + ffill_limit`` days before ``since`` are read.
+        Returns a table sorted by ``(fecha, id_variable)``; rows without a
+        (forward-filled) ``valor`` are dropped.
+        """
+        since = panel.start if since is None else max(int(since), panel.start)
+        first = since - panel.start
+        offset = min(first, self.lookback_days + self.ffill_limit)
+        with metrics.timer("indicators.compute_ms"):
+            window = panel.values[:, first - offset:]
+            filled = forward_fill(window, self.ffill_limit)
+            columns = {name: ind.fn(filled)[:, offset:] for name, ind in self.indicators.items()}
+            filled = filled[:, offset:]
+
+            n_ids, n_days = filled.shape
+            # orden (fecha, id_variable): cada partición por fecha es un bloque contiguo
+            keep = ~np.isnan(filled.T.ravel())
+            fechas = np.repeat(np.arange(since, since + n_days), n_ids)[keep]
+            table = pa.table({
+                "id_variable": pa.array(np.tile(panel.ids, n_days)[keep], pa.int32()),
+                "fecha": pa.array(fechas.astype("datetime64[D]"), pa.date32()),
+                "valor": pa.array(filled.T.ravel()[keep], pa.float64()),
+                **{name: pa.array(values.T.ravel()[keep], pa.float64(), from_pandas=True)
+                   for name, values in columns.items()},
+            })
+        metrics.record("indicators.rows", table.num_rows)
+        return table
+
+
+def write_indicators(store, table):
+    """Write one ``part-0.parquet`` per ``fecha`` of ``table``; returns the days written."""
+    if not table.num_rows:
+        return []
+    days = _days(table["fecha"].to_numpy())
+    boundaries = np.flatnonzero(np.diff(days)) + 1
+    written = []
+    with metrics.timer("indicators.write_ms"):
+        for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(days)]):
+            day = EPOCH + datetime.timedelta(days=int(days[start]))
+            buffer = io.BytesIO()
+            pq.write_table(table.slice(start, stop - start), buffer, compression="snappy")
+            store.write_bytes(f"{partition_path(INDICATORS_PREFIX, day)}/part-0.parquet",
+                              buffer.getvalue(), content_type="application/vnd.apache.parquet")
+            written.append(day)
+    return written
+
+
+def load_panel(store):
+    raw = store.read_bytes(PANEL_PATH)
+    return Panel.from_bytes(raw) if raw else Panel.empty()
+
+
+def update(store, table, engine=None):
+    """Merge curated rows into the stored panel and rewrite the affected days.
+
+    Returns the list of ``fecha`` partitions written (empty if nothing changed).
+    """
+    engine = engine or IndicatorEngine()
+    stored = load_panel(store)
+    panel, first_changed = stored.merge(table)
+    if first_changed is None:
+        return []
+    if len(stored) >= engine.window_days:
+        # la ventana guardada ya descartó historia: antes de este día el cálculo no es exacto
+        exact_from = stored.start + engine.lookback_days + engine.ffill_limit
+        if first_changed < exact_from:
+            logging.warning("Indicator revisions before %s ignored",
+                            EPOCH + datetime.timedelta(days=exact_from))
+            first_changed = exact_from
+    written = write_indicators(store, engine.compute(panel, since=first_changed))
+    store.write_bytes(PANEL_PATH, panel.trim(engine.window_days).to_bytes(),
+                      content_type="application/octet-stream")
+    logging.info("Indicators rewritten for %d days from %s", len(written), written[:1])
+    return written
+
+
+def read_curated(store, day):
+    raw = store.read_bytes(f"{partition_path(CURATED_PREFIX, day)}/{CURATED_FILE}")
+    if raw is None:
+        return None
+    return pq.read_table(io.BytesIO(raw), columns=["id_variable", "fecha", "valor"])
+
+
+def update_day(store, day, engine=None):
+    """Apply the curated partition of ``day`` (hook after ``compact_day``)."""
+    table = read_curated(store, day)
+    return update(store, table, engine) if table is not None else []
+
+
+def read_curated_range(store, desde, hasta):
+    """Curated tables of the partitions in ``[desde, hasta]`` that exist, in date order."""
+    tables = [read_curated(store, desde + datetime.timedelta(days=n))
+              for n in range((hasta - desde).days + 1)]
+    return [t for t in tables if t is not None]
+
+
+def derive_range(store, desde, hasta, engine=None):
+    """Recompute the indicators of the curated partitions ``[desde, hasta]``.
+
+    Unlike ``update`` this does not go through the stored panel, whose window
+    may no longer reach these days: a panel is built from the partitions plus
+    ``lookback_days + ffill_limit`` days of context before their earliest
+    ``fecha``, and every ``fecha`` from there on is rewritten.  The rows that
+    fall inside the stored panel's window are merged into it, so the next
+    incremental ``update`` starts from the reprocessed values (an empty panel is
+    seeded with the computed one).  Returns the ``fecha`` partitions written.
+    """
+    engine = engine or IndicatorEngine()
+    tables = read_curated_range(store, desde, hasta)
+    if not tables:
+        return []
+    table = dedupe_and_sort(pa.concat_tables(tables))
+    since = pc.min(table["fecha"]).as_py()
+    context_from = since - datetime.timedelta(days=engine.lookback_days + engine.ffill_limit)
+    context = read_curated_range(store, context_from, desde - datetime.timedelta(days=1))
+    # el mismo (id_variable, fecha) puede venir de varias particiones: gana la más reciente
+    panel = Panel.from_table(dedupe_and_sort(pa.concat_tables(context + tables)))
+    written = write_indicators(store, engine.compute(panel, since=(since - EPOCH).days))
+
+    stored = load_panel(store)
+    if not len(stored):
+        store.write_bytes(PANEL_PATH, panel.trim(engine.window_days).to_bytes(),
+                          content_type="application/octet-stream")
+    else:
+        days = _days(table["fecha"].to_numpy())
+        merged, changed = stored.merge(table.filter(pa.array((days >= stored.start) & (days <= stored.end))))
+        if changed is not None:
+            store.write_bytes(PANEL_PATH, merged.to_bytes(), content_type="application/octet-stream")
+    logging.info("Indicators recomputed for %d days from %s", len(written), written[:1])
+    return written
+
+
+def rebuild(store, desde, hasta, engine=None):
+    """Recompute from the curated partitions of ``[desde, hasta]``, replacing the stored panel."""
+    tables = read_curated_range(store, desde, hasta)
+    store.delete(PANEL_PATH)
+    if not tables:
+        return []
+    # el mismo (id_variable, fecha) puede venir de varias particiones: gana la más reciente
+    combined = pa.concat_tables(tables)
+    return update(store, dedupe_and_sort(combined), engine)
+
+
+def main(argv=None):
+    from .storage import open_store
+
+    parser = argparse.ArgumentParser(description="Rebuild derived indicators from the curated Parquet")
+    parser.add_argument("--desde", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--hasta", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--local-dir", help="read/write a local directory instead of AZURE_STORAGE_CONN")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    written = rebuild(open_store(args.local_dir), args.desde, args.hasta)
+    print(json.dumps({"days_written": len(written),
+                      "first": written[0].isoformat() if written else None,
+                      "last": written[-1].isoformat() if written else None}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,263 @@
+"""
+Snapshot ingest shared by the sync and async entry points of ``ingest_bcra``.
+
+For every endpoint (``dataset -> url``) the response is compared against the
+dataset's fingerprint state (``cdc``) and, if anything moved, written as::
+
+    raw/<dataset>/year=YYYY/month=MM/day=DD/vars_<ts><ext>         full snapshot (RAW_FORMAT)
+    changes/<dataset>/year=YYYY/month=MM/day=DD/changes_<ts>.json  moved rows
+    state/monetarias/latest.json                                    (monetarias only)
+
+The deltas live outside ``raw/`` so each ingest fires a single BlobCreated
+for ``blob_alert`` and the manifest counts each record once.
+
+Records are validated first (``quality``); the ones that fail are written to
+``quarantine/<dataset>/year=YYYY/month=MM/day=DD/vars_<ts>.json`` instead,
+along with the snapshot: an unchanged response (the same rejected records
+every poll) writes no quarantine blob either.
+With ``SERIES_DIR`` set the moved rows are also appended to the per-variable
+series files of ``timeseries``.
+
+``ingest_endpoints`` does it serially with ``requests``; ``ingest_endpoints_async``
+fetches with one ``aiohttp`` session and uploads through an async store, with
+fetches and uploads bounded by separate semaphores and snapshot bodies
+streamed in chunks instead of being built as one string.
+"""
+import asyncio
+import datetime
+import json
+import logging
+from collections import namedtuple
+
+from . import cdc, clients, latest, metrics, quality, rawformat, timeseries
+
+LATEST_DATASET = "monetarias"
+CHANGES_PREFIX = "changes"
+
+Output = namedtuple("Output", "path body content_type content_encoding metadata", defaults=(None,))
+
+
+def state_path(dataset):
+    return f"state/{dataset}/fingerprints.json"
+
+
+def changes_path(dataset, now):
+    return (f"{CHANGES_PREFIX}/{dataset}/year={now.year}/month={now.month:02d}/day={now.day:02d}"
+            f"/changes_{now.isoformat()}.json")
+
+
+def plan_outputs(dataset, data, changes, now, raw_format="json", stream=False, prefix=None):
+    """Blobs to write for one changed response, snapshot first.
+
+    With ``stream`` the snapshot bodies are chunk generators (for an upload
+    that streams them); otherwise they are complete strings/bytes.
+    ``prefix`` defaults to ``raw/<dataset>``.  Every blob carries its
+    ``ingested_at`` time as blob metadata (lineage for ``freshness``).
+    """
+    prefix = prefix or f"raw/{dataset}"
+    partition = f"{prefix}/year={now.year}/month={now.month:02d}/day={now.day:02d}"
+    ts_iso = now.isoformat()
+    lineage = {"ingested_at": ts_iso}
+    spec = rawformat.FORMATS[raw_format]
+    if stream:
+        body = rawformat.iter_encode(data, raw_format)
+        snapshot = rawformat.iter_encode(data, "json")
+    else:
+        with metrics.timer("ingest.serialize_ms", format=raw_format):
+            snapshot = json.dumps(data)
+            body = snapshot if raw_format == "json" else rawformat.encode(data, raw_format)
+        metrics.record("ingest.raw_bytes", len(body), unit="By", format=raw_format)
+    outputs = [
+        Output(f"{partition}/vars_{ts_iso}{spec['ext']}", body,
+               spec["content_type"], spec["content_encoding"], lineage),
+        Output(changes_path(dataset, now), json.dumps(changes), "application/json", None, lineage),
+    ]
+    if dataset == LATEST_DATASET:
+        # latest.json siempre en JSON plano: lo sirve el endpoint latest tal cual
+        outputs.append(Output(latest.LATEST_PATH, snapshot, "application/json", None, lineage))
+    return outputs
+
+
+def screen(dataset, data, records, state, now, id_type="int"):
+    """Validate ``records``; returns ``(data, records, quarantine)`` with only the valid ones.
+
+    ``quarantine`` is the ``Output`` with the rejected records (``None`` if all passed).
+    """
+    with metrics.timer("ingest.validate_ms"):
+        checked = quality.validate(records, state, dataset=dataset, id_type=id_type)
+    metrics.incr("quality.records_quarantined", len(checked.rejected), dataset=dataset)
+    metrics.incr("quality.jumps", checked.report["checks"]["jumps"], dataset=dataset)
+    logging.info("QUALITY_REPORT: %s", json.dumps(checked.report))
+    if not checked.rejected:
+        return data, records, None
+    logging.warning("Quarantined %d of %d records", len(checked.rejected), len(records))
+    data = dict(data, results=checked.valid) if isinstance(data, dict) else checked.valid
+    body = json.dumps({"report": checked.report, "rejected": checked.rejected})
+    return data, checked.valid, Output(quality.quarantine_path(dataset, now), body, "application/json", None)
+
+
+def append_series(dataset, changes, now):
+    """Append the moved rows to the series files; a failure is logged, not raised.
+
+    The raw snapshot is the source of truth: ``timeseries.load_raw`` can
+    rebuild the points a failed append missed.
+    """
+    series = timeseries.get_series_store()
+    if series is None:
+        return
+    try:
+        with metrics.timer("ingest.series_append_ms"):
+            series.append_records(dataset, changes, now)
+    except OSError as e:
+        metrics.incr("timeseries.append_failed", dataset=dataset)
+        logging.error(f"Appending {dataset} series failed: {e}")
+
+
+def _skipped(dataset, records):
+    metrics.incr("ingest.snapshots_skipped", dataset=dataset)
+    logging.info("No changes in %d records, skipping upload", len(records))
+
+
+def _written(dataset, records, changes, path):
+    metrics.incr("ingest.snapshots_written", dataset=dataset)
+    metrics.incr("ingest.records_changed", len(changes), dataset=dataset)
+    logging.info("Saved %d records (%d changed) → %s", len(records), len(changes), path)
+    return path
+
+
+# ── sync ──────────────────────────────────────────────────────────
+def fetch_json(session, url, timeout=10):
+    with metrics.timer("ingest.api_latency_ms"):
+        resp = session.get(url, timeout=timeout, verify=False)   # ← desactiva SSL
+    resp.raise_for_status()
+    metrics.record("ingest.response_bytes", len(resp.content), unit="By")
+    with metrics.timer("ingest.json_decode_ms"):
+        return resp.json()
+
+
+def ingest_snapshot(store, dataset, data, now, raw_format="json", prefix=None, id_type="int"):
+    """CDC + writes for one response; returns the snapshot path (``None`` if unchanged)."""
+    records = cdc.extract_records(data)
+    state = cdc.load_state(store, state_path(dataset))
+    data, records, quarantine = screen(dataset, data, records, state, now, id_type)
+    changes = cdc.diff_records(records, state)
+    if not changes:
+        return _skipped(dataset, records)
+
+    if quarantine:
+        store.write_bytes(quarantine.path, quarantine.body, content_type=quarantine.content_type)
+
+    outputs = plan_outputs(dataset, data, changes, now, raw_format, prefix=prefix)
+    with metrics.timer("ingest.upload_ms"):
+        for output in outputs:
+            store.write_bytes(output.path, output.body, content_type=output.content_type,
+                              content_encoding=output.content_encoding, metadata=output.metadata)
+    append_series(dataset, changes, now)
+    # el estado se guarda al final: si algo falla antes, la próxima corrida reintenta
+    cdc.save_state(store, cdc.update_state(state, records), state_path(dataset))
+    return _written(dataset, records, changes, outputs[0].path)
+
+
+def ingest_endpoints(store, endpoints, session=None, now=None, raw_format="json"):
+    """Fetch and ingest every ``dataset -> url`` one after the other."""
+    session = session or clients.get_http_session()
+    now = now or datetime.datetime.utcnow()
+    return {
+        dataset: ingest_snapshot(store, dataset, fetch_json(session, url), now, raw_format)
+        for dataset, url in endpoints.items()
+    }
+
+
+# ── async ─────────────────────────────────────────────────────────
+async def fetch_async(session, url, semaphore, timeout=10, retries=3, backoff=0.5, bucket=None, headers=None):
+    """GET ``url`` under ``semaphore``, retrying 429/5xx and connection errors.
+
+    With ``bucket`` (an ``AsyncTokenBucket``) every attempt takes a token
+    first.  Returns ``(status, headers, body)``; a ``304`` (for conditional
+    ``headers``) comes back with an empty body.
+    """
+    import aiohttp
+
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            async with semaphore:
+                with metrics.timer("ingest.api_latency_ms"):
+                    async with session.get(url, ssl=False, headers=headers,
+                                           timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                        if last or resp.status not in clients.RETRY_STATUS:
+                            resp.raise_for_status()
+                            body = await resp.read()
+                            status, resp_headers = resp.status, resp.headers
+                            break
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if last:
+                raise
+        await asyncio.sleep(backoff * 2 ** attempt)
+    metrics.record("ingest.response_bytes", len(body), unit="By")
+    return status, resp_headers, body
+
+
+async def fetch_json_async(session, url, semaphore, timeout=10, retries=3, backoff=0.5, bucket=None):
+    """``fetch_async`` + JSON decode of the body."""
+    _, _, body = await fetch_async(session, url, semaphore, timeout, retries, backoff, bucket)
+    with metrics.timer("ingest.json_decode_ms"):
+        return json.loads(body)
+
+
+async def ingest_snapshot_async(store, dataset, data, now, semaphore, raw_format="json",
+                                prefix=None, id_type="int"):
+    """Async ``ingest_snapshot``: the outputs are uploaded concurrently under ``semaphore``."""
+    records = cdc.extract_records(data)
+    raw_state = await store.read_bytes(state_path(dataset))
+    state = json.loads(raw_state) if raw_state else {}
+    data, records, quarantine = screen(dataset, data, records, state, now, id_type)
+    changes = cdc.diff_records(records, state)
+    if not changes:
+        return _skipped(dataset, records)
+
+    if quarantine:
+        async with semaphore:
+            await store.write_bytes(quarantine.path, quarantine.body, content_type=quarantine.content_type)
+
+    outputs = plan_outputs(dataset, data, changes, now, raw_format, stream=True, prefix=prefix)
+
+    async def upload(output):
+        async with semaphore:
+            await store.write_bytes(output.path, output.body, content_type=output.content_type,
+                                    content_encoding=output.content_encoding, metadata=output.metadata)
+
+    with metrics.timer("ingest.upload_ms"):
+        await asyncio.gather(*(upload(output) for output in outputs))
+    await asyncio.to_thread(append_series, dataset, changes, now)
+    new_state = cdc.update_state(state, records)
+    await store.write_bytes(state_path(dataset), json.dumps(new_state, separators=(",", ":")))
+    return _written(dataset, records, changes, outputs[0].path)
+
+
+async def ingest_endpoints_async(store, endpoints, session=None, now=None, raw_format="json",
+                                 fetch_concurrency=4, upload_concurrency=8):
+    """Fetch and ingest every ``dataset -> url`` concurrently.
+
+    ``store`` is async (``AsyncBlobStore`` / ``AsyncStoreAdapter``).  A failed
+    endpoint does not cancel the others; the first error is raised once all
+    of them finished.
+    """
+    session = session or clients.get_aiohttp_session()
+    now = now or datetime.datetime.utcnow()
+    fetch_limit = asyncio.Semaphore(fetch_concurrency)
+    upload_limit = asyncio.Semaphore(upload_concurrency)
+
+    async def one(dataset, url):
+        data = await fetch_json_async(session, url, fetch_limit)
+        return await ingest_snapshot_async(store, dataset, data, now, upload_limit, raw_format)
+
+    results = await asyncio.gather(*(one(d, u) for d, u in endpoints.items()), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    for error in errors:
+        logging.error(f"Async ingest failed: {error}")
+    if errors:
+        raise errors[0]
+    return dict(zip(endpoints, results))
@@ -0,0 +1,135 @@
+"""
+Incremental parsing of the records array of a JSON document.
+
+BCRA responses and our ``json`` raw blobs are either a bare list of records
+or an object with the list under ``results`` (plus ``status``/``metadata``).
+``RecordStream`` reads the document from an iterable of byte chunks (an HTTP
+response, a blob download) and yields the records one at a time: only the
+current chunk and the record being decoded are held in memory, never the
+whole document or the list of dicts.  Each record is decoded with the C
+``json`` scanner; the surrounding structure is walked here.
+
+The other members of a wrapping object are small and decoded whole into
+``stream.envelope``, which is complete once the stream is exhausted (the
+members after ``results`` are only known at the end).
+"""
+import codecs
+import json
+import re
+
+WHITESPACE = " \t\n\r"
+NUMBER_START = "-0123456789"
+DELIMITER = re.compile(r"[,\]}\s]")
+_decoder = json.JSONDecoder()
+
+
+class RecordStream:
+    """Iterate the records of a JSON document read from ``chunks`` of bytes."""
+
+    def __init__(self, chunks, key="results"):
+        self.chunks = iter(chunks)
+        self.key = key
+        self.envelope = {}
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    # ── buffer ────────────────────────────────────────────────────
+    def _fill(self):
+        """Append the next chunk, dropping what was already consumed; False at EOF."""
+        if self._eof:
+            return False
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        for chunk in self.chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self._buf += text
+                return True
+        self._buf += self._utf8.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self):
+        """Next non-whitespace character ('' at EOF), without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char == "" or char not in chars:
+            raise ValueError(f"Expected one of {chars!r}, got {char or 'EOF'!r}")
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Decode the JSON value at the cursor, reading more chunks as needed."""
+        if self._peek() in NUMBER_START:
+            # un número no se cierra solo: hace falta ver el delimitador que lo sigue
+            while not DELIMITER.search(self._buf, self._pos) and self._fill():
+                pass
+        while True:
+            try:
+                value, self._pos = _decoder.raw_decode(self._buf, self._pos)
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    # ── structure ─────────────────────────────────────────────────
+    def _array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(",]") == "]":
+                return
+
+    def __iter__(self):
+        first = self._peek()
+        if first == "[":
+            yield from self._array()
+        elif first == "{":
+            self._pos += 1
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            while True:
+                name = self._value()
+                self._expect(":")
+                if name == self.key and self._peek() == "[":
+                    yield from self._array()
+                else:
+                    self.envelope[name] = self._value()
+                if self._expect(",}") == "}":
+                    break
+        elif first:
+            # null u otro escalar: un documento sin registros
+            self._value()
+        if self._peek():
+            raise ValueError("Extra data after the JSON document")
+
+
+def iter_records(chunks, key="results"):
+    """Yield the records of a JSON document given as byte chunks."""
+    return iter(RecordStream(chunks, key))
+
+
+def iter_batches(records, batch_records):
+    """Group an iterable of records into lists of at most ``batch_records``."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_records:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,117 @@
+"""
+In-process cache of the latest monetarias snapshot for the ``latest`` endpoint.
+
+``ingest_bcra`` publishes every changed snapshot to ``LATEST_PATH``; a warm
+worker loads it once per ``ttl_seconds`` (falling back to the newest
+``vars_*`` blob if the pointer does not exist yet) and serves every
+request from memory.  Rendered responses are memoized per filter together
+with their ETag, so a repeated request costs a dict lookup.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from . import cdc, rawformat
+
+LATEST_PATH = "state/monetarias/latest.json"
+RAW_PREFIX = "raw/monetarias"
+MAX_RENDERED = 256
+
+
+def load_latest(store, today=None, lookback_days=7):
+    """Return the latest snapshot bytes: ``LATEST_PATH`` or the newest raw ``vars_`` blob."""
+    raw = store.read_bytes(LATEST_PATH)
+    if raw:
+        return raw
+    today = today or datetime.datetime.utcnow().date()
+    for n in range(lookback_days):
+        day = today - datetime.timedelta(days=n)
+        prefix = f"{RAW_PREFIX}/year={day.year}/month={day.month:02d}/day={day.day:02d}/"
+        # vars_<timestamp> son snapshots de ingest; vars_hist_* son del backfill
+        snapshots = [p for p in store.list(prefix) if p.rsplit("/", 1)[-1].startswith("vars_2")]
+        if snapshots:
+            if rawformat.format_for(snapshots[-1]) == "json":
+                return store.read_bytes(snapshots[-1])
+            return json.dumps({"results": list(rawformat.read_records(store, snapshots[-1]))}).encode()
+    return None
+
+
+class Snapshot:
+    """Parsed snapshot plus memoized ``(body, etag)`` per filter."""
+
+    def __init__(self, raw):
+        self.etag = hashlib.sha1(raw).hexdigest()[:16]
+        self.records = cdc.extract_records(json.loads(raw))
+        self.rendered = {}
+
+    def render(self, ids=None, series=None):
+        key = (frozenset(ids or ()), frozenset(series or ()))
+        cached = self.rendered.get(key)
+        if cached is None:
+            results = [
+                r for r in self.records
+                if (not ids or str(r.get("idVariable")) in ids)
+                and (not series or str(r.get("cdSerie")) in series)
+            ]
+            body = json.dumps({"status": 200, "count": len(results), "results": results}).encode()
+            etag = f'"{self.etag}-{hashlib.sha1(body).hexdigest()[:8]}"'
+            cached = (body, etag)
+            if len(self.rendered) < MAX_RENDERED:
+                self.rendered[key] = cached
+        return cached
+
+
+class LatestCache:
+    """TTL cache around a ``loader() -> bytes`` with single-flight refresh."""
+
+    def __init__(self, loader, ttl_seconds=60, clock=time.monotonic):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.snapshot = None
+        self.expires_at = 0
+        self.lock = threading.Lock()
+
+    def update(self, raw):
+        """Replace the snapshot (e.g. right after an ingest in the same process)."""
+        snapshot = Snapshot(raw)
+        if self.snapshot is None or snapshot.etag != self.snapshot.etag:
+            self.snapshot = snapshot
+        self.expires_at = self.clock() + self.ttl_seconds
+
+    def get(self):
+        if self.snapshot is not None and self.clock() < self.expires_at:
+            return self.snapshot
+        with self.lock:
+            if self.snapshot is not None and self.clock() < self.expires_at:
+                return self.snapshot
+            try:
+                raw = self.loader()
+            except Exception as e:
+                if self.snapshot is None:
+                    raise
+                # se sigue sirviendo el snapshot anterior hasta el próximo intento
+                logging.warning(f"Latest snapshot refresh failed, serving stale copy: {e}")
+                self.expires_at = self.clock() + self.ttl_seconds
+                return self.snapshot
+            if raw is not None:
+                self.update(raw)
+            return self.snapshot
+
+
+_cache = None
+
+
+def get_cache(ttl_seconds=None):
+    global _cache
+    if _cache is None:
+        from .storage import open_store
+
+        store = open_store()
+        ttl = ttl_seconds or int(os.environ.get("LATEST_CACHE_TTL_SECONDS", 60))
+        _cache = LatestCache(lambda: load_latest(store), ttl_seconds=ttl)
+    return _cache
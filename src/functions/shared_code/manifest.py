@@ -0,0 +1,281 @@
+"""
+Partition manifests for ``raw/monetarias``, maintained by ``blob_alert``.
+
+Instead of listing ``raw/monetarias/year=/month=/day=`` every consumer reads
+one small document:
+
+* ``state/manifests/monetarias/year=YYYY/month=MM/day=DD/manifest.json``:
+  one entry per blob of the partition (``name``, ``size``, ``records``,
+  ``min_fecha``, ``max_fecha``, ``sha256``) with its lineage timestamps
+  (``ingested_at`` from the blob name, ``event_time`` and ``recorded_at``
+  from ``blob_alert``), plus the last ``MAX_COMPACTIONS`` times the
+  partition was compacted to Parquet (``compactions``).
+* ``state/manifests/monetarias/index.json``: per partition, the number of
+  files, bytes and records and its ``min_fecha`` / ``max_fecha``.
+
+Both live outside ``raw/monetarias`` so writing them does not fire Event Grid.
+Updates are read-modify-write with ETag-conditional writes, retried when a
+concurrent ``blob_alert`` got there first.  Partitions without a manifest
+(data written before it existed, or local runs without Event Grid) fall back
+to listing; ``python -m src.functions.shared_code.manifest`` rebuilds them.
+A manifest last updated before its partition closed (the UTC day plus
+``MANIFEST_SETTLE_SECONDS``) may be missing blobs still on their way through
+Event Grid, so ``partition_blobs`` merges it with a listing.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+
+from . import metrics, rawformat
+from .events import parse_partition
+from .storage import PreconditionFailed
+
+RAW_PREFIX = "raw/monetarias"
+MANIFEST_PREFIX = "state/manifests/monetarias"
+INDEX_PATH = f"{MANIFEST_PREFIX}/index.json"
+MANIFEST_FILE = "manifest.json"
+MAX_COMPACTIONS = 200
+LINEAGE_FIELDS = ("event_time", "recorded_at")
+SETTLE = datetime.timedelta(seconds=int(os.environ.get("MANIFEST_SETTLE_SECONDS", 3600)))
+INGESTED_RE = re.compile(r"^vars_(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?)Z?\.")
+
+
+def partition_key(day):
+    return day.isoformat()
+
+
+def manifest_path(day):
+    return f"{MANIFEST_PREFIX}/year={day.year}/month={day.month:02d}/day={day.day:02d}/{MANIFEST_FILE}"
+
+
+def day_of(blob_name):
+    """Partition day of a ``raw/monetarias/year=/month=/day=/...`` blob (``None`` if absent or malformed)."""
+    parts = parse_partition(blob_name)
+    if not parts:
+        return None
+    try:
+        return datetime.date(int(parts["year"]), int(parts["month"]), int(parts["day"]))
+    except ValueError:
+        # day=xx o month=13: reintentar el evento no lo arregla
+        return None
+
+
+def ingested_at(blob_name):
+    """Ingest time of a ``vars_<ts>`` snapshot (``None`` for other blobs)."""
+    match = INGESTED_RE.match(blob_name.rsplit("/", 1)[-1])
+    return match.group("ts") if match else None
+
+
+def describe(store, path):
+    """Manifest entry of one raw blob, streaming its content once."""
+    digest = hashlib.sha256()
+    size = 0
+
+    def chunks():
+        nonlocal size
+        for chunk in store.iter_chunks(path):
+            digest.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+    records, fechas = 0, []
+    for record in rawformat.iter_records(chunks(), rawformat.format_for(path)):
+        records += 1
+        if record.get("fecha"):
+            fechas.append(record["fecha"][:10])
+    return {
+        "name": path.rsplit("/", 1)[-1],
+        "size": size,
+        "records": records,
+        "min_fecha": min(fechas, default=None),
+        "max_fecha": max(fechas, default=None),
+        "sha256": digest.hexdigest(),
+        "ingested_at": ingested_at(path),
+    }
+
+
+def update_json(store, path, mutate, retries=50, backoff=0.05):
+    """Apply ``mutate(doc) -> doc`` to the JSON at ``path`` with ETag-conditional writes."""
+    for attempt in range(retries):
+        raw, etag = store.read_versioned(path)
+        doc = mutate(json.loads(raw) if raw else {})
+        try:
+            store.write_if_match(path, json.dumps(doc, sort_keys=True), etag)
+            return doc
+        except PreconditionFailed:
+            metrics.incr("manifest.write_conflicts")
+            time.sleep(backoff * random.uniform(0.5, 1.5) * min(2 ** attempt, 32))
+    raise PreconditionFailed(f"{path}: gave up after {retries} conflicting writes")
+
+
+def summarize(manifest):
+    files = manifest.get("files", {}).values()
+    mins = [f["min_fecha"] for f in files if f.get("min_fecha")]
+    maxs = [f["max_fecha"] for f in files if f.get("max_fecha")]
+    return {
+        "files": len(files),
+        "bytes": sum(f["size"] for f in files),
+        "records": sum(f["records"] for f in files),
+        "min_fecha": min(mins, default=None),
+        "max_fecha": max(maxs, default=None),
+    }
+
+
+def record_entries(store, day, entries, replace=False):
+    """Add ``entries`` to the manifest of ``day`` (or replace all of them) and refresh the index."""
+    now = datetime.datetime.utcnow().isoformat()
+
+    def add(manifest):
+        previous = manifest.get("files", {})
+        if replace:
+            manifest["files"] = {}
+        files = manifest.setdefault("files", {})
+        for entry in entries:
+            # un rebuild no conoce los tiempos de Event Grid: se conservan los registrados
+            old = previous.get(entry["name"], {})
+            files[entry["name"]] = dict({k: old[k] for k in LINEAGE_FIELDS if k in old}, **entry)
+        manifest.update(partition=partition_key(day), updated_at=now)
+        return manifest
+
+    with metrics.timer("manifest.update_ms"):
+        manifest = update_json(store, manifest_path(day), add)
+
+        def refresh(index):
+            # se relee el manifest dentro del CAS: un resumen calculado antes podría
+            # pisar el de un blob_alert concurrente que escribió el índice en el medio
+            latest = load_manifest(store, day) or manifest
+            summary = dict(summarize(latest), updated_at=now)
+            index.setdefault("partitions", {})[partition_key(day)] = summary
+            index["updated_at"] = now
+            return index
+
+        update_json(store, INDEX_PATH, refresh)
+    return manifest
+
+
+def record_blobs(store, blob_names, lineage=None):
+    """Describe ``blob_names`` and record them, one manifest update per partition.
+
+    ``lineage`` maps blob names to extra entry fields (``event_time``,
+    ``recorded_at``).
+    """
+    lineage = lineage or {}
+    by_day = {}
+    for name in blob_names:
+        day = day_of(name)
+        if day is None:
+            logging.warning("Not recording %s: no valid year=/month=/day= partition", name)
+            continue
+        by_day.setdefault(day, []).append(dict(describe(store, name), **lineage.get(name, {})))
+    for day, entries in by_day.items():
+        record_entries(store, day, entries)
+    return by_day
+
+
+def record_compaction(store, day, compacted_at):
+    """Append ``compacted_at`` to the compactions of ``day``'s manifest.
+
+    Partitions without a manifest are left alone: creating one here would
+    hide their blobs from ``partition_blobs`` until it is rebuilt.
+    """
+    if load_manifest(store, day) is None:
+        return False
+
+    def add(manifest):
+        compactions = manifest.get("compactions", []) + [compacted_at]
+        manifest["compactions"] = sorted(compactions)[-MAX_COMPACTIONS:]
+        return manifest
+
+    update_json(store, manifest_path(day), add)
+    return True
+
+
+def load_manifest(store, day):
+    raw = store.read_bytes(manifest_path(day))
+    return json.loads(raw) if raw else None
+
+
+def load_index(store):
+    raw = store.read_bytes(INDEX_PATH)
+    return json.loads(raw) if raw else {"partitions": {}}
+
+
+def is_settled(manifest, day):
+    """Whether ``manifest`` was updated after ``day``'s partition closed (plus ``SETTLE``).
+
+    Ingest writes into the partition of the current UTC day, so by then every
+    snapshot of the day has been recorded or its event has failed.
+    """
+    closed = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time()) + SETTLE
+    return manifest.get("updated_at", "") >= closed.isoformat()
+
+
+def partition_blobs(store, day, prefix=""):
+    """Blob paths of ``day`` whose name starts with ``prefix``, from the manifest.
+
+    ``None`` when the partition has no manifest (callers list instead).  A
+    manifest that is not settled yet is merged with a listing of the
+    partition; the blobs it was missing are counted in
+    ``manifest.unrecorded_blobs``.
+    """
+    manifest = load_manifest(store, day)
+    if manifest is None:
+        return None
+    base = f"{RAW_PREFIX}/year={day.year}/month={day.month:02d}/day={day.day:02d}"
+    paths = {f"{base}/{name}" for name in manifest.get("files", {}) if name.startswith(prefix)}
+    if not is_settled(manifest, day):
+        listed = {p for p in store.list(base + "/") if p.rsplit("/", 1)[-1].startswith(prefix)}
+        missing = listed - paths
+        if missing:
+            metrics.incr("manifest.unrecorded_blobs", len(missing))
+            logging.warning("Manifest of %s is missing %d blobs, using the listing", partition_key(day),
+                            len(missing))
+        paths |= listed
+    return sorted(paths)
+
+
+def days_with_fechas(index, desde, hasta):
+    """Partition days whose ``[min_fecha, max_fecha]`` overlaps ``[desde, hasta]``."""
+    desde, hasta = desde.isoformat(), hasta.isoformat()
+    return sorted(
+        datetime.date.fromisoformat(key)
+        for key, summary in index.get("partitions", {}).items()
+        if summary.get("min_fecha") and summary["min_fecha"] <= hasta and summary["max_fecha"] >= desde
+    )
+
+
+def rebuild(store, desde, hasta):
+    """(Re)build the manifests of ``[desde, hasta]`` by listing the raw partitions."""
+    rebuilt = {}
+    for n in range((hasta - desde).days + 1):
+        day = desde + datetime.timedelta(days=n)
+        prefix = f"{RAW_PREFIX}/year={day.year}/month={day.month:02d}/day={day.day:02d}/"
+        names = store.list(prefix)
+        if names:
+            record_entries(store, day, [describe(store, name) for name in names], replace=True)
+            rebuilt[partition_key(day)] = len(names)
+    return rebuilt
+
+
+def main(argv=None):
+    from .storage import open_store
+
+    parser = argparse.ArgumentParser(description="Rebuild raw monetarias partition manifests")
+    parser.add_argument("--desde", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--hasta", type=datetime.date.fromisoformat)
+    parser.add_argument("--local-dir", help="read/write a local directory instead of AZURE_STORAGE_CONN")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(json.dumps(rebuild(open_store(args.local_dir), args.desde, args.hasta or args.desde)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
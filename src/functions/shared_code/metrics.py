@@ -0,0 +1,166 @@
+"""
+Stage timers and counters for the pipeline.
+
+Metrics are recorded as numbers through an exporter, not parsed out of log
+lines.  The default exporter sends them through the OpenTelemetry metrics
+API (exported to Application Insights once ``azure-monitor-opentelemetry``
+is configured; a no-op otherwise).  Tests and benchmarks install an
+``InMemoryExporter`` to read p50/p99 per stage::
+
+    exporter = metrics.set_exporter(metrics.InMemoryExporter())
+    with metrics.timer("ingest.upload_ms"):
+        store.write_bytes(path, body)
+    exporter.summary()["ingest.upload_ms"]["p99"]
+"""
+import functools
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+METER_NAME = "bcra_pipeline"
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (``q`` in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+class InMemoryExporter:
+    """Keep the last ``max_samples`` values per histogram and counter totals."""
+
+    def __init__(self, max_samples=10_000):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self.counters = defaultdict(float)
+
+    def record(self, name, value, unit, attributes):
+        with self.lock:
+            self.histograms[name].append(value)
+
+    def add(self, name, amount, unit, attributes):
+        with self.lock:
+            self.counters[name] += amount
+
+    def values(self, name):
+        with self.lock:
+            return list(self.histograms.get(name, ()))
+
+    def summary(self):
+        with self.lock:
+            histograms = {name: list(values) for name, values in self.histograms.items()}
+            counters = dict(self.counters)
+        result = {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p99": percentile(values, 99),
+                "max": max(values),
+            }
+            for name, values in histograms.items() if values
+        }
+        result.update({name: {"total": total} for name, total in counters.items()})
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+class OpenTelemetryExporter:
+    """Forward metrics to OpenTelemetry histograms and counters."""
+
+    def __init__(self, meter_name=METER_NAME):
+        from opentelemetry import metrics as otel_metrics
+
+        self.meter = otel_metrics.get_meter(meter_name)
+        self.instruments = {}
+        self.lock = threading.Lock()
+
+    def _instrument(self, kind, name, unit):
+        key = (kind, name)
+        instrument = self.instruments.get(key)
+        if instrument is None:
+            with self.lock:
+                instrument = self.instruments.get(key)
+                if instrument is None:
+                    create = (self.meter.create_histogram if kind == "histogram"
+                              else self.meter.create_counter)
+                    instrument = self.instruments[key] = create(name, unit=unit)
+        return instrument
+
+    def record(self, name, value, unit, attributes):
+        self._instrument("histogram", name, unit).record(value, attributes=attributes)
+
+    def add(self, name, amount, unit, attributes):
+        self._instrument("counter", name, unit).add(amount, attributes=attributes)
+
+
+class NoopExporter:
+    def record(self, name, value, unit, attributes):
+        pass
+
+    def add(self, name, amount, unit, attributes):
+        pass
+
+
+_exporter = None
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        try:
+            _exporter = OpenTelemetryExporter()
+        except ImportError:
+            _exporter = NoopExporter()
+    return _exporter
+
+
+def set_exporter(exporter):
+    """Install ``exporter`` process-wide and return it."""
+    global _exporter
+    _exporter = exporter
+    return exporter
+
+
+def record(name, value, unit="1", **attributes):
+    """Record one histogram sample."""
+    get_exporter().record(name, value, unit, attributes)
+
+
+def incr(name, amount=1, unit="1", **attributes):
+    """Increment a counter."""
+    get_exporter().add(name, amount, unit, attributes)
+
+
+class timer:
+    """Time a block (``with``) or every call of a function (decorator) in milliseconds."""
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.elapsed_ms = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
+        attributes = dict(self.attributes, success=exc_type is None)
+        get_exporter().record(self.name, self.elapsed_ms, "ms", attributes)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(self.name, **self.attributes):
+                return fn(*args, **kwargs)
+        return wrapper
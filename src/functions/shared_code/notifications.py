@@ -0,0 +1,354 @@
+"""
+Windowed notification digests for processed blobs.
+
+Instead of one outbound message per blob, ``blob_alert`` appends the blob's
+metadata to a durable buffer and a ``NotificationDigest`` flushes one summary
+per window (``window_seconds``) or as soon as ``max_items`` blobs are
+buffered, with counts per ``year-month-day`` partition, the blobs whose
+handlers failed and the quarantined snapshots.
+
+Buffers:
+
+* ``FileBuffer``: JSON lines in a local file, guarded by ``flock``.
+* ``StoreBuffer``: one small entry per blob under a store prefix (blob
+  storage in production), so concurrent writers never contend; ``drain``
+  claims each entry with an ETag-conditional delete, so concurrent flushes
+  never send the same entry twice.
+
+Sinks are coroutines that share one pooled ``aiohttp`` session
+(``clients.get_aiohttp_session``), kept across flushes on the digest's own
+event loop.  ``add_many`` buffers a whole batch and checks ``due()`` once.
+Delivery is tracked per sink: the entries a sink failed to receive are
+requeued for that sink only (``sinks`` in the entry), so a sink that never
+fails (``LogSink``) does not hide a failing webhook.
+"""
+import asyncio
+import atexit
+import datetime
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+
+PIPELINE_NAME = "Azure BCRA Monetarias"
+MAX_LISTED_FAILURES = 20
+
+
+class FileBuffer:
+    """Buffer entries as JSON lines in a local file."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _locked(self):
+        fh = open(self.path, "a+")
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        return fh
+
+    def append(self, entry):
+        self.extend([entry])
+
+    def extend(self, entries):
+        with self._locked() as fh:
+            fh.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+    def stats(self):
+        """``(count, oldest buffered_at)`` of the pending entries."""
+        with self._locked() as fh:
+            fh.seek(0)
+            times = [json.loads(line).get("buffered_at", 0) for line in fh if line.strip()]
+        return len(times), min(times, default=None)
+
+    def drain(self):
+        with self._locked() as fh:
+            fh.seek(0)
+            entries = [json.loads(line) for line in fh if line.strip()]
+            fh.truncate(0)
+        return entries
+
+
+class StoreBuffer:
+    """Buffer entries as individual objects under ``prefix`` in a store."""
+
+    def __init__(self, store, prefix="state/notifications/pending/"):
+        self.store = store
+        self.prefix = prefix
+
+    def append(self, entry):
+        # el timestamp va en el nombre: stats() no necesita descargar las entradas
+        micros = int(entry.get("buffered_at", time.time()) * 1_000_000)
+        self.store.write_bytes(f"{self.prefix}{micros:017d}_{uuid.uuid4().hex[:8]}.json",
+                               json.dumps(entry))
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def stats(self):
+        """``(count, oldest buffered_at)`` of the pending entries, from a single listing."""
+        names = self.store.list(self.prefix)
+        if not names:
+            return 0, None
+        return len(names), int(names[0][len(self.prefix):].split("_")[0]) / 1_000_000
+
+    def drain(self):
+        from .storage import PreconditionFailed
+
+        entries = []
+        for path in self.store.list(self.prefix):
+            raw, etag = self.store.read_versioned(path)
+            if raw is None:
+                continue
+            try:
+                self.store.delete_if_match(path, etag)
+            except PreconditionFailed:
+                # otro flush ya reclamó esta entrada
+                continue
+            entries.append(json.loads(raw))
+        return entries
+
+
+def build_digest(entries):
+    """Aggregate buffered entries into one digest document.
+
+    A blob with a ``failed`` entry is not also counted as succeeded (its
+    ``ok`` entry is buffered when it is received, before the other handlers
+    finish).
+    """
+    failures = [e for e in entries if e.get("status") == "failed"]
+    quarantined = [e for e in entries if e.get("status") == "quarantined"]
+    failed_blobs = {e.get("blob_name") for e in failures}
+    succeeded = [e for e in entries
+                 if e.get("status", "ok") == "ok" and e.get("blob_name") not in failed_blobs]
+    reported = succeeded + failures + quarantined
+    times = sorted(e["processed_time"] for e in entries if e.get("processed_time"))
+    return {
+        "total": len(reported),
+        "succeeded": len(succeeded),
+        "failed": len(failures),
+        "quarantined": len(quarantined),
+        "partitions": dict(sorted(Counter(
+            f"{e.get('year', 'N/A')}-{e.get('month', 'N/A')}-{e.get('day', 'N/A')}" for e in reported
+        ).items())),
+        "failures": [
+            {"blob_name": e.get("blob_name"), "error": e.get("error")}
+            for e in (failures + quarantined)[:MAX_LISTED_FAILURES]
+        ],
+        "window_start": times[0] if times else None,
+        "window_end": times[-1] if times else None,
+    }
+
+
+def format_digest(digest):
+    lines = [
+        f"🔔 BCRA Pipeline Alert - Resumen de {digest['total']} archivos procesados",
+        "",
+        f"🕐 Ventana: {digest['window_start']} → {digest['window_end']}",
+        f"✅ Procesados: {digest['succeeded']}",
+        f"❌ Fallidos: {digest['failed']}",
+        f"🚧 En cuarentena: {digest.get('quarantined', 0)}",
+        "",
+        "📅 Particiones:",
+    ]
+    lines += [f"   • {partition}: {count}" for partition, count in digest["partitions"].items()]
+    if digest["failures"]:
+        lines += ["", "⚠️ Fallos:"]
+        lines += [f"   • {f['blob_name']}: {f['error']}" for f in digest["failures"]]
+    lines += ["", f"🏛️ Pipeline: {PIPELINE_NAME}"]
+    return "\n".join(lines)
+
+
+class LogSink:
+    """Write the digest to the function log (picked up by Application Insights)."""
+
+    name = "log"
+
+    async def send(self, session, digest):
+        logging.info(f"BCRA_NOTIFICATION: {format_digest(digest)}")
+
+
+class WebhookSink:
+    """POST the digest to a Teams or Slack incoming webhook."""
+
+    def __init__(self, url, kind="slack", timeout=10):
+        self.url = url
+        self.kind = kind
+        self.timeout = timeout
+        # el nombre se guarda en las entradas reencoladas: sin la URL (lleva el token)
+        self.name = f"{kind}:{hashlib.sha256(url.encode()).hexdigest()[:12]}"
+
+    def payload(self, digest):
+        text = format_digest(digest)
+        if self.kind == "teams":
+            return {"@type": "MessageCard", "@context": "https://schema.org/extensions",
+                    "summary": "BCRA Pipeline Alert", "text": text.replace("\n", "<br>")}
+        return {"text": text}
+
+    async def send(self, session, digest):
+        import aiohttp
+
+        async with session.post(self.url, json=self.payload(digest),
+                                timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+            resp.raise_for_status()
+
+
+async def _send_all(batches, pool_size):
+    """Send every ``(sinks, digest)`` batch over one pooled session; results per batch."""
+    from . import clients
+
+    session = clients.get_aiohttp_session(pool_size)
+    return await asyncio.gather(*(
+        asyncio.gather(*(sink.send(session, digest) for sink in sinks), return_exceptions=True)
+        for sinks, digest in batches
+    ))
+
+
+def sinks_from_env():
+    """``LogSink`` plus one ``WebhookSink`` per ``NOTIFY_WEBHOOK_URLS`` entry.
+
+    Entries are ``kind=url`` (``teams=https://...``) or a bare Slack URL.
+    """
+    sinks = [LogSink()]
+    for item in filter(None, os.environ.get("NOTIFY_WEBHOOK_URLS", "").split(",")):
+        kind, _, url = item.strip().partition("=")
+        sinks.append(WebhookSink(url, kind) if url else WebhookSink(kind))
+    return sinks
+
+
+class NotificationDigest:
+    """Buffer processed-blob metadata and flush it as periodic digests."""
+
+    def __init__(self, buffer, sinks, window_seconds=900, max_items=100, pool_size=10,
+                 clock=time.time):
+        self.buffer = buffer
+        self.sinks = sinks
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self.pool_size = pool_size
+        self.clock = clock
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _entry(self, metadata, status="ok", error=None):
+        entry = dict(metadata, status=status, buffered_at=self.clock())
+        if error:
+            entry["error"] = str(error)
+        return entry
+
+    def add(self, metadata, status="ok", error=None):
+        return self.add_many([(metadata, status, error)])
+
+    def add_many(self, items):
+        """Buffer ``(metadata, status, error)`` items in one append; checks ``due()`` once."""
+        entries = [self._entry(*item) for item in items]
+        if not entries:
+            return None
+        self.buffer.extend(entries)
+        return self.maybe_flush()
+
+    def due(self):
+        count, oldest = self.buffer.stats()
+        if not count:
+            return False
+        return count >= self.max_items or self.clock() - oldest >= self.window_seconds
+
+    def maybe_flush(self):
+        """Flush if the window elapsed or enough blobs are buffered; returns the digest sent."""
+        if self.due():
+            return self.flush()
+        return None
+
+    def _run(self, coro):
+        # loop propio y persistente: la sesión aiohttp cacheada por loop sobrevive entre flushes
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            return self._loop.run_until_complete(coro)
+
+    def close(self):
+        """Close the pooled session and the digest's event loop."""
+        from . import clients
+
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.run_until_complete(clients.aclose())
+                self._loop.close()
+                self._loop = None
+
+    def flush(self):
+        """Send the buffered entries; returns the digest of those delivered to some sink.
+
+        Entries requeued by an earlier flush only go to the sinks listed in
+        their ``sinks``; the entries a sink fails to receive are requeued for
+        that sink alone.
+        """
+        entries = self.buffer.drain()
+        if not entries:
+            return None
+        names = [sink.name for sink in self.sinks]
+        groups = {}
+        for entry in entries:
+            targets = tuple(n for n in names if n in entry.get("sinks", names))
+            if not targets:
+                logging.warning(f"Dropping notification for removed sinks {entry.get('sinks')}")
+                continue
+            groups.setdefault(targets, []).append(entry)
+
+        batches = []
+        for targets, group in groups.items():
+            digest = build_digest(group)
+            digest["flushed_at"] = datetime.datetime.utcnow().isoformat()
+            batches.append(([sink for sink in self.sinks if sink.name in targets], digest))
+        sent = self._run(_send_all(batches, self.pool_size)) if batches else []
+
+        delivered = []
+        for group, (sinks, _), results in zip(groups.values(), batches, sent):
+            failed = []
+            for sink, result in zip(sinks, results):
+                if isinstance(result, Exception):
+                    logging.error(f"Notification sink {sink.name} failed: {result}")
+                    failed.append(sink.name)
+            if failed:
+                # solo los sinks que fallaron vuelven a recibir estas entradas en la próxima ventana
+                self.buffer.extend([dict(entry, sinks=failed) for entry in group])
+            if len(failed) < len(sinks):
+                delivered += group
+        if not delivered:
+            return None
+        digest = build_digest(delivered)
+        digest["flushed_at"] = datetime.datetime.utcnow().isoformat()
+        return digest
+
+
+_notifier = None
+
+
+def get_notifier():
+    """Process-wide ``NotificationDigest`` configured from the environment.
+
+    Buffers in blob storage when ``AZURE_STORAGE_CONN`` is set, otherwise in
+    ``NOTIFY_BUFFER_FILE``.  ``NOTIFY_WINDOW_SECONDS`` / ``NOTIFY_MAX_BLOBS``
+    control when a digest is flushed.
+    """
+    global _notifier
+    if _notifier is None:
+        if os.environ.get("AZURE_STORAGE_CONN"):
+            from .storage import open_store
+
+            buffer = StoreBuffer(open_store())
+        else:
+            buffer = FileBuffer(os.environ.get("NOTIFY_BUFFER_FILE", "/tmp/bcra_notifications.jsonl"))
+        _notifier = NotificationDigest(
+            buffer,
+            sinks_from_env(),
+            window_seconds=int(os.environ.get("NOTIFY_WINDOW_SECONDS", 900)),
+            max_items=int(os.environ.get("NOTIFY_MAX_BLOBS", 100)),
+        )
+        atexit.register(_notifier.close)
+    return _notifier
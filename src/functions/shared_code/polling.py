@@ -0,0 +1,195 @@
+"""
+Conditional and adaptive polling of the registry endpoints.
+
+Conditional requests: the validators of the last response (``ETag``,
+``Last-Modified``) are sent back as ``If-None-Match`` / ``If-Modified-Since``;
+a ``304`` means nothing to download or parse.  For servers that ignore them
+the body's sha256 is compared with the last one, so an identical response
+skips parsing, validation and CDC.
+
+Adaptive polling: every time an endpoint returns new data, the interval in
+which it was published (last poll, now] is added to a ``PublicationProfile``
+of ``SLOT_MINUTES`` slots of the day (UTC), decayed so that old habits fade.
+Once it has ``MIN_OBSERVATIONS`` publications, the endpoint is polled every
+``hot_minutes`` in the slots where BCRA usually publishes (and one slot
+around them) and every ``cold_minutes`` elsewhere.  Before that, and for
+endpoints with ``polling="schedule"``, the NCRONTAB ``schedule`` decides.
+The first profile is seeded from the timestamps of the existing raw snapshots.
+
+Every decision is logged as ``POLL_DECISION`` and counted in
+``polling.decisions`` (``decision``, ``reason``); the body bytes a ``304``
+did not download go to ``polling.bytes_saved``.  The state of every
+endpoint (validators, profile, last decisions) is kept in ``STATE_PATH``.
+"""
+import datetime
+import hashlib
+import json
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from . import metrics
+
+STATE_PATH = "state/scheduler/polling.json"
+SLOT_MINUTES = 15
+SLOTS = 24 * 60 // SLOT_MINUTES
+DECAY = 0.97
+HOT_SHARE = 0.25
+HOT_MARGIN_SLOTS = 1
+MIN_OBSERVATIONS = 5
+HOT_MINUTES = 5
+COLD_MINUTES = 120
+SEED_DAYS = 28
+SEED_SPREAD_MINUTES = 60
+MAX_DECISIONS = 50
+SLACK = datetime.timedelta(seconds=30)
+
+Decision = namedtuple("Decision", "poll reason")
+Fetched = namedtuple("Fetched", "outcome payload body_bytes validators")
+
+
+class PublicationProfile:
+    """Decayed count of publications per ``SLOT_MINUTES`` slot of the day."""
+
+    def __init__(self, counts=None, observations=0):
+        self.counts = np.zeros(SLOTS) if counts is None else np.asarray(counts, float)
+        self.observations = observations
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["counts"], data["observations"]) if data else cls()
+
+    def to_dict(self):
+        return {"counts": [round(c, 6) for c in self.counts.tolist()], "observations": self.observations}
+
+    @staticmethod
+    def slot(moment):
+        return (moment.hour * 60 + moment.minute) // SLOT_MINUTES
+
+    def observe(self, start, end):
+        """One publication somewhere in ``(start, end]``, spread evenly over its slots."""
+        start = max(start, end - datetime.timedelta(days=1) + datetime.timedelta(minutes=SLOT_MINUTES))
+        first, minutes = self.slot(start), int((end - start).total_seconds() // 60)
+        slots = (first + np.arange(minutes // SLOT_MINUTES + 1)) % SLOTS
+        self.counts *= DECAY
+        np.add.at(self.counts, slots, 1.0 / len(slots))
+        self.observations += 1
+
+    @property
+    def learned(self):
+        return self.observations >= MIN_OBSERVATIONS
+
+    def hot_slots(self):
+        peak = self.counts.max()
+        hot = self.counts >= HOT_SHARE * peak if peak > 0 else np.zeros(SLOTS, bool)
+        for shift in range(1, HOT_MARGIN_SLOTS + 1):
+            hot = hot | np.roll(hot, shift) | np.roll(hot, -shift)
+        return hot
+
+    def is_hot(self, moment):
+        return bool(self.hot_slots()[self.slot(moment)])
+
+
+def seed_prefixes(prefix, now, days=SEED_DAYS):
+    """Raw partition prefixes of the last ``days`` days, oldest first."""
+    return [
+        f"{prefix}/year={d.year}/month={d.month:02d}/day={d.day:02d}/"
+        for d in ((now - datetime.timedelta(days=n)).date() for n in range(days, -1, -1))
+    ]
+
+
+def seed_profile(paths):
+    """Profile from the ``vars_<timestamp>`` snapshots among ``paths`` (oldest first).
+
+    The old timer polled hourly, so each snapshot counts as a publication in
+    the ``SEED_SPREAD_MINUTES`` before it.
+    """
+    profile = PublicationProfile()
+    spread = datetime.timedelta(minutes=SEED_SPREAD_MINUTES)
+    for path in paths:
+        name = path.rsplit("/", 1)[-1]
+        if not name.startswith("vars_2"):
+            continue
+        try:
+            stamp = datetime.datetime.fromisoformat(name[len("vars_"):].split(".", 1)[0])
+        except ValueError:
+            continue
+        profile.observe(stamp - spread, stamp)
+    return profile
+
+
+def decide(endpoint, state, now, schedule_due, hot_minutes=HOT_MINUTES, cold_minutes=COLD_MINUTES):
+    """Whether to poll ``endpoint`` at ``now``; ``schedule_due`` is its NCRONTAB verdict."""
+    if endpoint.polling != "adaptive":
+        return Decision(schedule_due, "schedule")
+    profile = PublicationProfile.from_dict(state.get("profile"))
+    if not profile.learned:
+        return Decision(schedule_due, "learning")
+    if not state.get("last_poll"):
+        return Decision(True, "first_poll")
+    hot = profile.is_hot(now)
+    interval = datetime.timedelta(minutes=hot_minutes if hot else cold_minutes)
+    elapsed = now - datetime.datetime.fromisoformat(state["last_poll"])
+    return Decision(elapsed + SLACK >= interval, "hot_window" if hot else "backoff")
+
+
+def conditional_headers(state):
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+
+async def fetch(session, url, semaphore, state, bucket=None):
+    """Conditional GET; ``Fetched.outcome`` is ``not_modified``, ``unchanged`` or ``new``.
+
+    ``payload`` is only decoded for ``new`` responses.
+    """
+    from . import ingest
+
+    status, headers, body = await ingest.fetch_async(session, url, semaphore, bucket=bucket,
+                                                     headers=conditional_headers(state))
+    if status == 304:
+        return Fetched("not_modified", None, 0, {})
+    validators = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "body_sha256": hashlib.sha256(body).hexdigest(),
+    }
+    if validators["body_sha256"] == state.get("body_sha256"):
+        return Fetched("unchanged", None, len(body), validators)
+    with metrics.timer("ingest.json_decode_ms"):
+        return Fetched("new", json.loads(body), len(body), validators)
+
+
+def record(state, dataset, now, decision, fetched=None, published=False):
+    """Update ``state`` after one decision (and its fetch) and log it; returns ``state``."""
+    entry = {"at": now.isoformat(), "poll": decision.poll, "reason": decision.reason}
+    saved = 0
+    if decision.poll and fetched is not None:
+        entry["outcome"] = fetched.outcome
+        if fetched.outcome == "not_modified":
+            saved = state.get("body_bytes", 0)
+        else:
+            state.update(fetched.validators)
+            state["body_bytes"] = fetched.body_bytes
+        if published and state.get("last_poll"):
+            # sin consulta previa no se sabe cuándo se publicó
+            profile = PublicationProfile.from_dict(state.get("profile"))
+            profile.observe(datetime.datetime.fromisoformat(state["last_poll"]), now)
+            state["profile"] = profile.to_dict()
+        state["last_poll"] = now.isoformat()
+    elif decision.poll:
+        entry["outcome"] = "failed"
+    entry["bytes_saved"] = saved
+    state["decisions"] = (state.get("decisions", []) + [entry])[-MAX_DECISIONS:]
+
+    metrics.incr("polling.decisions", dataset=dataset, decision="poll" if decision.poll else "skip",
+                 reason=decision.reason)
+    if saved:
+        metrics.incr("polling.bytes_saved", saved, unit="By", dataset=dataset)
+    logging.info("POLL_DECISION: %s", json.dumps(dict(entry, dataset=dataset)))
+    return state
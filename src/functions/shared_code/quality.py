@@ -0,0 +1,165 @@
+"""
+Data-quality validation of monetarias snapshots before they reach the lake.
+
+Each field of a response is pulled into an Arrow column once and every check
+is a ``pyarrow.compute`` / NumPy kernel over whole columns:
+
+* ``missing_fields``: ``idVariable``, ``fecha`` or ``valor`` absent or null
+* ``bad_types``: ``idVariable`` not an integer (or not a string, for
+  datasets keyed by a code, ``id_type="str"``), ``valor`` not a finite
+  number, ``fecha`` not a string
+* ``bad_fecha``: ``fecha`` does not start with a ``YYYY-MM-DD`` date
+* ``duplicate_id``: repeated ``idVariable`` (the first occurrence is kept)
+* ``jumps``: ``valor`` moved more than ``max_jump`` (relative) from the
+  previous snapshot's value in the CDC state
+
+Records failing any of the first four checks are quarantined: ingest writes
+them with their reasons to ``quarantine/<dataset>/year=/month=/day=/`` and
+keeps them out of ``raw/``.  Jumps are only reported: a real level change
+would otherwise be rejected on every run, since the CDC state never moves.
+Records are only touched one by one (to build the reasons) when some
+of them failed.
+"""
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+QUARANTINE_PREFIX = "quarantine"
+ERROR_CHECKS = ("missing_fields", "bad_types", "bad_fecha", "duplicate_id")
+MAX_JUMP = 0.5
+MAX_LISTED = 20
+
+Validation = namedtuple("Validation", "valid rejected report")
+
+
+def _is_int(v):
+    return isinstance(v, int) and not isinstance(v, bool) and -2 ** 63 <= v < 2 ** 63
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+
+
+def _column(values, type_, accepts, accept):
+    """``(array, bad_type_mask)`` for one field.
+
+    Arrow infers the type of the whole column in C; only if it is not one of
+    ``accepts`` (mixed or wrong types) are the values checked one by one.
+    """
+    try:
+        inferred = pa.array(values)
+        if any(check(inferred.type) for check in accepts):
+            return inferred.cast(type_), None
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    bad = pa.array([v is not None and not accept(v) for v in values], pa.bool_())
+    return pa.array([v if accept(v) else None for v in values], type_), bad
+
+
+def _is_str(v):
+    return isinstance(v, str)
+
+
+ID_TYPES = {
+    "int": (pa.int64(), (pa.types.is_integer, pa.types.is_null), _is_int),
+    "str": (pa.string(), (pa.types.is_string, pa.types.is_null), _is_str),
+}
+
+
+def _previous_values(state, id_type="int"):
+    """CDC state ``{idVariable: [fecha, valor]}`` → ``(ids, valores)`` arrays."""
+    type_ = ID_TYPES[id_type][0]
+    if not state:
+        return pa.array([], type_), pa.array([], pa.float64())
+    ids = pc.cast(pa.array(list(state), pa.string()), type_)
+    valores = pa.array([v[1] if _is_number(v[1]) else None for v in state.values()], pa.float64())
+    return ids, valores
+
+
+def check(records, state=None, max_jump=MAX_JUMP, id_type="int"):
+    """Boolean masks (NumPy) per check, plus the ``idVariable`` column."""
+    n = len(records)
+    ids, bad_id = _column([r.get("idVariable") for r in records], *ID_TYPES[id_type])
+    valores, bad_valor = _column([r.get("valor") for r in records], pa.float64(),
+                                 (pa.types.is_integer, pa.types.is_floating, pa.types.is_null), _is_number)
+    fechas, bad_fecha_type = _column([r.get("fecha") for r in records], pa.string(),
+                                     (pa.types.is_string, pa.types.is_null), _is_str)
+
+    def mask(array):
+        return array.to_numpy(zero_copy_only=False) if array is not None else np.zeros(n, bool)
+
+    bad_types = mask(bad_id) | mask(bad_valor) | mask(bad_fecha_type)
+    # NaN / inf llegan como float: tipo correcto pero no son un valor
+    bad_types |= mask(pc.fill_null(pc.invert(pc.is_finite(valores)), False))
+    missing = ~bad_types & (mask(pc.is_null(ids)) | mask(pc.is_null(valores)) | mask(pc.is_null(fechas)))
+
+    dates = pc.utf8_slice_codeunits(fechas, 0, 10)
+    parsed = pc.strptime(dates, format="%Y-%m-%d", unit="s", error_is_null=True)
+    # strptime normaliza 2025-02-30 a 2025-03-02: se exige que el formateo vuelva al mismo texto
+    roundtrip = pc.equal(pc.strftime(parsed, format="%Y-%m-%d"), dates)
+    bad_fecha = mask(pc.and_(pc.is_valid(fechas), pc.invert(pc.fill_null(roundtrip, False))))
+
+    rows = pa.table({"id": ids, "row": pa.array(np.arange(n), pa.int64())})
+    first = rows.filter(pc.is_valid(ids)).group_by("id").aggregate([("row", "min")])["row_min"]
+    duplicate = ~mask(pc.is_in(rows["row"], value_set=first)) & mask(pc.is_valid(ids))
+
+    prev_ids, prev_valores = _previous_values(state, id_type)
+    previous = pc.take(prev_valores, pc.index_in(ids, value_set=prev_ids))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.abs(mask(valores.fill_null(np.nan)) / mask(previous.fill_null(np.nan)) - 1)
+    jumps = np.nan_to_num(change, nan=0.0, posinf=0.0) > max_jump
+
+    return ids, {
+        "missing_fields": missing,
+        "bad_types": bad_types,
+        "bad_fecha": bad_fecha,
+        "duplicate_id": duplicate,
+        "jumps": jumps,
+    }
+
+
+def validate(records, state=None, max_jump=MAX_JUMP, dataset="monetarias", id_type="int"):
+    """Split ``records`` into ``Validation(valid, rejected, report)``.
+
+    ``rejected`` entries are ``{"record": ..., "reasons": [...]}``; ``report``
+    is a small JSON-able summary (counts per check, a few offending ids).
+    """
+    started = time.perf_counter()
+    if records:
+        ids, masks = check(records, state, max_jump, id_type)
+    else:
+        ids, masks = pa.array([], ID_TYPES[id_type][0]), {name: np.zeros(0, bool) for name in ERROR_CHECKS + ("jumps",)}
+    failed = np.zeros(len(records), bool)
+    for name in ERROR_CHECKS:
+        failed |= masks[name]
+
+    if failed.any():
+        keep = np.flatnonzero(~failed)
+        valid = [records[i] for i in keep]
+        rejected = [
+            {"record": records[i], "reasons": [name for name in ERROR_CHECKS if masks[name][i]]}
+            for i in np.flatnonzero(failed)
+        ]
+    else:
+        valid, rejected = records, []
+
+    jump_rows = np.flatnonzero(masks["jumps"] & ~failed)[:MAX_LISTED]
+    report = {
+        "dataset": dataset,
+        "records": len(records),
+        "valid": len(valid),
+        "quarantined": len(rejected),
+        "checks": {name: int(values.sum()) for name, values in masks.items()},
+        "jump_ids": ids.take(pa.array(jump_rows, pa.int64())).to_pylist(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    return Validation(valid, rejected, report)
+
+
+def quarantine_path(dataset, now):
+    return (f"{QUARANTINE_PREFIX}/{dataset}/year={now.year}/month={now.month:02d}/day={now.day:02d}"
+            f"/vars_{now.isoformat()}.json")
@@ -0,0 +1,186 @@
+"""
+Query API over the curated ``processed/monetarias`` Parquet data.
+
+Lookups prune the ``year=/month=/day=`` hive partitions by listing only the
+directories that can hold the requested dates, then let ``pyarrow.dataset``
+push the remaining predicates down to the row-group statistics written by the
+compactor.  Results are kept in a size-bounded LRU cache keyed by the query and
+a fingerprint of the files it read, so a rewritten partition invalidates the
+entries that depend on it.
+
+Partitions are keyed by ingest day and a row's ``fecha`` is never later than
+the day it was ingested, so rows for ``fecha`` D live in partitions
+``[D, D + max_lag_days]``; ``max_lag_days`` bounds how late BCRA publishes a
+value (monthly series lag the most).  Backfilled partitions hold ``fecha`` ==
+partition day.  When the raw partition index (``manifest.load_index``) is
+passed, partitions are chosen by their recorded ``min_fecha``/``max_fecha``
+instead, without listing any directory.
+
+    dataset = CuratedDataset("./datalake/processed/monetarias")
+    dataset.get_series(1, date(2025, 1, 1), date(2025, 7, 29)).to_pandas()
+"""
+import datetime
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs as pafs
+
+from . import manifest
+from .compactor import CURATED_FILE, SCHEMA, dedupe_and_sort
+
+COLUMNS = ["id_variable", "codigo_serie", "descripcion", "fecha", "valor"]
+DEFAULT_MAX_LAG_DAYS = 45
+
+
+class ResultCache:
+    """LRU cache of Arrow tables bounded by their total ``nbytes``."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            table = self.entries.get(key)
+            if table is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return table
+
+    def put(self, key, table):
+        size = table.nbytes
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key).nbytes
+            self.entries[key] = table
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+
+def _parse_key(name, key):
+    prefix = f"{key}="
+    return int(name[len(prefix):]) if name.startswith(prefix) else None
+
+
+class CuratedDataset:
+    """Partition-pruned, cached reads of the curated monetarias Parquet."""
+
+    def __init__(self, base_dir, filesystem=None, max_lag_days=DEFAULT_MAX_LAG_DAYS,
+                 cache_bytes=64 * 1024 * 1024, index=None):
+        self.filesystem = filesystem or pafs.LocalFileSystem()
+        self.base_dir = base_dir.rstrip("/")
+        self.max_lag_days = max_lag_days
+        self.cache = ResultCache(cache_bytes)
+        self.index = index
+
+    # ── pruning ───────────────────────────────────────────────────
+    def _children(self, path, key):
+        try:
+            infos = self.filesystem.get_file_info(pafs.FileSelector(path))
+        except FileNotFoundError:
+            return []
+        children = []
+        for info in infos:
+            if info.type == pafs.FileType.Directory:
+                value = _parse_key(info.base_name, key)
+                if value is not None:
+                    children.append((value, info.path))
+        return sorted(children)
+
+    def partition_files(self, desde, hasta):
+        """Parquet files (with size and mtime) of the partitions in ``[desde, hasta]``.
+
+        Only the year and month directories that overlap the range are listed.
+        """
+        files = []
+        for year, year_path in self._children(self.base_dir, "year"):
+            if not desde.year <= year <= hasta.year:
+                continue
+            for month, month_path in self._children(year_path, "month"):
+                if not (desde.year, desde.month) <= (year, month) <= (hasta.year, hasta.month):
+                    continue
+                for day, day_path in self._children(month_path, "day"):
+                    if not desde <= datetime.date(year, month, day) <= hasta:
+                        continue
+                    selector = pafs.FileSelector(day_path)
+                    files.extend(
+                        info for info in self.filesystem.get_file_info(selector)
+                        if info.type == pafs.FileType.File and info.path.endswith(".parquet")
+                    )
+        return files
+
+    def files_for_fechas(self, desde, hasta):
+        """Parquet files that can hold rows with ``desde <= fecha <= hasta``."""
+        if self.index is None:
+            return self.partition_files(desde, hasta + datetime.timedelta(days=self.max_lag_days))
+        paths = [
+            f"{self.base_dir}/year={day.year}/month={day.month:02d}/day={day.day:02d}/{CURATED_FILE}"
+            for day in manifest.days_with_fechas(self.index, desde, hasta)
+        ]
+        if not paths:
+            return []
+        return [info for info in self.filesystem.get_file_info(paths) if info.type == pafs.FileType.File]
+
+    @staticmethod
+    def fingerprint(files):
+        digest = hashlib.sha1()
+        for info in files:
+            digest.update(f"{info.path}|{info.size}|{info.mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    # ── lectura ───────────────────────────────────────────────────
+    def _read(self, key, files, row_filter):
+        cache_key = (key, self.fingerprint(files))
+        table = self.cache.get(cache_key)
+        if table is not None:
+            return table
+
+        if not files:
+            table = SCHEMA.empty_table()
+        else:
+            dataset = ds.dataset(
+                [info.path for info in files], format="parquet", filesystem=self.filesystem,
+                partitioning=ds.partitioning(flavor="hive"), partition_base_dir=self.base_dir,
+            )
+            table = dataset.to_table(columns=COLUMNS + ["year", "month", "day"], filter=row_filter)
+            # la partición más reciente gana cuando un (id_variable, fecha) aparece en varias
+            table = table.sort_by([("year", "ascending"), ("month", "ascending"), ("day", "ascending")])
+            table = dedupe_and_sort(table.select(COLUMNS))
+        self.cache.put(cache_key, table)
+        return table
+
+    def get_series(self, id_variable, desde, hasta):
+        """Rows of one variable with ``desde <= fecha <= hasta``, sorted by ``fecha``."""
+        files = self.files_for_fechas(desde, hasta)
+        row_filter = (
+            (ds.field("id_variable") == pa.scalar(int(id_variable), pa.int32()))
+            & (ds.field("fecha") >= pa.scalar(desde, pa.date32()))
+            & (ds.field("fecha") <= pa.scalar(hasta, pa.date32()))
+        )
+        return self._read(("series", int(id_variable), desde, hasta), files, row_filter)
+
+    def get_cross_section(self, fecha):
+        """Every variable's row for ``fecha``, sorted by ``id_variable``."""
+        files = self.files_for_fechas(fecha, fecha)
+        row_filter = ds.field("fecha") == pa.scalar(fecha, pa.date32())
+        return self._read(("cross_section", fecha), files, row_filter)
+
+    def latest_value(self, id_variable, fecha):
+        """Last known ``valor`` of ``id_variable`` at or before ``fecha`` (``None`` if unknown)."""
+        series = self.get_series(id_variable, fecha - datetime.timedelta(days=self.max_lag_days), fecha)
+        if not series.num_rows:
+            return None
+        return series["valor"][series.num_rows - 1].as_py()
@@ -0,0 +1,148 @@
+"""
+Raw snapshot formats: plain JSON, or newline-delimited JSON compressed with
+gzip or zstd.
+
+``json`` keeps the BCRA response exactly as received (the historical
+format).  ``ndjson.gz`` / ``ndjson.zst`` write one variable per line and are
+encoded and decoded incrementally.  ``json`` blobs are parsed
+incrementally too (``jsonstream``), so no reader needs the whole document in
+memory.  Readers pick the format from the blob
+name, so both formats can coexist in the same partition.
+
+``zstandard`` is optional; it is only imported when ``ndjson.zst`` is used.
+"""
+import json
+import zlib
+
+from . import cdc, jsonstream
+
+FORMATS = {
+    "json": {"ext": ".json", "content_type": "application/json", "content_encoding": None},
+    "ndjson.gz": {"ext": ".ndjson.gz", "content_type": "application/x-ndjson", "content_encoding": "gzip"},
+    "ndjson.zst": {"ext": ".ndjson.zst", "content_type": "application/x-ndjson", "content_encoding": "zstd"},
+}
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def format_for(path):
+    """Raw format of a blob from its extension (``json`` if unknown)."""
+    for name, spec in FORMATS.items():
+        if name != "json" and path.endswith(spec["ext"]):
+            return name
+    return "json"
+
+
+def _compressor(fmt):
+    if fmt == "ndjson.gz":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+
+def _decompressor(first_chunk):
+    if first_chunk.startswith(GZIP_MAGIC):
+        return zlib.decompressobj(47)
+    if first_chunk.startswith(ZSTD_MAGIC):
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj()
+    # el transporte ya descomprimió (Content-Encoding) y llegan las líneas en claro
+    return None
+
+
+def _iter_json(payload, batch_records):
+    # la envoltura se serializa aparte y los registros por lotes, con el encoder en C
+    if isinstance(payload, dict):
+        head = json.dumps({k: v for k, v in payload.items() if k != "results"})
+        yield (head[:-1] + (", " if len(head) > 2 else "") + '"results": [').encode()
+        tail = "]}"
+    else:
+        yield b"["
+        tail = "]"
+    records = cdc.extract_records(payload)
+    for start in range(0, len(records), batch_records):
+        batch = ", ".join(json.dumps(r) for r in records[start:start + batch_records])
+        yield ((", " if start else "") + batch).encode()
+    yield tail.encode()
+
+
+def iter_encode(payload, fmt, batch_records=1000):
+    """Yield the encoded snapshot in chunks of ``batch_records`` records.
+
+    ``json`` yields an equivalent document to ``json.dumps(payload)`` (with
+    ``results`` last); the ndjson formats compress one line per record.
+    """
+    if fmt == "json":
+        yield from _iter_json(payload, batch_records)
+        return
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown raw format: {fmt}")
+
+    compressor = _compressor(fmt)
+    records = cdc.extract_records(payload)
+    for start in range(0, len(records), batch_records):
+        lines = "".join(json.dumps(r) + "\n" for r in records[start:start + batch_records])
+        chunk = compressor.compress(lines.encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def encode(payload, fmt):
+    return b"".join(iter_encode(payload, fmt))
+
+
+def iter_lines(chunks):
+    """Decompress (if needed) an iterable of byte chunks and yield complete lines."""
+    decompressor = None
+    pending = b""
+    first = True
+    for chunk in chunks:
+        if first:
+            decompressor = _decompressor(chunk)
+            first = False
+        data = decompressor.decompress(chunk) if decompressor else chunk
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if decompressor is not None and hasattr(decompressor, "flush"):
+        pending += decompressor.flush()
+    for line in pending.split(b"\n"):
+        if line.strip():
+            yield line
+
+
+def iter_records(chunks, fmt):
+    """Yield records from an iterable of encoded byte chunks in format ``fmt``."""
+    if fmt == "json":
+        yield from jsonstream.iter_records(chunks)
+        return
+    for line in iter_lines(chunks):
+        yield json.loads(line)
+
+
+def read_records(store, path, chunk_size=1024 * 1024):
+    """Stream the records of a raw blob, whatever its format."""
+    return iter_records(store.iter_chunks(path, chunk_size), format_for(path))
+
+
+def read_batches(store, path, batch_records=10_000, chunk_size=1024 * 1024):
+    """Stream the records of a raw blob as lists of at most ``batch_records``."""
+    return jsonstream.iter_batches(read_records(store, path, chunk_size), batch_records)
+
+
+def write_snapshot(store, path_without_ext, payload, fmt):
+    """Write ``payload`` as ``<path><ext>`` in ``fmt``; returns the blob path.
+
+    The compressed body is small enough to upload in a single request; pass
+    ``iter_encode()`` to ``store.write_bytes`` directly to stream large ones.
+    """
+    spec = FORMATS[fmt]
+    path = f"{path_without_ext}{spec['ext']}"
+    store.write_bytes(path, encode(payload, fmt), content_type=spec["content_type"],
+                      content_encoding=spec["content_encoding"])
+    return path
@@ -0,0 +1,181 @@
+"""
+Declarative registry of the BCRA endpoints ingested by the scheduler.
+
+Each ``Endpoint`` says where to fetch (``url``), when (``schedule``, an
+NCRONTAB expression like the ones in ``function.json``:
+``second minute hour day month day-of-week``), where to write (``prefix``,
+partitioned as ``<prefix>/year=/month=/day=`` so ``blob_alert`` and the
+manifests understand it) and how to read the response (``parser``, a name in
+``PARSERS`` that returns the document stored as the raw snapshot, whose
+``results`` are records with ``idVariable`` / ``fecha`` / ``valor``).
+``id_type`` is the type ``quality`` expects for ``idVariable``.  ``polling``
+is ``adaptive`` (``polling`` learns when to poll, ``schedule`` is the fallback
+while it learns) or ``schedule`` (only the NCRONTAB expression).
+
+The defaults can be replaced with ``INGEST_ENDPOINTS``: a JSON list of
+endpoints (inline, or the path of a JSON file).  ``BCRA_API_URL`` still
+overrides the monetarias URL.
+"""
+import datetime
+import json
+import os
+from collections import namedtuple
+
+from . import cdc
+
+Endpoint = namedtuple("Endpoint", "dataset url schedule prefix parser id_type polling",
+                      defaults=("adaptive",))
+POLLING_MODES = ("adaptive", "schedule")
+
+MAX_SCAN_MINUTES = 2 * 24 * 60
+
+
+def parse_results(payload):
+    """Responses that already are ``{"results": [...]}`` (or a bare list) are stored as is."""
+    return payload
+
+
+def parse_cotizaciones(payload):
+    """``estadisticascambiarias`` ``/Cotizaciones``: one record per currency.
+
+    ``{"results": {"fecha": ..., "detalle": [{"codigoMoneda", "descripcion",
+    "tipoPase", "tipoCotizacion"}]}}`` becomes records keyed by the currency
+    code with the quote as ``valor``.
+    """
+    results = (payload.get("results") if isinstance(payload, dict) else None) or {}
+    fecha = results.get("fecha")
+    return {
+        "fecha": fecha,
+        "results": [
+            {
+                "idVariable": item.get("codigoMoneda"),
+                "descripcion": item.get("descripcion"),
+                "fecha": fecha,
+                "valor": item.get("tipoCotizacion"),
+                "tipoPase": item.get("tipoPase"),
+            }
+            for item in results.get("detalle") or []
+        ],
+    }
+
+
+PARSERS = {
+    "results": parse_results,
+    "cotizaciones": parse_cotizaciones,
+}
+
+DEFAULT_ENDPOINTS = [
+    Endpoint("monetarias", "https://api.bcra.gob.ar/estadisticas/v3.0/monetarias",
+             "0 5 * * * *", "raw/monetarias", "results", "int"),
+    Endpoint("cambiarias", "https://api.bcra.gob.ar/estadisticascambiarias/v1.0/Cotizaciones",
+             "0 10 * * * *", "raw/cambiarias", "cotizaciones", "str"),
+]
+
+
+def endpoint_from_dict(item):
+    dataset = item["dataset"]
+    return Endpoint(
+        dataset=dataset,
+        url=item["url"],
+        schedule=item.get("schedule", "0 5 * * * *"),
+        prefix=item.get("prefix", f"raw/{dataset}"),
+        parser=item.get("parser", "results"),
+        id_type=item.get("id_type", "int"),
+        polling=item.get("polling", "adaptive"),
+    )
+
+
+def load_registry(env=None):
+    """Endpoints from ``INGEST_ENDPOINTS`` (or the defaults), validated."""
+    env = os.environ if env is None else env
+    spec = env.get("INGEST_ENDPOINTS", "").strip()
+    if spec:
+        if not spec.startswith("["):
+            with open(spec) as fh:
+                spec = fh.read()
+        endpoints = [endpoint_from_dict(item) for item in json.loads(spec)]
+    else:
+        endpoints = list(DEFAULT_ENDPOINTS)
+    if env.get("BCRA_API_URL"):
+        endpoints = [e._replace(url=env["BCRA_API_URL"]) if e.dataset == "monetarias" else e
+                     for e in endpoints]
+    for endpoint in endpoints:
+        if endpoint.parser not in PARSERS:
+            raise ValueError(f"{endpoint.dataset}: unknown parser {endpoint.parser!r}")
+        if endpoint.polling not in POLLING_MODES:
+            raise ValueError(f"{endpoint.dataset}: polling must be one of {POLLING_MODES}")
+        if not endpoint.prefix.startswith("raw/"):
+            raise ValueError(f"{endpoint.dataset}: prefix must be under raw/ for blob_alert")
+        Schedule(endpoint.schedule)
+    if len({e.dataset for e in endpoints}) != len(endpoints):
+        raise ValueError("duplicate dataset in INGEST_ENDPOINTS")
+    return endpoints
+
+
+def datasets(endpoints=None):
+    """Dataset names (= ``raw/<dataset>`` prefixes) ``blob_alert`` accepts."""
+    return frozenset(e.prefix.split("/", 2)[1] for e in (endpoints or load_registry()))
+
+
+def records(endpoint, payload):
+    """Parse a response with the endpoint's parser; returns ``(data, records)``."""
+    data = PARSERS[endpoint.parser](payload)
+    return data, cdc.extract_records(data)
+
+
+class Schedule:
+    """NCRONTAB expression (``second minute hour day month day-of-week``).
+
+    Fields accept ``*``, ``*/n``, ``a``, ``a-b``, ``a-b/n`` and comma lists;
+    day-of-week is 0-6 with Sunday = 0.
+    """
+
+    RANGES = ((0, 59), (0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 6:
+            raise ValueError(f"schedule {expr!r} must have 6 fields")
+        self.expr = expr
+        self.seconds, self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+
+    @staticmethod
+    def _field(field, low, high):
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            if span == "*":
+                start, stop = low, high
+            elif "-" in span:
+                start, stop = (int(v) for v in span.split("-"))
+            else:
+                start = int(span)
+                stop = high if step else start
+            if not low <= start <= stop <= high:
+                raise ValueError(f"schedule field {field!r} out of range {low}-{high}")
+            values.update(range(start, stop + 1, int(step or 1)))
+        return frozenset(values)
+
+    def _minute_matches(self, t):
+        return (t.minute in self.minutes and t.hour in self.hours and t.day in self.days
+                and t.month in self.months and (t.weekday() + 1) % 7 in self.weekdays)
+
+    def fired_between(self, start, end):
+        """Whether the schedule fires at some ``t`` with ``start < t <= end``.
+
+        Scans at most ``MAX_SCAN_MINUTES``: longer gaps count as fired.
+        """
+        if end <= start:
+            return False
+        minute = start.replace(second=0, microsecond=0)
+        for _ in range(MAX_SCAN_MINUTES):
+            if minute > end:
+                return False
+            if self._minute_matches(minute):
+                for second in self.seconds:
+                    if start < minute + datetime.timedelta(seconds=second) <= end:
+                        return True
+            minute += datetime.timedelta(minutes=1)
+        return True
@@ -0,0 +1,246 @@
+"""
+Resumable reprocessing of the monetarias history, one partition at a time.
+
+When the Parquet mapping changes or a parsing bug is fixed, the affected days
+are re-run with a single command instead of triggering ADF day by day:
+
+* ``validate``: re-runs ``quality.validate`` over every raw snapshot of the
+  day and writes the aggregated report to
+  ``state/quality/monetarias/year=/month=/day=/report.json`` (raw blobs are
+  not touched)
+* ``transform``: ``compactor.compact_day`` (raw → curated Parquet)
+* ``derive``: ``indicators.derive_range`` (curated Parquet → indicators)
+
+Each partition gets a checkpoint in ``state/reprocess/<stage>/<day>.json``
+with the hash of its inputs (the raw snapshots, from the manifest sha256 when
+there is one, or the curated Parquet) and of the stage version.  A partition
+whose checkpoint matches is skipped, so an interrupted run resumes where it
+stopped and a re-run only touches what changed; ``--force`` ignores them.
+
+``validate`` and ``transform`` shard the days over a process pool (each worker
+opens its own store, as ``compact_range`` does).  ``derive`` runs in the
+calling process: the pending partitions are recomputed together, from a panel
+built for their range rather than the stored rolling window (which may no
+longer reach them), and only checkpointed once that computation succeeded.
+
+Usage::
+
+    python -m src.functions.shared_code.reprocess --stage transform \\
+        --desde 2025-07-01 --hasta 2025-07-29 --local-dir ./datalake --processes 8
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import cdc, compactor, indicators, manifest, metrics, quality, rawformat
+from .compactor import CURATED_FILE, CURATED_PREFIX, RAW_PREFIX, partition_path
+
+STAGES = ("validate", "transform", "derive")
+CHECKPOINT_PREFIX = "state/reprocess"
+QUALITY_PREFIX = "state/quality/monetarias"
+
+
+def checkpoint_path(stage, day):
+    return f"{CHECKPOINT_PREFIX}/{stage}/{day.isoformat()}.json"
+
+
+def stage_version(stage):
+    """What, besides the inputs, changes a stage's output (mapping, checks, indicators)."""
+    if stage == "validate":
+        return f"{quality.ERROR_CHECKS}:{quality.MAX_JUMP}"
+    if stage == "transform":
+        return str(compactor.SCHEMA)
+    return f"{sorted(indicators.DEFAULT_INDICATORS)}:{indicators.FFILL_LIMIT_DAYS}"
+
+
+def _sha256(store, path):
+    digest = hashlib.sha256()
+    for chunk in store.iter_chunks(path):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_inputs(store, stage, day):
+    """Input paths of ``stage`` for ``day`` (empty if the partition has no data)."""
+    if stage == "derive":
+        prefix = partition_path(CURATED_PREFIX, day)
+        return [p for p in store.list(prefix + "/") if p == f"{prefix}/{CURATED_FILE}"]
+    return compactor.day_inputs(store, day)
+
+
+def input_hash(store, stage, day, paths):
+    """Hash of the stage version and the name and content of every input."""
+    known = (manifest.load_manifest(store, day) or {}).get("files", {}) if stage != "derive" else {}
+    digest = hashlib.sha256(stage_version(stage).encode())
+    for path in paths:
+        name = path.rsplit("/", 1)[-1]
+        sha = known.get(name, {}).get("sha256") or _sha256(store, path)
+        digest.update(f"{name}:{sha}\n".encode())
+    return digest.hexdigest()
+
+
+def validate_day(store, day, paths):
+    """Re-validate the raw snapshots of ``day`` in order; returns the aggregated report."""
+    state = {}
+    report = {"partition": partition_path(RAW_PREFIX, day), "snapshots": len(paths), "records": 0,
+              "valid": 0, "quarantined": 0, "checks": {}, "rejected_ids": []}
+    for path in paths:
+        records = list(rawformat.read_records(store, path))
+        result = quality.validate(records, state)
+        report["records"] += result.report["records"]
+        report["valid"] += result.report["valid"]
+        report["quarantined"] += result.report["quarantined"]
+        for name, count in result.report["checks"].items():
+            report["checks"][name] = report["checks"].get(name, 0) + count
+        rejected = [r["record"].get("idVariable") for r in result.rejected]
+        report["rejected_ids"] = (report["rejected_ids"] + rejected)[:quality.MAX_LISTED]
+        state = cdc.update_state(state, result.valid)
+    store.write_bytes(f"{partition_path(QUALITY_PREFIX, day)}/report.json", json.dumps(report))
+    return report["quarantined"]
+
+
+def _pending(store, stage, day, force):
+    """``(outcome, paths, digest)``; ``paths`` is ``None`` when there is nothing to run."""
+    outcome = {"day": day.isoformat(), "status": "done", "result": None}
+    paths = stage_inputs(store, stage, day)
+    if not paths:
+        outcome["status"] = "empty"
+        return outcome, None, None
+    digest = input_hash(store, stage, day, paths)
+    raw = store.read_bytes(checkpoint_path(stage, day))
+    if not force and raw and json.loads(raw).get("input_hash") == digest:
+        outcome["status"] = "skipped"
+        return outcome, None, None
+    return outcome, paths, digest
+
+
+def _checkpoint(store, stage, day, paths, digest, started):
+    store.write_bytes(checkpoint_path(stage, day), json.dumps({
+        "input_hash": digest,
+        "inputs": len(paths),
+        "finished_at": datetime.datetime.utcnow().isoformat(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }))
+
+
+def run_partition(store, stage, day, force=False):
+    """Run ``validate`` or ``transform`` for one partition unless its checkpoint matches the inputs.
+
+    Returns ``{"day", "status", "result"}`` with status ``done``, ``skipped``,
+    ``empty`` or ``failed``.
+    """
+    outcome = {"day": day.isoformat(), "status": "failed", "result": None}
+    try:
+        outcome, paths, digest = _pending(store, stage, day, force)
+        if paths is None:
+            return outcome
+        started = time.perf_counter()
+        if stage == "validate":
+            outcome["result"] = validate_day(store, day, paths)
+        else:
+            outcome["result"] = compactor.compact_day(store, day)
+        _checkpoint(store, stage, day, paths, digest, started)
+    except Exception as e:
+        logging.error("Reprocess %s of %s failed: %s", stage, day, e)
+        outcome["status"] = "failed"
+    return outcome
+
+
+def derive_partitions(store, days, force=False):
+    """Run ``derive`` over ``days``: one ``indicators.derive_range`` for the pending partitions.
+
+    Returns one outcome per day, as ``run_partition``; if the computation
+    fails every pending partition is ``failed`` and none is checkpointed.
+    """
+    outcomes, pending = [], []
+    for day in days:
+        try:
+            outcome, paths, digest = _pending(store, "derive", day, force)
+        except Exception as e:
+            logging.error("Reprocess derive of %s failed: %s", day, e)
+            outcome, paths = {"day": day.isoformat(), "status": "failed", "result": None}, None
+        outcomes.append(outcome)
+        if paths is not None:
+            pending.append((outcome, day, paths, digest))
+    if not pending:
+        return outcomes
+
+    started = time.perf_counter()
+    try:
+        written = indicators.derive_range(store, pending[0][1], pending[-1][1])
+        for outcome, day, paths, digest in pending:
+            outcome["result"] = len(written)
+            _checkpoint(store, "derive", day, paths, digest, started)
+    except Exception as e:
+        logging.error("Reprocess derive of %s..%s failed: %s", pending[0][1], pending[-1][1], e)
+        for outcome, *_ in pending:
+            outcome["status"] = "failed"
+    return outcomes
+
+
+def _run_partition_worker(local_dir, stage, day, force):
+    from .storage import open_store
+
+    return run_partition(open_store(local_dir), stage, day, force)
+
+
+def reprocess(stage, desde, hasta, local_dir=None, processes=None, force=False, store=None):
+    """Run ``stage`` over ``[desde, hasta]``; returns a summary with one outcome per day.
+
+    ``store`` is only used for in-process runs (``processes=1`` or ``derive``);
+    pool workers open ``local_dir`` or ``AZURE_STORAGE_CONN``.
+    """
+    if stage not in STAGES:
+        raise ValueError(f"unknown stage {stage!r}, expected one of {STAGES}")
+    days = [desde + datetime.timedelta(days=n) for n in range((hasta - desde).days + 1)]
+    processes = processes or os.cpu_count() or 1
+    started = time.monotonic()
+
+    if stage == "derive" or processes == 1 or len(days) == 1:
+        if store is None:
+            from .storage import open_store
+
+            store = open_store(local_dir)
+        if stage == "derive":
+            outcomes = derive_partitions(store, days, force)
+        else:
+            outcomes = [run_partition(store, stage, day, force) for day in days]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(days))) as pool:
+            outcomes = list(pool.map(_run_partition_worker, [local_dir] * len(days), [stage] * len(days),
+                                     days, [force] * len(days)))
+
+    summary = {"stage": stage, "partitions": len(days)}
+    for status in ("done", "skipped", "empty", "failed"):
+        summary[status] = sum(o["status"] == status for o in outcomes)
+        metrics.incr("reprocess.partitions", summary[status], stage=stage, status=status)
+    summary["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    summary["outcomes"] = outcomes
+    logging.info("Reprocess %s finished: %s", stage, {k: v for k, v in summary.items() if k != "outcomes"})
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprocess monetarias partitions in a date range")
+    parser.add_argument("--stage", choices=STAGES, required=True)
+    parser.add_argument("--desde", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--hasta", type=datetime.date.fromisoformat)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--force", action="store_true", help="ignore the per-partition checkpoints")
+    parser.add_argument("--local-dir", help="read/write a local directory instead of AZURE_STORAGE_CONN")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    summary = reprocess(args.stage, args.desde, args.hasta or args.desde, args.local_dir,
+                        args.processes, args.force)
+    print(json.dumps({k: v for k, v in summary.items() if k != "outcomes"}))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
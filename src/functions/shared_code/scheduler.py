@@ -0,0 +1,177 @@
+"""
+One timer for every BCRA endpoint of the registry.
+
+``ingest_bcra`` (entry point ``main_scheduled``) ticks every few minutes and
+ingests, concurrently, the endpoints whose ``schedule`` fired since their last
+successful run (``LAST_RUN_PATH``).  Fetches share one ``aiohttp`` session;
+per API host there is a cap on in-flight requests and a token bucket, so
+endpoints due at the same minute never hit a host in an uncoordinated burst.
+Each response goes through the endpoint's parser and the usual validation /
+CDC / upload of ``ingest`` into its ``<prefix>/year=/month=/day=`` partition.
+
+Whether a due endpoint is actually polled is up to ``polling``: requests are
+conditional (validators or body hash, an unchanged response skips the
+ingest) and, once the publication windows of an endpoint are learned, it is
+polled often inside them and backs off outside them.
+
+A failed endpoint keeps its previous last run, so it is due again on the
+next tick.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+from . import clients, ingest, metrics, polling, registry
+
+LAST_RUN_PATH = "state/scheduler/last_run.json"
+TICK_SECONDS = 300
+
+
+class AsyncTokenBucket:
+    """``rate`` requests per second, bursts up to ``capacity`` (one event loop).
+
+    ``capacity`` is at least one token, so a ``rate`` below 1 still admits a
+    request every ``1 / rate`` seconds.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity or rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostLimits:
+    """Per-host ``asyncio.Semaphore`` and ``AsyncTokenBucket``, created on first use."""
+
+    def __init__(self, concurrency=4, rate=5.0):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.hosts = {}
+
+    def get(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = (asyncio.Semaphore(self.concurrency), AsyncTokenBucket(self.rate))
+        return self.hosts[host]
+
+
+def due(endpoints, last_runs, now, tick_seconds=TICK_SECONDS):
+    """Endpoints whose schedule fired after their last run (or in the last tick, if never run)."""
+    never = now - datetime.timedelta(seconds=tick_seconds)
+    return [
+        e for e in endpoints
+        if registry.Schedule(e.schedule).fired_between(
+            datetime.datetime.fromisoformat(last_runs[e.dataset]) if e.dataset in last_runs else never,
+            now,
+        )
+    ]
+
+
+async def ingest_endpoint(store, endpoint, session, limits, upload_limit, now, raw_format="json", state=None):
+    """Conditionally fetch, parse and ingest one endpoint.
+
+    Returns ``(snapshot path or None, polling.Fetched)``; nothing is parsed or
+    written when the response is not modified or has the same body as the
+    last one (``state`` is the endpoint's polling state).
+    """
+    semaphore, bucket = limits.get(endpoint.url)
+    with metrics.timer("scheduler.endpoint_ms", dataset=endpoint.dataset):
+        fetched = await polling.fetch(session, endpoint.url, semaphore, state or {}, bucket=bucket)
+        if fetched.payload is None:
+            logging.info("%s %s, skipping ingest", endpoint.dataset, fetched.outcome.replace("_", " "))
+            return None, fetched
+        data = registry.PARSERS[endpoint.parser](fetched.payload)
+        path = await ingest.ingest_snapshot_async(store, endpoint.dataset, data, now, upload_limit,
+                                                  raw_format, prefix=endpoint.prefix,
+                                                  id_type=endpoint.id_type)
+        return path, fetched
+
+
+async def _seed(store, endpoint, now):
+    paths = []
+    for prefix in polling.seed_prefixes(endpoint.prefix, now):
+        paths.extend(await store.list(prefix))
+    return polling.seed_profile(paths).to_dict()
+
+
+async def run_due(store, endpoints=None, now=None, session=None, raw_format="json",
+                  host_concurrency=4, host_rate=5.0, upload_concurrency=8,
+                  hot_minutes=polling.HOT_MINUTES, cold_minutes=polling.COLD_MINUTES):
+    """Ingest every endpoint ``polling`` decides to poll, concurrently.
+
+    Returns ``{dataset: snapshot path or None}`` for the polled endpoints.
+    ``store`` is async (``AsyncBlobStore`` / ``AsyncStoreAdapter``).  The last
+    runs and polling state of the endpoints that succeeded are saved even if
+    others failed; the first error is raised afterwards.
+    """
+    endpoints = registry.load_registry() if endpoints is None else endpoints
+    now = now or datetime.datetime.utcnow()
+    raw = await store.read_bytes(LAST_RUN_PATH)
+    last_runs = json.loads(raw) if raw else {}
+    raw = await store.read_bytes(polling.STATE_PATH)
+    states = json.loads(raw) if raw else {}
+
+    scheduled = {e.dataset for e in due(endpoints, last_runs, now)}
+    decisions = {}
+    for endpoint in endpoints:
+        state = states.setdefault(endpoint.dataset, {})
+        if endpoint.polling == "adaptive" and "profile" not in state:
+            state["profile"] = await _seed(store, endpoint, now)
+        decisions[endpoint.dataset] = polling.decide(endpoint, state, now, endpoint.dataset in scheduled,
+                                                     hot_minutes, cold_minutes)
+    todo = [e for e in endpoints if decisions[e.dataset].poll]
+    for endpoint in endpoints:
+        if not decisions[endpoint.dataset].poll:
+            polling.record(states[endpoint.dataset], endpoint.dataset, now, decisions[endpoint.dataset])
+    metrics.record("scheduler.due_endpoints", len(todo))
+
+    results = []
+    if todo:
+        session = session or clients.get_aiohttp_session(per_host=host_concurrency)
+        limits = HostLimits(host_concurrency, host_rate)
+        upload_limit = asyncio.Semaphore(upload_concurrency)
+        results = await asyncio.gather(
+            *(ingest_endpoint(store, e, session, limits, upload_limit, now, raw_format, states[e.dataset])
+              for e in todo),
+            return_exceptions=True,
+        )
+    else:
+        logging.info("No endpoints due at %s", now.isoformat())
+
+    errors, paths = [], {}
+    for endpoint, result in zip(todo, results):
+        decision = decisions[endpoint.dataset]
+        if isinstance(result, Exception):
+            errors.append(result)
+            metrics.incr("scheduler.endpoint_failed", dataset=endpoint.dataset)
+            logging.error(f"Scheduled ingest of {endpoint.dataset} failed: {result}")
+            polling.record(states[endpoint.dataset], endpoint.dataset, now, decision)
+            continue
+        path, fetched = result
+        paths[endpoint.dataset] = path
+        last_runs[endpoint.dataset] = now.isoformat()
+        polling.record(states[endpoint.dataset], endpoint.dataset, now, decision, fetched,
+                       published=path is not None)
+    if todo:
+        await store.write_bytes(LAST_RUN_PATH, json.dumps(last_runs, sort_keys=True))
+    await store.write_bytes(polling.STATE_PATH, json.dumps(states, sort_keys=True))
+    if errors:
+        raise errors[0]
+    return paths
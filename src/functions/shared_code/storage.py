@@ -0,0 +1,329 @@
+"""
+Minimal storage layer over the ``datalake`` container.
+
+``BlobStore`` wraps an ``azure.storage.blob.ContainerClient``; ``LocalStore``
+mirrors the same blob paths under a local directory so that every stage can
+run offline (tests, local reprocessing).  ``MemoryStore`` keeps them in a dict
+for benchmarks that should not measure the disk.
+
+Small state documents (manifests) are updated with optimistic concurrency:
+``read_versioned`` returns the content with its ETag and ``write_if_match``
+only writes if the ETag is unchanged (or, with ``etag=None``, if the path does
+not exist yet), returning the new ETag or raising ``PreconditionFailed``.
+``delete_if_match`` deletes under the same condition, so that one of several
+concurrent readers claims a small blob exactly once.
+
+``write_bytes`` takes optional blob ``metadata`` (lineage timestamps); the
+blob stores set it on the blob, ``MemoryStore`` keeps it in ``metadata`` and
+``LocalStore`` has nowhere to put it and ignores it.
+
+``AsyncBlobStore`` and ``AsyncStoreAdapter`` expose ``read_bytes`` /
+``write_bytes`` as coroutines for the async ingest path.
+"""
+import asyncio
+import fcntl
+import hashlib
+import os
+import threading
+
+
+class PreconditionFailed(Exception):
+    """A conditional write lost against a concurrent writer."""
+
+
+def content_etag(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class BlobStore:
+    """Store backed by an Azure Blob / ADLS Gen2 container client."""
+
+    def __init__(self, container):
+        self.container = container
+
+    def read_bytes(self, path):
+        """Return the blob content, or ``None`` if the blob does not exist."""
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            return self.container.download_blob(path).readall()
+        except ResourceNotFoundError:
+            return None
+
+    def write_bytes(self, path, data, content_type="application/json", content_encoding=None, metadata=None):
+        """Upload ``data`` (bytes, str or an iterable of byte chunks, which is streamed)."""
+        from azure.storage.blob import ContentSettings
+
+        self.container.upload_blob(
+            name=path,
+            data=data,
+            overwrite=True,
+            content_settings=ContentSettings(content_type=content_type,
+                                             content_encoding=content_encoding),
+            metadata=metadata,
+        )
+
+    def read_versioned(self, path):
+        """Return ``(content, etag)``, or ``(None, None)`` if the blob does not exist."""
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            downloader = self.container.download_blob(path)
+            return downloader.readall(), downloader.properties.etag
+        except ResourceNotFoundError:
+            return None, None
+
+    def write_if_match(self, path, data, etag, content_type="application/json"):
+        """Upload only if the blob still has ``etag`` (``None``: only if it does not exist).
+
+        Returns the ETag of the new content.
+        """
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceExistsError, ResourceModifiedError
+        from azure.storage.blob import ContentSettings
+
+        conditions = ({"overwrite": True, "etag": etag, "match_condition": MatchConditions.IfNotModified}
+                      if etag else {"overwrite": False})
+        try:
+            result = self.container.upload_blob(name=path, data=data,
+                                                content_settings=ContentSettings(content_type=content_type),
+                                                **conditions)
+        except (ResourceExistsError, ResourceModifiedError) as e:
+            raise PreconditionFailed(path) from e
+        return result.get("etag")
+
+    def delete_if_match(self, path, etag):
+        """Delete only if the blob still has ``etag``; ``PreconditionFailed`` otherwise (or if gone)."""
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+
+        try:
+            self.container.delete_blob(path, etag=etag, match_condition=MatchConditions.IfNotModified)
+        except (ResourceModifiedError, ResourceNotFoundError) as e:
+            raise PreconditionFailed(path) from e
+
+    def iter_chunks(self, path, chunk_size=4 * 1024 * 1024):
+        """Yield the blob content in ``chunk_size`` pieces without holding it all in memory."""
+        downloader = self.container.download_blob(path, max_concurrency=1)
+        while True:
+            chunk = downloader.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def list(self, prefix):
+        return sorted(b.name for b in self.container.list_blobs(name_starts_with=prefix))
+
+    def delete(self, path):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            self.container.delete_blob(path)
+        except ResourceNotFoundError:
+            pass
+
+
+class LocalStore:
+    """Store backed by a local directory; blob paths map to relative file paths."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _full(self, path):
+        return os.path.join(self.root, *path.split("/"))
+
+    def read_bytes(self, path):
+        try:
+            with open(self._full(path), "rb") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    def write_bytes(self, path, data, content_type="application/json", content_encoding=None, metadata=None):
+        full = self._full(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        tmp = f"{full}.tmp"
+        with open(tmp, "wb") as fh:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                fh.write(data)
+            else:
+                for chunk in data:
+                    fh.write(chunk)
+        os.replace(tmp, full)
+
+    def read_versioned(self, path):
+        data = self.read_bytes(path)
+        return (data, content_etag(data)) if data is not None else (None, None)
+
+    def write_if_match(self, path, data, etag, content_type="application/json"):
+        # un lock por store serializa el compare-and-swap entre procesos
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.read_versioned(path)[1] != etag:
+                raise PreconditionFailed(path)
+            self.write_bytes(path, data, content_type)
+            return content_etag(data.encode("utf-8") if isinstance(data, str) else bytes(data))
+
+    def delete_if_match(self, path, etag):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if etag is None or self.read_versioned(path)[1] != etag:
+                raise PreconditionFailed(path)
+            self.delete(path)
+
+    def iter_chunks(self, path, chunk_size=4 * 1024 * 1024):
+        with open(self._full(path), "rb") as fh:
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def list(self, prefix):
+        names = []
+        for dirpath, _, files in os.walk(self.root):
+            rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            for name in files:
+                if name.endswith(".tmp") or name == ".lock":
+                    continue
+                rel = name if rel_dir == "." else f"{rel_dir}/{name}"
+                if rel.startswith(prefix):
+                    names.append(rel)
+        return sorted(names)
+
+    def delete(self, path):
+        try:
+            os.remove(self._full(path))
+        except FileNotFoundError:
+            pass
+
+
+class MemoryStore:
+    """Store backed by a dict of ``path -> bytes`` (thread-safe)."""
+
+    def __init__(self):
+        self.blobs = {}
+        self.metadata = {}
+        self.lock = threading.Lock()
+
+    def read_bytes(self, path):
+        with self.lock:
+            return self.blobs.get(path)
+
+    def write_bytes(self, path, data, content_type="application/json", content_encoding=None, metadata=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif not isinstance(data, (bytes, bytearray, memoryview)):
+            data = b"".join(data)
+        with self.lock:
+            self.blobs[path] = bytes(data)
+            if metadata:
+                self.metadata[path] = dict(metadata)
+            else:
+                self.metadata.pop(path, None)
+
+    def read_versioned(self, path):
+        data = self.read_bytes(path)
+        return (data, content_etag(data)) if data is not None else (None, None)
+
+    def write_if_match(self, path, data, etag, content_type="application/json"):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self.lock:
+            current = self.blobs.get(path)
+            if (content_etag(current) if current is not None else None) != etag:
+                raise PreconditionFailed(path)
+            self.blobs[path] = data = bytes(data)
+        return content_etag(data)
+
+    def delete_if_match(self, path, etag):
+        with self.lock:
+            current = self.blobs.get(path)
+            if etag is None or current is None or content_etag(current) != etag:
+                raise PreconditionFailed(path)
+            del self.blobs[path]
+            self.metadata.pop(path, None)
+
+    def iter_chunks(self, path, chunk_size=4 * 1024 * 1024):
+        data = self.read_bytes(path)
+        if data is None:
+            raise FileNotFoundError(path)
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    def list(self, prefix):
+        with self.lock:
+            return sorted(p for p in self.blobs if p.startswith(prefix))
+
+    def delete(self, path):
+        with self.lock:
+            self.blobs.pop(path, None)
+            self.metadata.pop(path, None)
+
+    def total_bytes(self, prefix=""):
+        with self.lock:
+            return sum(len(v) for p, v in self.blobs.items() if p.startswith(prefix))
+
+
+class AsyncBlobStore:
+    """Async store over an ``azure.storage.blob.aio.ContainerClient``."""
+
+    def __init__(self, container):
+        self.container = container
+
+    async def read_bytes(self, path):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            downloader = await self.container.download_blob(path)
+            return await downloader.readall()
+        except ResourceNotFoundError:
+            return None
+
+    async def write_bytes(self, path, data, content_type="application/json", content_encoding=None, metadata=None):
+        """Upload ``data``; an iterable of chunks is streamed in blocks."""
+        from azure.storage.blob import ContentSettings
+
+        await self.container.upload_blob(
+            name=path,
+            data=data,
+            overwrite=True,
+            content_settings=ContentSettings(content_type=content_type,
+                                             content_encoding=content_encoding),
+            metadata=metadata,
+        )
+
+    async def list(self, prefix):
+        return sorted([b.name async for b in self.container.list_blobs(name_starts_with=prefix)])
+
+
+class AsyncStoreAdapter:
+    """Async facade over a sync store; calls run in the default thread pool."""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def read_bytes(self, path):
+        return await asyncio.to_thread(self.store.read_bytes, path)
+
+    async def write_bytes(self, path, data, content_type="application/json", content_encoding=None, metadata=None):
+        await asyncio.to_thread(self.store.write_bytes, path, data, content_type, content_encoding, metadata)
+
+    async def list(self, prefix):
+        return await asyncio.to_thread(self.store.list, prefix)
+
+
+def open_store(local_dir=None, conn_str=None):
+    """``LocalStore`` for ``local_dir``, otherwise the ``datalake`` container of ``conn_str``.
+
+    ``conn_str`` defaults to ``AZURE_STORAGE_CONN``.
+    """
+    if local_dir:
+        return LocalStore(local_dir)
+    from .clients import get_container
+
+    return BlobStore(get_container(conn_str=conn_str))
@@ -0,0 +1,311 @@
+"""
+Append-only, memory-mapped time series per variable for point-in-time lookups.
+
+"What was ``valor`` of variable 1 for ``fecha`` D as known at time T" would
+otherwise mean downloading and parsing every hourly snapshot since D.  Here
+each ``idVariable`` of a dataset has one file, ``<root>/<dataset>/<id>.ts``:
+a 16-byte header followed by fixed-width ``RECORD`` rows::
+
+    asof   int64    ingest time, microseconds since the epoch
+    fecha  int32    days since the epoch
+    valor  float64  NaN when BCRA published no value
+
+``ingest`` appends one row per changed variable (only what ``cdc`` reports as
+moved).  ``compact`` rewrites a file sorted by ``(fecha, asof)``, dropping
+re-observations that did not change ``valor``, and records in the header how
+many leading rows are sorted.  Readers ``mmap`` the file and view the rows as
+a NumPy structured array without copying; lookups binary-search the sorted
+part (``np.searchsorted``) and scan only the rows appended since the last
+compaction, which ``compact_monetarias`` keeps short.  ``append`` and
+``compact`` hold an exclusive ``flock`` on a ``<id>.ts.lock`` sidecar (the
+series file itself is replaced by ``compact``), so a row appended while a
+series is being compacted is never lost.
+
+The files need a real filesystem (``mmap``, ``O_APPEND``): ``SERIES_DIR``
+points to it (a mounted file share in Azure, a local directory for the
+CLI).  Without ``SERIES_DIR`` ingest does not write series.
+
+Usage (build from the raw history, then compact)::
+
+    python -m src.functions.shared_code.timeseries --desde 2025-07-01 --hasta 2025-07-29 \\
+        --local-dir ./datalake --series-dir ./series
+"""
+import argparse
+import contextlib
+import datetime
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from . import cdc, metrics, rawformat
+
+RECORD = np.dtype([("asof", "<i8"), ("fecha", "<i4"), ("valor", "<f8")])
+HEADER = struct.Struct("<4sHHII")
+MAGIC = b"TSV1"
+VERSION = 1
+EXT = ".ts"
+COMPACT_TAIL = 1024
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def to_asof(moment):
+    """``datetime`` (naive UTC) → microseconds since the epoch."""
+    return (moment - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def to_fecha(value):
+    """``YYYY-MM-DD...`` string or ``date`` → days since the epoch."""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    return (value - EPOCH.date()).days
+
+
+def _header(sorted_count):
+    return HEADER.pack(MAGIC, VERSION, RECORD.itemsize, sorted_count, 0)
+
+
+def _latest_per_fecha(rows):
+    """Last row of every ``fecha`` in rows sorted by ``(fecha, asof)``."""
+    if not len(rows):
+        return rows
+    last = np.r_[rows["fecha"][1:] != rows["fecha"][:-1], True]
+    return rows[last]
+
+
+class SeriesReader:
+    """Read-only view of one series file.
+
+    ``sorted`` and ``tail`` are zero-copy views of the mapped rows: the part
+    ordered by ``(fecha, asof)`` and the rows appended after it.  The mapping
+    is refreshed when the file grows or is replaced by ``compact``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stat = None
+        self.sorted = self.tail = np.empty(0, RECORD)
+        self.refresh()
+
+    def refresh(self):
+        stat = os.stat(self.path)
+        if self.stat and (stat.st_ino, stat.st_size) == (self.stat.st_ino, self.stat.st_size):
+            return
+        with open(self.path, "rb") as fh:
+            # los arrays que ya se entregaron mantienen vivo el mapeo anterior
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, itemsize, sorted_count, _ = HEADER.unpack_from(mapped)
+        if magic != MAGIC or itemsize != RECORD.itemsize:
+            raise ValueError(f"{self.path} is not a v{VERSION} series file")
+        count = (len(mapped) - HEADER.size) // RECORD.itemsize
+        rows = np.frombuffer(mapped, RECORD, count=count, offset=HEADER.size)
+        self.sorted, self.tail = rows[:sorted_count], rows[sorted_count:]
+        self.stat = stat
+
+    def __len__(self):
+        return len(self.sorted) + len(self.tail)
+
+    def points(self, desde, hasta):
+        """Every version of ``desde <= fecha <= hasta``: ``(sorted view, tail rows)``.
+
+        The first element is a slice of the mapping (no copy).
+        """
+        fechas = self.sorted["fecha"]
+        lo = np.searchsorted(fechas, to_fecha(desde), side="left")
+        hi = np.searchsorted(fechas, to_fecha(hasta), side="right")
+        tail = self.tail[(self.tail["fecha"] >= to_fecha(desde)) & (self.tail["fecha"] <= to_fecha(hasta))]
+        return self.sorted[lo:hi], tail
+
+    def value(self, fecha, asof=None):
+        """``valor`` of ``fecha`` as known at ``asof`` (latest if ``None``); ``None`` if unknown."""
+        rows = self.range(fecha, fecha, asof)
+        return float(rows["valor"][0]) if len(rows) else None
+
+    def range(self, desde, hasta, asof=None):
+        """One row per ``fecha`` in ``[desde, hasta]``: the latest version known at ``asof``."""
+        base, tail = self.points(desde, hasta)
+        if len(tail):
+            base = np.sort(np.concatenate([base, tail]), order=["fecha", "asof"], kind="stable")
+        if asof is not None:
+            base = base[base["asof"] <= to_asof(asof)]
+        return _latest_per_fecha(base)
+
+
+class SeriesStore:
+    """Directory of series files, ``<root>/<dataset>/<id>.ts``."""
+
+    def __init__(self, root, compact_tail=COMPACT_TAIL):
+        self.root = root
+        self.compact_tail = compact_tail
+        self.readers = {}
+        self.lock = threading.Lock()
+
+    def path(self, dataset, id_variable):
+        return os.path.join(self.root, dataset, f"{id_variable}{EXT}")
+
+    def ids(self, dataset):
+        try:
+            names = os.listdir(os.path.join(self.root, dataset))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(EXT)] for name in names if name.endswith(EXT))
+
+    def reader(self, dataset, id_variable):
+        """Cached ``SeriesReader`` (refreshed on every call); ``None`` if there is no file."""
+        key = (dataset, str(id_variable))
+        with self.lock:
+            reader = self.readers.get(key)
+            try:
+                if reader is None:
+                    reader = self.readers[key] = SeriesReader(self.path(dataset, id_variable))
+                else:
+                    reader.refresh()
+            except FileNotFoundError:
+                self.readers.pop(key, None)
+                return None
+        return reader
+
+    def value(self, dataset, id_variable, fecha, asof=None):
+        reader = self.reader(dataset, id_variable)
+        return reader.value(fecha, asof) if reader else None
+
+    @contextlib.contextmanager
+    def locked(self, path):
+        """Exclusive lock of one series between writers (not readers), in a sidecar file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def append(self, dataset, id_variable, rows):
+        """Append ``RECORD`` rows to one series (creating it with an empty sorted part)."""
+        path = self.path(dataset, id_variable)
+        with self.locked(path):
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    os.write(fd, _header(0))
+                os.write(fd, np.ascontiguousarray(rows, RECORD).tobytes())
+            finally:
+                os.close(fd)
+
+    def append_records(self, dataset, records, asof):
+        """Append the ``(fecha, valor)`` of BCRA ``records`` observed at ``asof``; returns rows written."""
+        stamp = to_asof(asof)
+        written = 0
+        for record in records:
+            if record.get("idVariable") is None or not record.get("fecha"):
+                continue
+            valor = record.get("valor")
+            row = np.array([(stamp, to_fecha(record["fecha"]), np.nan if valor is None else valor)], RECORD)
+            self.append(dataset, record["idVariable"], row)
+            written += 1
+        metrics.incr("timeseries.points_appended", written, dataset=dataset)
+        return written
+
+    def compact(self, dataset, id_variable):
+        """Rewrite one series sorted by ``(fecha, asof)`` without redundant versions.
+
+        A version is redundant when the previous version of the same ``fecha``
+        has the same ``valor``.  The file is replaced atomically, so open
+        readers keep their old mapping; appends wait for it (``locked``).
+        Returns the number of rows kept.
+        """
+        path = self.path(dataset, id_variable)
+        with self.locked(path):
+            with open(path, "rb") as fh:
+                raw = fh.read()
+            rows = np.frombuffer(raw, RECORD, count=(len(raw) - HEADER.size) // RECORD.itemsize,
+                                 offset=HEADER.size)
+            rows = np.sort(rows, order=["fecha", "asof"], kind="stable")
+            same_fecha = rows["fecha"][1:] == rows["fecha"][:-1]
+            same_valor = (rows["valor"][1:] == rows["valor"][:-1]) | (
+                np.isnan(rows["valor"][1:]) & np.isnan(rows["valor"][:-1]))
+            rows = rows[np.r_[True, ~(same_fecha & same_valor)]]
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(_header(len(rows)))
+                fh.write(rows.tobytes())
+            os.replace(tmp, path)
+        return len(rows)
+
+    def compact_all(self, dataset, force=False):
+        """Compact the series of ``dataset`` with more than ``compact_tail`` unsorted rows.
+
+        Returns ``{id: rows kept}`` for the ones compacted.
+        """
+        compacted = {}
+        with metrics.timer("timeseries.compact_ms", dataset=dataset):
+            for id_variable in self.ids(dataset):
+                reader = self.reader(dataset, id_variable)
+                if reader is not None and (force or len(reader.tail) > self.compact_tail):
+                    compacted[id_variable] = self.compact(dataset, id_variable)
+        logging.info("Compacted %d %s series", len(compacted), dataset)
+        return compacted
+
+
+_series_store = None
+
+
+def get_series_store():
+    """Process-wide ``SeriesStore`` on ``SERIES_DIR`` (``None`` when unset)."""
+    global _series_store
+    root = os.environ.get("SERIES_DIR")
+    if not root:
+        return None
+    if _series_store is None or _series_store.root != root:
+        _series_store = SeriesStore(root, int(os.environ.get("SERIES_COMPACT_TAIL", COMPACT_TAIL)))
+    return _series_store
+
+
+def load_raw(store, series, desde, hasta, dataset="monetarias"):
+    """Append every ingest snapshot of ``[desde, hasta]``, using its timestamp as ``asof``.
+
+    Only what changed between consecutive snapshots is appended, as ingest does.
+    Returns the number of rows appended.
+    """
+    state = {}
+    appended = 0
+    for n in range((hasta - desde).days + 1):
+        day = desde + datetime.timedelta(days=n)
+        prefix = f"raw/{dataset}/year={day.year}/month={day.month:02d}/day={day.day:02d}/"
+        for path in store.list(prefix):
+            name = path.rsplit("/", 1)[-1]
+            if not name.startswith("vars_2"):
+                continue
+            stamp = name[len("vars_"):-len(rawformat.FORMATS[rawformat.format_for(path)]["ext"])]
+            records = list(rawformat.read_records(store, path))
+            changes = cdc.diff_records(records, state)
+            appended += series.append_records(dataset, changes, datetime.datetime.fromisoformat(stamp))
+            state = cdc.update_state(state, changes)
+    return appended
+
+
+def main(argv=None):
+    from .storage import open_store
+
+    parser = argparse.ArgumentParser(description="Build and compact the per-variable series files")
+    parser.add_argument("--desde", type=datetime.date.fromisoformat)
+    parser.add_argument("--hasta", type=datetime.date.fromisoformat)
+    parser.add_argument("--dataset", default="monetarias")
+    parser.add_argument("--series-dir", default=os.environ.get("SERIES_DIR"), required=not os.environ.get("SERIES_DIR"))
+    parser.add_argument("--local-dir", help="read a local directory instead of AZURE_STORAGE_CONN")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    series = SeriesStore(args.series_dir)
+    appended = 0
+    if args.desde:
+        appended = load_raw(open_store(args.local_dir), series, args.desde, args.hasta or args.desde, args.dataset)
+    compacted = series.compact_all(args.dataset, force=True)
+    print(json.dumps({"appended": appended, "series": len(compacted), "rows": sum(compacted.values())}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,9 @@
+import pytest
+
+from benchmarks.fake_bcra import FakeBCRA
+
+
+@pytest.fixture
+def fake_bcra():
+    with FakeBCRA() as server:
+        yield server
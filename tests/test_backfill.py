@@ -0,0 +1,123 @@
+import datetime
+import json
+
+import pytest
+
+from src.functions.shared_code import backfill, manifest
+from src.functions.shared_code.storage import LocalStore
+from benchmarks.fake_bcra import FakeBCRA
+
+
+DESDE = datetime.date(2025, 1, 1)
+HASTA = datetime.date(2025, 2, 14)
+
+
+class TestBackfill:
+    """Test suite para el backfill histórico paralelo"""
+
+    def test_date_chunks_cover_range(self):
+        """Test que los chunks cubren el rango sin huecos ni solapamientos"""
+        chunks = backfill.date_chunks(DESDE, HASTA, 20)
+
+        assert chunks[0][0] == DESDE
+        assert chunks[-1][1] == HASTA
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            assert start == end + datetime.timedelta(days=1)
+
+    def test_token_bucket_with_fractional_rate(self, monkeypatch):
+        """Test que un rate menor a 1 por segundo no bloquea para siempre"""
+        clock = [0.0]
+        monkeypatch.setattr(backfill.time, "monotonic", lambda: clock[0])
+        monkeypatch.setattr(backfill.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+        bucket = backfill.TokenBucket(10 / 16)
+
+        for _ in range(3):
+            bucket.acquire()
+
+        assert clock[0] == pytest.approx(2 * 16 / 10)
+
+    def test_backfill_writes_partitioned_layout(self, fake_bcra, tmp_path):
+        """Test que el backfill escribe en raw/monetarias/year=/month=/day="""
+        store = LocalStore(tmp_path)
+
+        summary = backfill.run_backfill(
+            store, DESDE, HASTA, base_url=fake_bcra.base_url,
+            workers=4, rate=1000, chunk_days=20,
+        )
+
+        assert summary["failed"] == 0
+        assert summary["records"] == 3 * 45
+        day = store.list("raw/monetarias/year=2025/month=02/day=14/")
+        assert len(day) == 3
+        rows = json.loads(store.read_bytes(day[0]))
+        assert set(rows[0]) == {"idVariable", "cdSerie", "descripcion", "fecha", "valor"}
+
+    def test_backfill_resumes_from_checkpoint(self, fake_bcra, tmp_path):
+        """Test que una segunda corrida no vuelve a pedir chunks completados"""
+        store = LocalStore(tmp_path)
+        backfill.run_backfill(store, DESDE, HASTA, base_url=fake_bcra.base_url,
+                              rate=1000, chunk_days=20)
+        fake_bcra.requests.clear()
+
+        summary = backfill.run_backfill(store, DESDE, HASTA, base_url=fake_bcra.base_url,
+                                        rate=1000, chunk_days=20)
+
+        assert summary["fetched"] == 0
+        assert summary["skipped"] == summary["chunks"]
+        assert len(fake_bcra.requests) == 1  # solo el listado de variables
+
+    def test_backfill_retries_transient_errors(self, tmp_path):
+        """Test que los 503 transitorios se reintentan con backoff"""
+        with FakeBCRA(n_variables=1, fail_first=2) as server:
+            summary = backfill.run_backfill(
+                LocalStore(tmp_path), DESDE, DESDE, base_url=server.base_url, rate=1000,
+            )
+
+        assert summary["failed"] == 0
+        assert summary["records"] == 1
+
+    def test_existing_chunks_match_start_and_end(self, fake_bcra, tmp_path):
+        """Test que un chunk existente solo se saltea si coinciden su inicio y su fin"""
+        store = LocalStore(tmp_path)
+        backfill.run_backfill(store, DESDE, HASTA, base_url=fake_bcra.base_url, rate=1000, chunk_days=20,
+                              variable_ids=[1])
+        manifest.rebuild(store, DESDE, HASTA)
+        store.delete(backfill.CHECKPOINT_PATH)
+
+        same = backfill.run_backfill(store, DESDE, HASTA, base_url=fake_bcra.base_url, rate=1000,
+                                     chunk_days=20, variable_ids=[1], skip_existing=True,
+                                     checkpoint_path="state/backfill/same.json")
+        wider = backfill.run_backfill(store, DESDE, HASTA, base_url=fake_bcra.base_url, rate=1000,
+                                      chunk_days=30, variable_ids=[1], skip_existing=True,
+                                      checkpoint_path="state/backfill/wider.json")
+
+        assert (same["skipped"], same["fetched"]) == (3, 0)
+        # [01-01, 01-30] empieza donde [01-01, 01-20] pero no es el mismo chunk
+        assert (wider["skipped"], wider["fetched"]) == (0, 2)
+        assert store.list("raw/monetarias/year=2025/month=01/day=01/") == [
+            "raw/monetarias/year=2025/month=01/day=01/vars_hist_1_2025-01-01_2025-01-20.json",
+            "raw/monetarias/year=2025/month=01/day=01/vars_hist_1_2025-01-01_2025-01-30.json",
+        ]
+
+
+class TestBackfillStart:
+    """Test suite para la validación del body de backfill_start"""
+
+    @pytest.mark.parametrize("body, message", [
+        (b"", "Body must be JSON"),
+        (b"desde=2020-01-01", "Body must be JSON"),
+        (b"[1, 2]", "Body must be a JSON object"),
+        (b"{}", "'desde' is required"),
+    ])
+    def test_invalid_body_is_a_400(self, body, message):
+        """Test que un body vacío, no JSON o sin 'desde' devuelve 400 explicando el problema"""
+        pytest.importorskip("azure.durable_functions")
+        import asyncio
+        import azure.functions as func
+        from src.functions.backfill_start import main
+
+        req = func.HttpRequest(method="POST", url="/api/backfill", body=body, headers={})
+        resp = asyncio.run(main(req, "{}"))
+
+        assert resp.status_code == 400
+        assert message in resp.get_body().decode()
@@ -1,30 +1,77 @@
 import pytest
 import json
 import datetime
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 import azure.functions as func
 from function_app import blob_alert
+from src.functions.shared_code import dedup, manifest, metrics
+from src.functions.shared_code.storage import MemoryStore
+
+
+@pytest.fixture(autouse=True)
+def notifier():
+    """Evita que los tests escriban en el buffer real de notificaciones"""
+    with patch('src.functions.shared_code.notifications.get_notifier') as get_notifier:
+        notifier = get_notifier.return_value
+        # los items (metadata, status, error) que se encolaron con add_many
+        notifier.queued = []
+        notifier.add_many.side_effect = notifier.queued.extend
+        yield notifier
+
+
+@pytest.fixture(autouse=True)
+def store():
+    """Store en memoria para los manifests de partición"""
+    memory = MemoryStore()
+    with patch('function_app.get_store', return_value=memory):
+        yield memory
+
+
+@pytest.fixture(autouse=True)
+def deduplicator():
+    """Deduplicador vacío por test (el global recuerda los eventos entre tests)"""
+    with patch.object(dedup, '_deduplicator', dedup.Deduplicator()) as fresh:
+        yield fresh
+
+
+@pytest.fixture
+def exporter():
+    previous = metrics.get_exporter()
+    yield metrics.set_exporter(metrics.InMemoryExporter())
+    metrics.set_exporter(previous)
+
+
+def write_created_blob(store, blob_name, event_type):
+    """Un BlobCreated implica que el blob existe: el manifest lo lee"""
+    if event_type == "Microsoft.Storage.BlobCreated" and store.read_bytes(blob_name) is None:
+        store.write_bytes(blob_name, "[]")
 
 
 class TestBlobAlert:
     """Test suite para la función blob_alert Event Grid trigger"""
 
-    def create_mock_event_grid_event(self, blob_name, event_type="Microsoft.Storage.BlobCreated"):
-        """Crea un mock de Event Grid event para testing"""
-        event_data = {
-            "url": f"https://cotizacionesbrfd.blob.core.windows.net/datalake/{blob_name}",
-            "subject": f"/blobServices/default/containers/datalake/blobs/{blob_name}",
-            "eventType": event_type,
-            "eventTime": datetime.datetime.utcnow().isoformat() + "Z",
-            "id": "test-event-id",
-            "dataVersion": "1.0"
-        }
-        
-        mock_event = Mock(spec=func.EventGridEvent)
-        mock_event.get_json.return_value = event_data
-        return mock_event
-
-    @patch('function_app.logging')
+    @pytest.fixture(autouse=True)
+    def use_store(self, store):
+        self.store = store
+
+    def create_mock_event_grid_event(self, blob_name, event_type="Microsoft.Storage.BlobCreated",
+                                     event_id="test-event-id", etag=None):
+        """Crea un func.EventGridEvent real: get_json() devuelve solo data, no el envelope"""
+        write_created_blob(self.store, blob_name, event_type)
+        data = {"url": f"https://cotizacionesbrfd.blob.core.windows.net/datalake/{blob_name}"}
+        if etag:
+            data["eTag"] = etag
+        return func.EventGridEvent(
+            id=event_id,
+            data=data,
+            topic="/subscriptions/x/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/cotizacionesbrfd",
+            subject=f"/blobServices/default/containers/datalake/blobs/{blob_name}",
+            event_type=event_type,
+            event_time=datetime.datetime.utcnow(),
+            data_version="1.0",
+        )
+
+    @patch('src.functions.shared_code.dispatch.logging')
     def test_blob_alert_processes_monetarias_blob(self, mock_logging):
         """Test que blob_alert procesa correctamente blobs de monetarias"""
         # Arrange
@@ -48,7 +95,7 @@ class TestBlobAlert:
         metadata_calls = [call for call in logged_calls if "Processed blob metadata" in call]
         assert len(metadata_calls) > 0
 
-    @patch('function_app.logging')
+    @patch('src.functions.shared_code.dispatch.logging')
     def test_blob_alert_ignores_non_monetarias_blob(self, mock_logging):
         """Test que blob_alert ignora blobs que no son de monetarias"""
         # Arrange
@@ -62,7 +109,7 @@ class TestBlobAlert:
         logged_calls = [call.args[0] for call in mock_logging.info.call_args_list]
         assert any("Ignoring event" in call for call in logged_calls)
 
-    @patch('function_app.logging')
+    @patch('src.functions.shared_code.dispatch.logging')
     def test_blob_alert_extracts_date_metadata(self, mock_logging):
         """Test que blob_alert extrae correctamente la metadata de fecha"""
         # Arrange
@@ -83,7 +130,7 @@ class TestBlobAlert:
         assert "07" in metadata_str
         assert "29" in metadata_str
 
-    @patch('function_app.logging')
+    @patch('src.functions.shared_code.dispatch.logging')
     def test_blob_alert_handles_different_event_types(self, mock_logging):
         """Test que blob_alert maneja diferentes tipos de eventos correctamente"""
         # Arrange
@@ -97,7 +144,7 @@ class TestBlobAlert:
         logged_calls = [call.args[0] for call in mock_logging.info.call_args_list]
         assert any("Ignoring event" in call for call in logged_calls)
 
-    @patch('function_app.logging')
+    @patch('src.functions.shared_code.dispatch.logging')
     def test_blob_alert_creates_custom_telemetry(self, mock_logging):
         """Test que blob_alert crea telemetría personalizada"""
         # Arrange
@@ -119,9 +166,9 @@ class TestBlobAlert:
         assert "event_type" in custom_event_str
         assert "data_source" in custom_event_str
 
-    @patch('function_app.logging')
-    def test_blob_alert_notification_format(self, mock_logging):
-        """Test que blob_alert genera notificaciones con el formato correcto"""
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_blob_alert_buffers_notification_for_digest(self, mock_logging, notifier):
+        """Test que blob_alert encola la notificación en el digest en lugar de enviarla por blob"""
         # Arrange
         blob_name = "raw/monetarias/year=2025/month=07/day=29/vars_test.json"
         mock_event = self.create_mock_event_grid_event(blob_name)
@@ -130,14 +177,182 @@ class TestBlobAlert:
         blob_alert(mock_event)
         
         # Assert
+        assert len(notifier.queued) == 1
+        metadata = notifier.queued[0][0]
+        assert metadata['blob_name'] == blob_name
+        assert (metadata['year'], metadata['month'], metadata['day']) == ('2025', '07', '29')
+
         logged_calls = [call.args[0] for call in mock_logging.info.call_args_list]
-        notification_calls = [call for call in logged_calls if "BCRA_NOTIFICATION" in call]
-        
-        assert len(notification_calls) > 0
-        
-        notification_str = notification_calls[0]
-        # Verificar que contiene los elementos esperados de la notificación
-        assert "BCRA Pipeline Alert" in notification_str
-        assert "Nuevo archivo procesado" in notification_str
-        assert "📁 Archivo:" in notification_str
-        assert "✅ Estado:" in notification_str
+        assert not any("BCRA_NOTIFICATION" in call for call in logged_calls)
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_blob_alert_records_blob_in_manifest(self, mock_logging, store):
+        """Test que blob_alert agrega el blob al manifest de su partición"""
+        blob_name = "raw/monetarias/year=2025/month=07/day=29/vars_2025-07-29T15:30:00Z.json"
+        store.write_bytes(blob_name, json.dumps({"results": [
+            {"idVariable": 1, "fecha": "2025-07-28", "valor": 1.0},
+            {"idVariable": 2, "fecha": "2025-07-29", "valor": 2.0},
+        ]}))
+
+        blob_alert(self.create_mock_event_grid_event(blob_name))
+
+        entry = manifest.load_manifest(store, datetime.date(2025, 7, 29))["files"]["vars_2025-07-29T15:30:00Z.json"]
+        assert entry["records"] == 2
+        assert (entry["min_fecha"], entry["max_fecha"]) == ("2025-07-28", "2025-07-29")
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_blob_alert_ignored_events_are_not_notified(self, mock_logging, notifier):
+        """Test que los eventos ignorados no se encolan"""
+        mock_event = self.create_mock_event_grid_event("raw/other/year=2025/month=07/day=29/x.json")
+
+        blob_alert(mock_event)
+
+        assert notifier.queued == []
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_blob_alert_suppresses_redelivered_event(self, mock_logging, notifier, exporter):
+        """Test que una redelivery del mismo evento no se procesa dos veces"""
+        blob_name = "raw/monetarias/year=2025/month=07/day=29/vars_test.json"
+
+        blob_alert(self.create_mock_event_grid_event(blob_name, event_id="evt-1"))
+        blob_alert(self.create_mock_event_grid_event(blob_name, event_id="evt-1"))
+
+        assert len(notifier.queued) == 1
+        assert exporter.counters["blob_alert.events_suppressed"] == 1
+        logged_calls = [call.args[0] for call in mock_logging.info.call_args_list]
+        assert len([c for c in logged_calls if "CUSTOM_EVENT_BCRA_BLOB_PROCESSED" in c]) == 1
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_blob_alert_suppresses_same_blob_etag(self, mock_logging, notifier):
+        """Test que un evento nuevo para el mismo blob y ETag se descarta, y con otro ETag no"""
+        blob_name = "raw/monetarias/year=2025/month=07/day=29/vars_test.json"
+
+        blob_alert(self.create_mock_event_grid_event(blob_name, event_id="evt-1", etag="0x1"))
+        blob_alert(self.create_mock_event_grid_event(blob_name, event_id="evt-2", etag="0x1"))
+        blob_alert(self.create_mock_event_grid_event(blob_name, event_id="evt-3", etag="0x2"))
+
+        assert len(notifier.queued) == 2
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_blob_alert_dedup_is_shared_between_workers(self, mock_logging, notifier, store):
+        """Test que otro worker (sin LRU) descarta el duplicado por el filtro persistido"""
+        blob_name = "raw/monetarias/year=2025/month=07/day=29/vars_test.json"
+        blob_alert(self.create_mock_event_grid_event(blob_name, event_id="evt-1"))
+
+        with patch.object(dedup, '_deduplicator', dedup.Deduplicator()):
+            blob_alert(self.create_mock_event_grid_event(blob_name, event_id="evt-1"))
+
+        assert len(notifier.queued) == 1
+        assert store.read_bytes(dedup.DEDUP_PATH) is not None
+
+
+class TestBlobAlertBatch:
+    """Test suite para el modo batch de blob_alert (webhook de Event Grid)"""
+
+    def make_request(self, body, method="POST", headers=None):
+        return func.HttpRequest(
+            method=method,
+            url="/api/blob_alert/batch",
+            headers=headers or {},
+            body=json.dumps(body).encode() if body is not None else b"",
+        )
+
+    @pytest.fixture(autouse=True)
+    def use_store(self, store):
+        self.store = store
+
+    def make_event(self, blob_name, event_type="Microsoft.Storage.BlobCreated", cloud_events=False,
+                   event_id=None):
+        write_created_blob(self.store, blob_name, event_type)
+        subject = f"/blobServices/default/containers/datalake/blobs/{blob_name}"
+        data = {"url": f"https://cotizacionesbrfd.blob.core.windows.net/datalake/{blob_name}"}
+        if cloud_events:
+            return {"id": event_id or blob_name, "type": event_type, "subject": subject,
+                    "time": "2025-07-29T15:30:00Z", "data": data}
+        return {"id": event_id or blob_name, "eventType": event_type, "subject": subject,
+                "eventTime": "2025-07-29T15:30:00Z", "data": data}
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_batch_classifies_all_events_in_one_record(self, mock_logging):
+        """Test que un batch emite un único registro de telemetría agregado"""
+        body = [
+            self.make_event("raw/monetarias/year=2025/month=07/day=29/vars_a.json"),
+            self.make_event("raw/monetarias/year=2025/month=07/day=29/vars_b.json", cloud_events=True),
+            self.make_event("raw/monetarias/year=2025/month=07/day=30/vars_c.json"),
+            self.make_event("raw/other/year=2025/month=07/day=29/x.json"),
+            self.make_event("raw/monetarias/year=2025/month=07/day=29/vars_d.json",
+                            "Microsoft.Storage.BlobDeleted"),
+        ]
+
+        from function_app import blob_alert_batch
+        response = blob_alert_batch(self.make_request(body))
+
+        telemetry = json.loads(response.get_body())
+        assert telemetry["processed"] == 3
+        assert telemetry["ignored"] == 2
+        assert telemetry["partitions"] == {"2025-07-29": 2, "2025-07-30": 1}
+        logged_calls = [call.args[0] for call in mock_logging.info.call_args_list]
+        assert len([c for c in logged_calls if "CUSTOM_EVENT_BCRA_BLOB_BATCH_PROCESSED" in c]) == 1
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_batch_updates_partition_manifests(self, mock_logging, store):
+        """Test que el batch registra los blobs en el manifest de cada partición y en el índice"""
+        names = ["raw/monetarias/year=2025/month=07/day=29/vars_a.json",
+                 "raw/monetarias/year=2025/month=07/day=30/vars_b.json"]
+        for name in names:
+            store.write_bytes(name, json.dumps([{"idVariable": 1, "fecha": "2025-07-28", "valor": 1.0}]))
+
+        from function_app import blob_alert_batch
+        response = blob_alert_batch(self.make_request([self.make_event(n) for n in names]))
+
+        assert json.loads(response.get_body())["manifest_updated"] is True
+        assert manifest.partition_blobs(store, datetime.date(2025, 7, 30)) == names[1:]
+        assert set(manifest.load_index(store)["partitions"]) == {"2025-07-29", "2025-07-30"}
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_batch_manifest_failure_asks_for_redelivery(self, mock_logging, store):
+        """Test que si falla el manifest el webhook responde 503 y no marca los eventos"""
+        from function_app import blob_alert_batch
+        body = [self.make_event("raw/monetarias/year=2025/month=07/day=29/vars_a.json")]
+
+        with patch.object(manifest, "record_blobs", side_effect=RuntimeError("boom")):
+            assert blob_alert_batch(self.make_request(body)).status_code == 503
+        telemetry = json.loads(blob_alert_batch(self.make_request(body)).get_body())
+
+        assert (telemetry["processed"], telemetry["suppressed"]) == (1, 0)
+        assert telemetry["manifest_updated"] is True
+
+    @patch('src.functions.shared_code.dispatch.logging')
+    def test_batch_suppresses_duplicates(self, mock_logging, exporter):
+        """Test que el batch descarta eventos repetidos dentro del batch y entre batches"""
+        from function_app import blob_alert_batch
+        first = [self.make_event("raw/monetarias/year=2025/month=07/day=29/vars_a.json")]
+        blob_alert_batch(self.make_request(first))
+
+        body = first + [
+            self.make_event("raw/monetarias/year=2025/month=07/day=30/vars_b.json"),
+            self.make_event("raw/monetarias/year=2025/month=07/day=30/vars_b.json"),
+        ]
+        telemetry = json.loads(blob_alert_batch(self.make_request(body)).get_body())
+
+        assert (telemetry["processed"], telemetry["suppressed"]) == (1, 2)
+        assert telemetry["partitions"] == {"2025-07-30": 1}
+        assert exporter.counters["blob_alert.events_suppressed"] == 2
+
+    def test_batch_answers_subscription_validation(self):
+        """Test que el endpoint responde el handshake de validación de Event Grid"""
+        body = [{"eventType": "Microsoft.EventGrid.SubscriptionValidationEvent",
+                 "data": {"validationCode": "abc-123"}}]
+
+        from function_app import blob_alert_batch
+        response = blob_alert_batch(self.make_request(body))
+
+        assert json.loads(response.get_body()) == {"validationResponse": "abc-123"}
+
+    def test_batch_answers_cloudevents_abuse_protection(self):
+        """Test que el endpoint responde el OPTIONS de CloudEvents"""
+        from function_app import blob_alert_batch
+        response = blob_alert_batch(self.make_request(
+            None, method="OPTIONS", headers={"WebHook-Request-Origin": "eventgrid.azure.net"}))
+
+        assert response.headers["WebHook-Allowed-Origin"] == "eventgrid.azure.net"
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from src.functions.shared_code import clients
+
+CONN = "DefaultEndpointsProtocol=https;AccountName=devaccount;AccountKey=ZGV2a2V5;EndpointSuffix=core.windows.net"
+
+
+class TestClients:
+    """Test suite para los clientes compartidos a nivel de módulo"""
+
+    @pytest.fixture(autouse=True)
+    def reset_clients(self):
+        clients.reset()
+        yield
+        clients.reset()
+
+    def test_http_session_is_reused(self):
+        """Test que la sesión HTTP keep-alive se crea una sola vez"""
+        assert clients.get_http_session() is clients.get_http_session()
+
+    def test_http_session_has_retry_policy(self):
+        """Test que el adapter HTTPS reintenta 429/5xx"""
+        adapter = clients.get_http_session().get_adapter("https://api.bcra.gob.ar")
+        assert adapter.max_retries.total == 3
+        assert 503 in adapter.max_retries.status_forcelist
+
+    def test_blob_service_is_cached_per_connection_string(self, monkeypatch):
+        """Test que el BlobServiceClient se cachea por connection string"""
+        monkeypatch.setenv("AZURE_STORAGE_CONN", CONN)
+
+        first = clients.get_blob_service()
+
+        assert clients.get_blob_service() is first
+        assert clients.get_container().container_name == "datalake"
+
+    def test_aiohttp_session_is_cached_per_host_limit(self):
+        """Test que pedir otro límite por host no devuelve la sesión cacheada con el anterior"""
+        async def go():
+            default, again = clients.get_aiohttp_session(), clients.get_aiohttp_session()
+            limited = clients.get_aiohttp_session(per_host=2)
+            try:
+                return default is again, limited is not default, limited.connector.limit_per_host
+            finally:
+                await clients.aclose()
+
+        assert asyncio.run(go()) == (True, True, 2)
@@ -0,0 +1,124 @@
+import datetime
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.functions.shared_code import compactor, metrics
+from src.functions.shared_code.storage import LocalStore, MemoryStore
+
+
+DAY = datetime.date(2025, 7, 29)
+RAW = "raw/monetarias/year=2025/month=07/day=29"
+
+
+def snapshot(valor_1):
+    return [
+        {"idVariable": 2, "cdSerie": "7936", "descripcion": "Base monetaria", "fecha": "2025-07-28", "valor": 15000000.75},
+        {"idVariable": 1, "cdSerie": "7935", "descripcion": "Reservas", "fecha": "2025-07-29", "valor": valor_1},
+    ]
+
+
+@pytest.fixture
+def exporter():
+    previous = metrics.get_exporter()
+    yield metrics.set_exporter(metrics.InMemoryExporter())
+    metrics.set_exporter(previous)
+
+
+class TestCompactor:
+    """Test suite para el compactador JSON → Parquet"""
+
+    def test_compact_day_writes_typed_sorted_parquet(self, tmp_path):
+        """Test que el Parquet tiene el schema curado y está ordenado por (id_variable, fecha)"""
+        store = LocalStore(tmp_path)
+        store.write_bytes(f"{RAW}/vars_2025-07-29T10:05:00.json", json.dumps(snapshot(25000.5)))
+
+        rows = compactor.compact_day(store, DAY)
+
+        table = pq.read_table(tmp_path / "processed/monetarias/year=2025/month=07/day=29/part-0.parquet")
+        assert rows == 2
+        assert table.schema.field("valor").type == pa.decimal128(28, 8)
+        assert table.schema.field("fecha").type == pa.date32()
+        assert pa.types.is_dictionary(table.schema.field("descripcion").type)
+        assert table["id_variable"].to_pylist() == [1, 2]
+
+    def test_compact_day_dedupes_hourly_snapshots(self, tmp_path):
+        """Test que snapshots repetidos del día se deduplican y gana el último"""
+        store = LocalStore(tmp_path)
+        store.write_bytes(f"{RAW}/vars_2025-07-29T10:05:00.json", json.dumps(snapshot(25000.5)))
+        store.write_bytes(f"{RAW}/vars_2025-07-29T11:05:00.json", json.dumps({"results": snapshot(25100.0)}))
+        store.write_bytes(f"{RAW}/changes_2025-07-29T11:05:00.json", json.dumps(snapshot(0.0)))
+
+        compactor.compact_day(store, DAY)
+
+        table = compactor.read_day(store, DAY)
+        assert table.num_rows == 2
+        assert float(table["valor"][0].as_py()) == 25100.0
+
+    def test_integer_cd_serie_is_stored_as_string(self, tmp_path):
+        """Test que el cdSerie entero de la API v3.0 se guarda como texto, como el mapping de ADF"""
+        store = LocalStore(tmp_path)
+        records = snapshot(25000.5)
+        records[0]["cdSerie"], records[1]["cdSerie"] = 7936, None
+        store.write_bytes(f"{RAW}/vars_2025-07-29T10:05:00.json", json.dumps({"results": records}))
+
+        assert compactor.compact_day(store, DAY) == 2
+
+        table = compactor.read_day(store, DAY)
+        assert table["codigo_serie"].to_pylist() == [None, "7936"]
+
+    def test_row_group_statistics_are_written(self, tmp_path):
+        """Test que el Parquet guarda estadísticas por row group"""
+        store = LocalStore(tmp_path)
+        store.write_bytes(f"{RAW}/vars_2025-07-29T10:05:00.json", json.dumps(snapshot(25000.5)))
+        compactor.compact_day(store, DAY)
+
+        metadata = pq.ParquetFile(
+            tmp_path / "processed/monetarias/year=2025/month=07/day=29/part-0.parquet"
+        ).metadata
+        stats = metadata.row_group(0).column(0).statistics
+        assert (stats.min, stats.max) == (1, 2)
+
+    def test_compact_range_in_parallel(self, tmp_path):
+        """Test que compact_range procesa varios días en un pool de procesos"""
+        store = LocalStore(tmp_path)
+        for day in (28, 29):
+            store.write_bytes(
+                f"raw/monetarias/year=2025/month=07/day={day}/vars_x.json", json.dumps(snapshot(1.0))
+            )
+
+        result = compactor.compact_range(
+            datetime.date(2025, 7, 27), DAY, local_dir=str(tmp_path), processes=2
+        )
+
+        assert result == {datetime.date(2025, 7, 27): 0, datetime.date(2025, 7, 28): 2, DAY: 2}
+
+    def test_compact_range_with_store_runs_in_process(self):
+        """Test que con un store explícito compact_range lo usa en lugar de abrir otro"""
+        store = MemoryStore()
+        for day in (28, 29):
+            store.write_bytes(
+                f"raw/monetarias/year=2025/month=07/day={day}/vars_x.json", json.dumps(snapshot(1.0))
+            )
+
+        result = compactor.compact_range(datetime.date(2025, 7, 28), DAY, store=store)
+
+        assert result == {datetime.date(2025, 7, 28): 2, DAY: 2}
+        with pytest.raises(ValueError):
+            compactor.compact_range(datetime.date(2025, 7, 28), DAY, store=store, processes=2)
+
+    def test_invalid_fecha_drops_the_record_not_the_day(self, tmp_path, exporter):
+        """Test que un fecha inválido descarta ese registro y el resto del día se compacta"""
+        store = LocalStore(tmp_path)
+        records = snapshot(25000.5) + [
+            {"idVariable": 3, "cdSerie": "7937", "descripcion": "Tasa", "fecha": "29/07/2025", "valor": 1.0},
+            {"idVariable": 4, "cdSerie": "7938", "descripcion": "Tasa", "fecha": "2025-13-01", "valor": 1.0},
+        ]
+        store.write_bytes(f"{RAW}/vars_2025-07-29T10:05:00.json", json.dumps(records))
+
+        table = compactor.read_day(store, DAY)
+
+        assert table["id_variable"].to_pylist() == [1, 2]
+        assert exporter.counters["compactor.invalid_fecha"] == 2
@@ -0,0 +1,91 @@
+import threading
+
+from src.functions.shared_code import dedup
+from src.functions.shared_code.storage import MemoryStore
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestDedup:
+    """Test suite para la supresión de eventos duplicados de blob_alert"""
+
+    def test_event_keys(self):
+        """Test que las claves combinan id de evento y ETag del blob"""
+        assert dedup.event_keys("e1", "raw/x.json", "0x1") == ["id:e1", "etag:raw/x.json:0x1"]
+        assert dedup.event_keys("", "raw/x.json", "") == []
+
+    def test_lru_is_bounded(self):
+        """Test que el LRU descarta la clave menos usada al llenarse"""
+        lru = dedup.LRUSet(maxsize=2)
+        lru.add("a")
+        lru.add("b")
+        assert "a" in lru
+        lru.add("c")
+
+        assert len(lru) == 2
+        assert "a" in lru and "c" in lru and "b" not in lru
+
+    def test_bloom_roundtrip_and_rotation(self):
+        """Test que el filtro sobrevive la serialización y olvida tras dos rotaciones"""
+        bloom = dedup.RotatingBloomFilter(bits=1 << 14, rotate_seconds=100, started_at=0)
+        bloom.add("id:e1")
+        bloom = dedup.RotatingBloomFilter.from_bytes(bloom.to_bytes(), rotate_seconds=100)
+        assert "id:e1" in bloom
+        assert "id:e2" not in bloom
+
+        assert bloom.rotate(150)
+        assert "id:e1" in bloom            # sigue en la generación anterior
+        assert bloom.rotate(250)
+        assert "id:e1" not in bloom
+
+    def test_bloom_size_is_independent_of_event_count(self):
+        """Test que el filtro persistido no crece con la cantidad de eventos"""
+        store = MemoryStore()
+        deduplicator = dedup.Deduplicator(lru_size=100, bits=1 << 16)
+        deduplicator.mark(store, [["id:0"]])
+        size = len(dedup.RotatingBloomFilter.from_bytes(store.read_bytes(dedup.DEDUP_PATH)).current)
+
+        deduplicator.mark(store, [[f"id:{i}"] for i in range(5000)])
+
+        bloom = dedup.RotatingBloomFilter.from_bytes(store.read_bytes(dedup.DEDUP_PATH))
+        assert len(bloom.current) == size
+        assert len(deduplicator.lru) == 100
+        assert all(f"id:{i}" in bloom for i in range(5000))
+
+    def test_duplicates_within_and_across_calls(self):
+        """Test que se detectan repetidos dentro de una llamada y contra lo ya marcado"""
+        store = MemoryStore()
+        deduplicator = dedup.Deduplicator()
+        deduplicator.mark(store, [["id:a"]])
+
+        assert deduplicator.duplicates(store, [["id:a"], ["id:b"], ["id:b"], []]) == [True, False, True, False]
+
+    def test_expired_keys_are_processed_again(self):
+        """Test que una clave vieja (más de dos rotaciones) deja de suprimirse"""
+        store, clock = MemoryStore(), FakeClock()
+        deduplicator = dedup.Deduplicator(rotate_seconds=60, clock=clock)
+        deduplicator.mark(store, [["id:a"]])
+
+        clock.now += 200
+        deduplicator.mark(store, [["id:b"]])          # rota el filtro persistido
+        other_worker = dedup.Deduplicator(rotate_seconds=60, clock=clock)
+
+        assert other_worker.duplicates(store, [["id:a"], ["id:b"]]) == [False, True]
+
+    def test_concurrent_marks_keep_every_key(self):
+        """Test que marcas concurrentes de varios workers no se pisan"""
+        store = MemoryStore()
+        workers = [dedup.Deduplicator() for _ in range(8)]
+        threads = [threading.Thread(target=w.mark, args=(store, [[f"id:{i}"]])) for i, w in enumerate(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert dedup.Deduplicator().duplicates(store, [[f"id:{i}"] for i in range(8)]) == [True] * 8
@@ -0,0 +1,190 @@
+import datetime
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.functions.shared_code import dedup, dispatch, events, manifest, metrics
+from src.functions.shared_code.storage import MemoryStore
+
+BLOB = "raw/monetarias/year=2025/month=07/day=29/vars_2025-07-29T15:30:00.json"
+
+
+def event(blob_name=BLOB, event_type="Microsoft.Storage.BlobCreated", event_id="evt-1"):
+    return {"id": event_id, "eventType": event_type, "eventTime": "2025-07-29T15:30:00Z",
+            "subject": f"{events.SUBJECT_PREFIX}{blob_name}", "data": {"url": f"https://x/{blob_name}"}}
+
+
+@pytest.fixture(autouse=True)
+def fresh_dedup():
+    with patch.object(dedup, "_deduplicator", dedup.Deduplicator()):
+        yield
+
+
+@pytest.fixture
+def notifier():
+    with patch("src.functions.shared_code.notifications.get_notifier") as get_notifier:
+        notifier = get_notifier.return_value
+        # los items (metadata, status, error) que se encolaron con add_many
+        notifier.queued = []
+        notifier.add_many.side_effect = notifier.queued.extend
+        yield notifier
+
+
+@pytest.fixture
+def exporter():
+    previous = metrics.get_exporter()
+    yield metrics.set_exporter(metrics.InMemoryExporter())
+    metrics.set_exporter(previous)
+
+
+def grid_event(blob_name=BLOB, event_id="evt-1"):
+    """``func.EventGridEvent`` como lo entrega el host: get_json() es solo ``data``"""
+    import azure.functions as func
+
+    return func.EventGridEvent(id=event_id, data={"url": f"https://x/{blob_name}"}, topic="/storage",
+                               subject=f"{events.SUBJECT_PREFIX}{blob_name}", event_type=events.BLOB_CREATED,
+                               event_time=datetime.datetime(2025, 7, 29, 15, 30), data_version="1.0")
+
+
+def handlers(**fns):
+    return {name: dispatch.Handler(name, fn, timeout) for name, (fn, timeout) in fns.items()}
+
+
+class TestDispatch:
+    """Test suite para el núcleo compartido de procesamiento de eventos"""
+
+    def test_fast_path_rejects_before_classifying(self):
+        """Test que los eventos irrelevantes se descartan sin normalizar ni abrir el store"""
+        store_factory = Mock()
+        raw_events = [event(event_type="Microsoft.Storage.BlobDeleted"), event("processed/x/part-0.parquet")]
+
+        with patch.object(events, "normalize") as normalize:
+            _, results, telemetry = dispatch.process(raw_events, store_factory)
+
+        normalize.assert_not_called()
+        store_factory.assert_not_called()
+        assert (telemetry["ignored"], results) == (2, {})
+
+    def test_handlers_run_concurrently(self):
+        """Test que los handlers corren en paralelo en el pool de threads"""
+        barrier = threading.Barrier(2, timeout=2)
+
+        def wait(context):
+            return barrier.wait() is not None
+
+        _, results, _ = dispatch.process([event()], MemoryStore, handlers(a=(wait, 5), b=(wait, 5)))
+
+        assert results == {"a": ("ok", True), "b": ("ok", True)}
+
+    def test_failures_and_timeouts_are_isolated(self, exporter):
+        """Test que un handler que falla o se cuelga no afecta a los demás"""
+        release = threading.Event()
+        seen = []
+
+        def boom(context):
+            raise RuntimeError("webhook down")
+
+        def slow(context):
+            release.wait(2)
+
+        started = time.monotonic()
+        _, results, telemetry = dispatch.process([event()], MemoryStore, handlers(
+            boom=(boom, None), slow=(slow, 0.05), ok=(lambda c: seen.extend(c.events) or "done", None)))
+        elapsed = time.monotonic() - started
+        release.set()
+
+        assert elapsed < 1
+        assert telemetry["handlers"] == {"boom": "failed", "slow": "timeout", "ok": "ok"}
+        assert results["ok"].value == "done" and [e.blob_name for e in seen] == [BLOB]
+        assert exporter.counters["blob_alert.handler_failed"] == 1
+        assert exporter.counters["blob_alert.handler_timeouts"] == 1
+
+    def test_failed_handler_leaves_event_for_redelivery(self, notifier):
+        """Test que si un handler falla el evento no se marca y la redelivery se procesa"""
+        def boom(context):
+            raise RuntimeError("boom")
+
+        store = MemoryStore()
+        store.write_bytes(BLOB, b'[{"idVariable": 1, "fecha": "2025-07-29", "valor": 1.0}]')
+        _, _, first = dispatch.process([event()], lambda: store, handlers(boom=(boom, None)))
+        _, _, second = dispatch.process([event()], lambda: store)
+
+        assert first["handlers"] == {"boom": "failed"}
+        assert (second["suppressed"], second["processed"]) == (0, 1)
+        assert manifest.partition_blobs(store, datetime.date(2025, 7, 29)) == [BLOB]
+
+    def test_failed_handlers_reach_the_digest(self, notifier):
+        """Test que los eventos cuyos handlers fallaron se encolan como fallidos para el digest"""
+        def boom(context):
+            raise RuntimeError("webhook down")
+
+        dispatch.process([event()], MemoryStore, handlers(boom=(boom, None)))
+
+        [(data, status, error)] = notifier.queued
+        assert data["blob_name"] == BLOB
+        assert (status, error) == ("failed", "boom: webhook down")
+
+    def test_quarantined_snapshots_are_notified(self, notifier):
+        """Test que los snapshots en cuarentena llegan al digest y no al manifest"""
+        quarantined = "quarantine/monetarias/year=2025/month=07/day=29/vars_2025-07-29T15:30:00.json"
+        store = MemoryStore()
+
+        _, results, _ = dispatch.process([event(quarantined)], lambda: store)
+
+        assert results["manifest"] == ("ok", False)
+        assert notifier.queued[-1][1:] == ("quarantined", "quarantine")
+        assert manifest.load_manifest(store, datetime.date(2025, 7, 29)) is None
+
+    def test_manifest_failure_raises_for_retry(self, notifier):
+        """Test que una falla del manifest hace fallar la invocación para que Event Grid reintente"""
+        store = MemoryStore()
+        with patch.object(manifest, "record_blobs", side_effect=RuntimeError("CAS gave up")):
+            with pytest.raises(dispatch.HandlerFailed):
+                dispatch.handle_event(event(), lambda: store)
+            with pytest.raises(dispatch.HandlerFailed):
+                dispatch.handle_batch([event()], lambda: store)
+
+        store.write_bytes(BLOB, b'[{"idVariable": 1, "fecha": "2025-07-29", "valor": 1.0}]')
+        telemetry = dispatch.handle_event(event(), lambda: store)
+
+        assert telemetry["handlers"] == {"manifest": "ok", "notify": "ok"}
+        assert manifest.partition_blobs(store, datetime.date(2025, 7, 29)) == [BLOB]
+
+    def test_v1_and_v2_entry_points_share_the_core(self, notifier):
+        """Test que blob_alert v1 y v2 encolan la notificación y actualizan el manifest igual"""
+        import function_app
+        import blob_alert
+
+        stores = []
+        for module, name in ((function_app, "blob_alert"), (blob_alert, "main")):
+            store = MemoryStore()
+            store.write_bytes(BLOB, b'[{"idVariable": 1, "fecha": "2025-07-29", "valor": 1.0}]')
+            with patch.object(module, "get_store", return_value=store):
+                getattr(module, name)(grid_event(event_id=f"{module.__name__}-evt"))
+            stores.append(store)
+
+        assert len(notifier.queued) == 2
+        first, second = (data for data, _, _ in notifier.queued)
+        assert {k: v for k, v in first.items() if k != "processed_time"} == \
+            {k: v for k, v in second.items() if k != "processed_time"}
+        for store in stores:
+            assert manifest.partition_blobs(store, datetime.date(2025, 7, 29)) == [BLOB]
+
+    def test_redelivered_trigger_event_is_suppressed(self, notifier, exporter):
+        """Test que el mismo EventGridEvent entregado dos veces a cada adaptador se procesa una sola vez"""
+        import function_app
+        import blob_alert
+
+        for module, name in ((function_app, "blob_alert"), (blob_alert, "main")):
+            store = MemoryStore()
+            store.write_bytes(BLOB, b'[{"idVariable": 1, "fecha": "2025-07-29", "valor": 1.0}]')
+            delivery = grid_event(event_id=f"{module.__name__}-evt")
+            with patch.object(module, "get_store", return_value=store):
+                getattr(module, name)(delivery)
+                getattr(module, name)(delivery)
+
+        assert len(notifier.queued) == 2
+        assert exporter.counters["blob_alert.events_processed"] == 2
+        assert exporter.counters["blob_alert.events_suppressed"] == 2
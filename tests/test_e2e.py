@@ -0,0 +1,61 @@
+import argparse
+import io
+import json
+from unittest.mock import Mock
+
+from benchmarks import cold_start, e2e
+from src.functions.shared_code import metrics
+from src.functions.shared_code.storage import BlobStore, MemoryStore
+
+
+class TestEndToEndBenchmark:
+    """Test suite para el benchmark offline ingest → blob_alert → Parquet"""
+
+    def test_memory_store_roundtrip(self):
+        """Test que MemoryStore cumple la interfaz de los stores"""
+        store = MemoryStore()
+        store.write_bytes("raw/a.json", "{}")
+        store.write_bytes("raw/b.json", iter([b"[", b"]"]))
+
+        assert store.list("raw/") == ["raw/a.json", "raw/b.json"]
+        assert b"".join(store.iter_chunks("raw/b.json", chunk_size=1)) == b"[]"
+        store.delete("raw/a.json")
+        assert store.read_bytes("raw/a.json") is None
+
+    def test_blob_store_chunks_honor_chunk_size(self):
+        """Test que BlobStore.iter_chunks respeta el tamaño de chunk pedido"""
+        container = Mock()
+        container.download_blob.side_effect = lambda path, **kwargs: io.BytesIO(b"0123456789")
+
+        chunks = list(BlobStore(container).iter_chunks("raw/a.json", chunk_size=4))
+
+        assert chunks == [b"0123", b"4567", b"89"]
+
+    def test_small_run_covers_every_stage(self):
+        """Test que una corrida chica pasa por las tres etapas y reporta percentiles"""
+        args = argparse.Namespace(variables=20, snapshots=3, events=10, latency_ms=0, description_bytes=0)
+        previous = metrics.get_exporter()
+        try:
+            stages, stage_metrics = e2e.run(args, MemoryStore())
+        finally:
+            metrics.set_exporter(previous)
+
+        assert stages["ingest"]["records"] == 60
+        assert stages["blob_alert"]["calls"] == 10
+        assert stages["compact"]["input_blobs"] == 3
+        assert stages["compact"]["rows_written"] == 20
+        assert stages["ingest"]["latency_ms"]["p99"] >= stages["ingest"]["latency_ms"]["p50"]
+        assert stage_metrics["ingest.snapshots_written"]["total"] == 3
+
+
+class TestColdStartBenchmark:
+    """Test suite para el benchmark de arranque en frío documentado en el README"""
+
+    def test_single_run_measures_both_functions(self, capsys):
+        """Test que una corrida mide ingest_bcra y blob_alert sin que el worker falle"""
+        assert cold_start.main(["--runs", "1", "--variables", "5"]) == 0
+
+        result = json.loads(capsys.readouterr().out)
+        assert set(result["results"]) == {"ingest_bcra", "blob_alert"}
+        for metrics_ in result["results"].values():
+            assert set(metrics_) == {"import_ms", "first_invocation_ms", "warm_invocation_ms"}
@@ -0,0 +1,116 @@
+import datetime
+import json
+
+import pytest
+
+from src.functions.shared_code import compactor, dispatch, events, freshness, ingest, manifest
+from src.functions.shared_code.storage import MemoryStore
+
+DAY = datetime.date(2025, 7, 29)
+INGESTED = datetime.datetime(2025, 7, 29, 15, 30)
+PAYLOAD = {"status": 200, "results": [
+    {"idVariable": 1, "cdSerie": "7927", "descripcion": "Reservas", "fecha": "2025-07-29", "valor": 40000.0},
+    {"idVariable": 5, "cdSerie": "272", "descripcion": "Tipo de cambio", "fecha": "2025-07-28", "valor": 1290.5},
+]}
+
+
+def event(blob_name, event_time):
+    return {"id": blob_name, "eventType": events.BLOB_CREATED, "eventTime": event_time,
+            "subject": f"{events.SUBJECT_PREFIX}{blob_name}", "data": {"url": f"https://x/{blob_name}"}}
+
+
+def run_pipeline(store):
+    """ingest 15:30 → Event Grid +20s → blob_alert +5s → Parquet at 16:15."""
+    path = ingest.ingest_snapshot(store, "monetarias", PAYLOAD, INGESTED)
+    blob_events = [events.classify(event(b, "2025-07-29T15:30:20.1234567Z"), {"monetarias"})
+                   for b in store.list(manifest.RAW_PREFIX)]
+    dispatch.update_manifests(dispatch.Context(blob_events, lambda: store, processed_time="2025-07-29T15:30:25"))
+    compactor.compact_day(store, DAY, now=datetime.datetime(2025, 7, 29, 16, 15))
+    return path
+
+
+class TestFreshness:
+    """Test suite para el seguimiento de frescura y lag de punta a punta"""
+
+    def test_lineage_is_carried_through_each_stage(self):
+        """Test que ingest, blob_alert y el compactador dejan sus timestamps"""
+        store = MemoryStore()
+        path = run_pipeline(store)
+
+        assert store.metadata[path] == {"ingested_at": "2025-07-29T15:30:00"}
+        entry = manifest.load_manifest(store, DAY)["files"][path.rsplit("/", 1)[-1]]
+        assert entry["ingested_at"] == "2025-07-29T15:30:00"
+        assert entry["event_time"] == "2025-07-29T15:30:20.1234567Z"
+        assert entry["recorded_at"] == "2025-07-29T15:30:25"
+        assert manifest.load_manifest(store, DAY)["compactions"] == ["2025-07-29T16:15:00"]
+        parquet = f"{compactor.partition_path(compactor.CURATED_PREFIX, DAY)}/{compactor.CURATED_FILE}"
+        assert store.metadata[parquet] == {"compacted_at": "2025-07-29T16:15:00", "inputs": "1",
+                                           "max_ingested_at": "2025-07-29T15:30:00"}
+
+    def test_report_lags_per_stage_and_variable(self):
+        """Test que el reporte calcula el lag de cada etapa y por variable"""
+        store = MemoryStore()
+        run_pipeline(store)
+
+        doc = freshness.report(store, DAY, DAY, slo=freshness.load_slo(""))
+
+        stages = doc["stages"]
+        assert stages["event_grid"]["max"] == pytest.approx(20.123456)
+        assert stages["blob_alert"]["p50"] == pytest.approx(4.876544)
+        assert stages["transform"] == dict(stages["transform"], count=1, max=45 * 60)
+        # 2025-07-29 00:00 en Buenos Aires = 03:00 UTC; ingest a las 15:30 UTC
+        assert doc["variables"]["1"]["polling"]["max"] == 12.5 * 3600
+        assert doc["variables"]["5"]["end_to_end"]["max"] == (24 + 13.25) * 3600
+        assert stages["polling"]["histogram"]["le_86400"] == 1
+        assert stages["polling"]["histogram"]["le_172800"] == 1
+        assert doc["breaches"] == {} and doc["partitions"] == 1
+
+    def test_slo_breaches_are_flagged(self):
+        """Test que los lags por encima del SLO se reportan"""
+        store = MemoryStore()
+        run_pipeline(store)
+
+        doc = freshness.report(store, DAY, DAY + datetime.timedelta(days=1),
+                               slo=freshness.load_slo("transform=1800,event_grid=10"))
+
+        assert doc["breaches"] == {"transform": 1, "event_grid": 1}
+        assert {b["stage"] for b in doc["breach_samples"]} == {"transform", "event_grid"}
+        assert doc["partitions_without_manifest"] == 1
+
+    def test_rebuild_keeps_event_lineage(self):
+        """Test que reconstruir el manifest conserva los tiempos de Event Grid"""
+        store = MemoryStore()
+        path = run_pipeline(store)
+
+        manifest.rebuild(store, DAY, DAY)
+
+        entry = manifest.load_manifest(store, DAY)["files"][path.rsplit("/", 1)[-1]]
+        assert entry["recorded_at"] == "2025-07-29T15:30:25"
+
+    @pytest.mark.parametrize("value, expected", [
+        ("2025-07-29T15:30:20.1234567Z", datetime.datetime(2025, 7, 29, 15, 30, 20, 123456)),
+        ("2025-07-29T12:30:00-03:00", datetime.datetime(2025, 7, 29, 15, 30)),
+        ("2025-07-29T15:30:00", datetime.datetime(2025, 7, 29, 15, 30)),
+        ("", None),
+        ("ayer", None),
+    ])
+    def test_parse_time(self, value, expected):
+        """Test que se normalizan los formatos de timestamp del pipeline a UTC"""
+        assert freshness.parse_time(value) == expected
+
+    def test_unknown_slo_stage_is_rejected(self):
+        """Test que un SLO de una etapa inexistente es un error"""
+        with pytest.raises(ValueError):
+            freshness.load_slo("parquet=10")
+
+    def test_cli_exit_code_reflects_breaches(self, tmp_path, capsys):
+        """Test que el CLI termina con 1 si hay incumplimientos de SLO"""
+        from src.functions.shared_code.storage import LocalStore
+
+        run_pipeline(LocalStore(tmp_path))
+        args = ["--desde", DAY.isoformat(), "--local-dir", str(tmp_path)]
+
+        assert freshness.main(args + ["--slo", ""]) == 0
+        capsys.readouterr()
+        assert freshness.main(args + ["--slo", "transform=60"]) == 1
+        assert json.loads(capsys.readouterr().out)["breaches"] == {"transform": 1}
@@ -0,0 +1,121 @@
+import datetime
+import io
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.functions.shared_code import compactor, indicators
+from src.functions.shared_code.storage import MemoryStore
+
+
+START = datetime.date(2024, 1, 1)
+
+
+def curated(days, ids=(1, 2, 3)):
+    """Serie lineal por variable; la 3 es mensual (solo el día 1 de cada mes)."""
+    rows = [
+        (i, START + datetime.timedelta(days=d), 100.0 * i + d)
+        for d in range(days) for i in ids
+        if i != 3 or (START + datetime.timedelta(days=d)).day == 1
+    ]
+    return pa.table({
+        "id_variable": pa.array([r[0] for r in rows], pa.int32()),
+        "fecha": pa.array([r[1] for r in rows], pa.date32()),
+        "valor": pa.array([r[2] for r in rows], pa.float64()),
+    })
+
+
+def read_day(store, day):
+    path = f"{compactor.partition_path(indicators.INDICATORS_PREFIX, day)}/part-0.parquet"
+    return pq.read_table(io.BytesIO(store.read_bytes(path)))
+
+
+def before(table, day):
+    return table.filter(pc.less(table["fecha"], pa.scalar(day, pa.date32())))
+
+
+def since(table, day):
+    return table.filter(pc.greater_equal(table["fecha"], pa.scalar(day, pa.date32())))
+
+
+class TestIndicatorEngine:
+    """Test suite para el motor vectorizado de indicadores derivados"""
+
+    def test_indicators_on_linear_series(self):
+        """Test que cambios, variaciones y medias móviles dan los valores esperados"""
+        table = indicators.IndicatorEngine().compute(indicators.Panel.from_table(curated(400)))
+        series = table.filter(pc.equal(table["id_variable"], 1))
+        last = series.slice(series.num_rows - 1).to_pylist()[0]
+
+        # valor = 100 + d para la variable 1, con d = 399 el último día
+        assert last["valor"] == 499.0
+        assert last["diff_1d"] == 1.0
+        assert np.isclose(last["pct_yoy"], 499.0 / 134.0 - 1)
+        assert np.isclose(last["ma_7"], 496.0)
+
+    def test_monthly_series_is_forward_filled(self):
+        """Test que una serie mensual tiene valor todos los días hasta el límite de arrastre"""
+        table = indicators.IndicatorEngine().compute(indicators.Panel.from_table(curated(40)))
+        monthly = table.filter(pc.equal(table["id_variable"], 3))
+
+        assert monthly.num_rows == 40
+        assert set(monthly["valor"].to_pylist()) == {300.0, 331.0}
+
+    def test_incremental_update_matches_full_recompute(self):
+        """Test que actualizar solo la cola da lo mismo que recalcular toda la historia"""
+        data = curated(500)
+        cut = START + datetime.timedelta(days=490)
+        store = MemoryStore()
+        indicators.update(store, before(data, cut))
+
+        written = indicators.update(store, since(data, cut))
+
+        assert written == [cut + datetime.timedelta(days=n) for n in range(10)]
+        full = indicators.IndicatorEngine().compute(indicators.Panel.from_table(data))
+        expected = since(full, written[0])
+        got = pa.concat_tables(read_day(store, day) for day in written)
+        assert got["fecha"].equals(expected["fecha"])
+        for column in expected.column_names[2:]:
+            assert np.allclose(np.array(got[column].to_pylist(), dtype=float),
+                               np.array(expected[column].to_pylist(), dtype=float), equal_nan=True)
+
+    def test_unchanged_rows_write_nothing(self):
+        """Test que reenviar las mismas filas no reescribe particiones"""
+        data = curated(60)
+        store = MemoryStore()
+        indicators.update(store, data)
+
+        assert indicators.update(store, since(data, START + datetime.timedelta(days=50))) == []
+
+    def test_revision_rewrites_from_its_fecha(self):
+        """Test que una revisión de un valor pasado reescribe desde esa fecha en adelante"""
+        data = curated(60)
+        store = MemoryStore()
+        indicators.update(store, data)
+        revised_day = START + datetime.timedelta(days=55)
+        revision = pa.table({
+            "id_variable": pa.array([1], pa.int32()),
+            "fecha": pa.array([revised_day], pa.date32()),
+            "valor": pa.array([0.0]),
+        })
+
+        written = indicators.update(store, revision)
+
+        assert written[0] == revised_day
+        assert len(written) == 5
+        row = read_day(store, revised_day).filter(pc.equal(pc.field("id_variable"), 1)).to_pylist()[0]
+        assert row["valor"] == 0.0
+
+    def test_update_day_reads_curated_partition(self, tmp_path):
+        """Test que el hook tras la compactación lee la partición curada del día"""
+        store = MemoryStore()
+        day = datetime.date(2025, 7, 29)
+        store.write_bytes(f"{compactor.RAW_PREFIX}/year=2025/month=07/day=29/vars_2025-07-29T10:05:00.json",
+                          '[{"idVariable": 1, "cdSerie": "7935", "descripcion": "Reservas",'
+                          ' "fecha": "2025-07-29", "valor": 25000.5}]')
+        compactor.compact_day(store, day)
+
+        assert indicators.update_day(store, day) == [day]
+        assert read_day(store, day)["valor"].to_pylist() == [25000.5]
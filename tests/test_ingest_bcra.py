@@ -0,0 +1,174 @@
+import asyncio
+import datetime
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+import requests
+
+from benchmarks.fake_bcra import FakeBCRA
+from src.functions.ingest_bcra import main
+from src.functions.shared_code import cdc, dedup, dispatch, events, ingest, latest, manifest, rawformat
+from src.functions.shared_code.storage import AsyncStoreAdapter, LocalStore
+
+
+SNAPSHOT = [
+    {"idVariable": 1, "cdSerie": "7935", "descripcion": "Reservas", "fecha": "2025-07-29", "valor": 25000.5},
+    {"idVariable": 2, "cdSerie": "7936", "descripcion": "Base monetaria", "fecha": "2025-07-29", "valor": 15000000.75},
+]
+
+
+class TestIngestCDC:
+    """Test suite para la deduplicación por contenido de ingest_bcra"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return LocalStore(tmp_path)
+
+    def run_ingest(self, store, payload):
+        session = Mock()
+        session.get.return_value.json.return_value = payload
+        session.get.return_value.content = json.dumps(payload).encode()
+        with patch("src.functions.shared_code.clients.get_http_session", return_value=session), \
+             patch("src.functions.ingest_bcra.get_store", return_value=store):
+            main(Mock())
+
+    def test_first_run_uploads_snapshot_and_delta(self, store):
+        """Test que la primera corrida sube el snapshot completo y el delta"""
+        self.run_ingest(store, {"status": 200, "results": SNAPSHOT})
+
+        vars_blobs = [p for p in store.list("raw/monetarias/") if "/vars_" in p]
+        changes_blobs = store.list("changes/monetarias/")
+        assert len(vars_blobs) == 1
+        assert len(changes_blobs) == 1
+        assert json.loads(store.read_bytes(changes_blobs[0])) == SNAPSHOT
+
+    def test_one_ingest_is_one_event_and_counted_once(self, store):
+        """Test que una ingesta dispara un solo BlobCreated y el manifest cuenta cada registro una vez"""
+        self.run_ingest(store, {"status": 200, "results": SNAPSHOT})
+        raw = [{"id": p, "eventType": events.BLOB_CREATED, "subject": f"{events.SUBJECT_PREFIX}{p}",
+                "data": {"url": f"https://x/{p}"}}
+               for p in store.list("raw/")]
+
+        with patch("src.functions.shared_code.notifications.get_notifier") as get_notifier, \
+             patch.object(dedup, "_deduplicator", dedup.Deduplicator()):
+            dispatch.process(raw, lambda: store)
+
+        assert len(raw) == 1
+        [(queued,)] = [c.args for c in get_notifier.return_value.add_many.call_args_list]
+        assert len(list(queued)) == 1
+        doc = manifest.load_manifest(store, manifest.day_of(raw[0]["id"]))
+        assert len(doc["files"]) == 1
+        assert manifest.summarize(doc)["records"] == len(SNAPSHOT)
+
+    def test_compressed_raw_format(self, store):
+        """Test que con RAW_FORMAT=ndjson.gz el snapshot se sube comprimido y latest.json queda en JSON"""
+        with patch("src.functions.ingest_bcra.RAW_FORMAT", "ndjson.gz"):
+            self.run_ingest(store, {"status": 200, "results": SNAPSHOT})
+
+        vars_blobs = [p for p in store.list("raw/monetarias/") if "/vars_" in p]
+        assert vars_blobs[0].endswith(".ndjson.gz")
+        assert list(rawformat.read_records(store, vars_blobs[0])) == SNAPSHOT
+        assert json.loads(store.read_bytes(latest.LATEST_PATH))["results"] == SNAPSHOT
+
+    def test_unchanged_snapshot_is_skipped(self, store):
+        """Test que un snapshot idéntico no genera uploads"""
+        self.run_ingest(store, SNAPSHOT)
+        before = store.list("raw/monetarias/")
+
+        self.run_ingest(store, SNAPSHOT)
+
+        assert store.list("raw/monetarias/") == before
+
+    def test_malformed_records_are_quarantined(self, store):
+        """Test que los registros inválidos van a quarantine/ y no llegan a raw/"""
+        bad = {"idVariable": 3, "cdSerie": "7937", "descripcion": "Tasa", "fecha": "29/07/2025", "valor": "n/d"}
+        self.run_ingest(store, {"status": 200, "results": SNAPSHOT + [bad]})
+
+        [vars_blob] = [p for p in store.list("raw/monetarias/") if "/vars_" in p]
+        assert json.loads(store.read_bytes(vars_blob))["results"] == SNAPSHOT
+        assert "3" not in cdc.load_state(store)
+
+        [quarantined] = store.list("quarantine/monetarias/year=")
+        doc = json.loads(store.read_bytes(quarantined))
+        assert doc["rejected"] == [{"record": bad, "reasons": ["bad_types", "bad_fecha"]}]
+        assert doc["report"]["quarantined"] == 1
+
+    def test_unchanged_snapshot_is_not_quarantined_again(self, store):
+        """Test que un snapshot sin cambios no vuelve a escribir los mismos registros en cuarentena"""
+        bad = {"idVariable": 3, "cdSerie": "7937", "descripcion": "Tasa", "fecha": "29/07/2025", "valor": "n/d"}
+        first, later = datetime.datetime(2025, 7, 29, 15), datetime.datetime(2025, 7, 29, 16)
+        moved = dict(SNAPSHOT[0], valor=25001.0)
+
+        ingest.ingest_snapshot(store, "monetarias", SNAPSHOT + [bad], first)
+        assert ingest.ingest_snapshot(store, "monetarias", SNAPSHOT + [bad], later) is None
+        asyncio.run(ingest.ingest_snapshot_async(AsyncStoreAdapter(store), "monetarias", SNAPSHOT + [bad],
+                                                 later, asyncio.Semaphore(1)))
+        assert len(store.list("quarantine/monetarias/")) == 1
+
+        ingest.ingest_snapshot(store, "monetarias", [moved, SNAPSHOT[1], bad], later)
+        assert len(store.list("quarantine/monetarias/")) == 2
+
+    def test_delta_only_contains_moved_rows(self):
+        """Test que el delta contiene solo las variables que cambiaron"""
+        state = cdc.update_state({}, SNAPSHOT)
+        moved = dict(SNAPSHOT[1], fecha="2025-07-30", valor=15000100.0)
+
+        changes = cdc.diff_records([SNAPSHOT[0], moved], state)
+
+        assert changes == [moved]
+
+    def test_extract_records_accepts_bare_list_and_results(self):
+        """Test que extract_records acepta la lista directa o el wrapper de v3.0"""
+        assert cdc.extract_records(SNAPSHOT) == SNAPSHOT
+        assert cdc.extract_records({"status": 200, "results": SNAPSHOT}) == SNAPSHOT
+
+
+class TestIngestAsync:
+    """Test suite para el camino async de ingest (aiohttp + store async)"""
+
+    def run_async(self, store, endpoints):
+        import aiohttp
+
+        async def go():
+            async with aiohttp.ClientSession() as session:
+                return await ingest.ingest_endpoints_async(
+                    AsyncStoreAdapter(store), endpoints, session=session,
+                    fetch_concurrency=2, upload_concurrency=2,
+                )
+
+        return asyncio.run(go())
+
+    def test_writes_same_outputs_as_sync(self, fake_bcra, tmp_path):
+        """Test que el camino async escribe snapshot, delta, estado y latest como el sync"""
+        sync_store, async_store = LocalStore(tmp_path / "sync"), LocalStore(tmp_path / "async")
+        endpoints = {"monetarias": fake_bcra.base_url, "otro": fake_bcra.base_url}
+
+        ingest.ingest_endpoints(sync_store, endpoints, session=requests.Session())
+        results = self.run_async(async_store, endpoints)
+
+        shape = lambda store: sorted(p.rsplit("_", 1)[0] for p in store.list(""))
+        assert shape(async_store) == shape(sync_store)
+        assert json.loads(async_store.read_bytes(results["monetarias"])) == \
+            json.loads(sync_store.read_bytes(sync_store.list("raw/monetarias/")[-1]))
+        assert json.loads(async_store.read_bytes(latest.LATEST_PATH))["results"] == fake_bcra.variables()
+
+    def test_unchanged_snapshot_is_skipped(self, fake_bcra, tmp_path):
+        """Test que el CDC también evita uploads en el camino async"""
+        store = LocalStore(tmp_path)
+        self.run_async(store, {"monetarias": fake_bcra.base_url})
+        before = store.list("")
+
+        results = self.run_async(store, {"monetarias": fake_bcra.base_url})
+
+        assert results == {"monetarias": None}
+        assert store.list("") == before
+
+    def test_retries_transient_errors(self, tmp_path):
+        """Test que un 503 transitorio se reintenta"""
+        with FakeBCRA(fail_first=1) as server, \
+             patch("src.functions.shared_code.ingest.asyncio.sleep", new=AsyncMock()):
+            results = self.run_async(LocalStore(tmp_path), {"monetarias": server.base_url})
+
+        assert results["monetarias"] is not None
+        assert len(server.requests) == 2
@@ -0,0 +1,81 @@
+import json
+import tracemalloc
+
+import pytest
+
+from src.functions.shared_code import compactor, jsonstream, rawformat
+from src.functions.shared_code.storage import MemoryStore
+
+RECORDS = [
+    {"idVariable": i, "cdSerie": str(7900 + i), "descripcion": f"Variación año {i} ñ",
+     "fecha": "2025-07-29", "valor": 1000.125 + i, "extra": {"tags": [i, None, True]}}
+    for i in range(1, 301)
+]
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonStream:
+    """Test suite para el parser JSON incremental"""
+
+    @pytest.mark.parametrize("size", [1, 7, 4096, 10 ** 7])
+    def test_wrapped_response_any_chunking(self, size):
+        """Test que los registros y la envoltura se leen igual con cualquier tamaño de chunk"""
+        doc = {"status": 200, "metadata": {"resultset": {"count": 300}}, "results": RECORDS, "after": -1.5e3}
+        stream = jsonstream.RecordStream(chunked(json.dumps(doc, indent=1).encode(), size))
+
+        assert list(stream) == RECORDS
+        assert stream.envelope == {"status": 200, "metadata": {"resultset": {"count": 300}}, "after": -1.5e3}
+
+    @pytest.mark.parametrize("doc, expected", [
+        (RECORDS, RECORDS),
+        ([], []),
+        ({"results": None}, []),
+        ({}, []),
+        (None, []),
+        ([12345, 6.5, "x"], [12345, 6.5, "x"]),
+    ])
+    def test_matches_extract_records(self, doc, expected):
+        """Test que se obtiene lo mismo que cdc.extract_records(json.loads(...))"""
+        assert list(jsonstream.iter_records(chunked(json.dumps(doc).encode(), 3))) == expected
+
+    @pytest.mark.parametrize("data", [b'{"results": [1, 2', b'[{"a": 1} {"b": 2}]', b'[1] [2]', b'{"results" [1]}'])
+    def test_malformed_documents_raise(self, data):
+        """Test que un documento truncado o mal formado produce un error"""
+        with pytest.raises(ValueError):
+            list(jsonstream.iter_records(chunked(data, 4)))
+
+    def test_iter_batches(self):
+        """Test que los registros se agrupan en lotes del tamaño pedido"""
+        batches = list(jsonstream.iter_batches(iter(RECORDS), 128))
+
+        assert [len(b) for b in batches] == [128, 128, 44]
+        assert [r for b in batches for r in b] == RECORDS
+
+    def test_peak_memory_bounded_by_record_not_document(self):
+        """Test que el pico de memoria no crece con el tamaño del documento"""
+        def peak(n):
+            chunks = chunked(json.dumps({"status": 200, "results": RECORDS * n}).encode(), 64 * 1024)
+            tracemalloc.start()
+            count = sum(1 for _ in jsonstream.iter_records(chunks))
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            assert count == len(RECORDS) * n
+            return peak_bytes
+
+        small, large = peak(10), peak(100)
+        assert large < small * 1.5
+
+    def test_compactor_record_batches(self):
+        """Test que el compactador convierte un snapshot en record batches de tamaño acotado"""
+        store = MemoryStore()
+        path = rawformat.write_snapshot(store, "raw/monetarias/year=2025/month=07/day=29/vars_a",
+                                        {"status": 200, "results": RECORDS}, "json")
+
+        batches = list(compactor.iter_record_batches(store, path, batch_records=128))
+
+        assert [b.num_rows for b in batches] == [128, 128, 44]
+        assert all(b.schema == compactor.SCHEMA for b in batches)
+        assert batches[-1].column(0).to_pylist()[-1] == 300
@@ -0,0 +1,108 @@
+import json
+from unittest.mock import patch
+
+import azure.functions as func
+import pytest
+
+from src.functions.shared_code import latest
+from src.functions.shared_code.storage import LocalStore
+
+SNAPSHOT = {"status": 200, "results": [
+    {"idVariable": 1, "cdSerie": "7935", "descripcion": "Reservas", "fecha": "2025-07-29", "valor": 25000.5},
+    {"idVariable": 4, "cdSerie": "7927", "descripcion": "Tipo de cambio", "fecha": "2025-07-29", "valor": 1290.0},
+]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatestCache:
+    """Test suite para el cache TTL del último snapshot"""
+
+    def test_loader_is_called_once_per_ttl(self):
+        """Test que dentro del TTL no se vuelve a leer el storage"""
+        calls = []
+        clock = FakeClock()
+        cache = latest.LatestCache(lambda: calls.append(1) or json.dumps(SNAPSHOT).encode(),
+                                   ttl_seconds=60, clock=clock)
+
+        for _ in range(100):
+            cache.get()
+        clock.now = 61
+        cache.get()
+
+        assert len(calls) == 2
+
+    def test_stale_snapshot_is_served_when_refresh_fails(self):
+        """Test que si falla el refresh se sigue sirviendo el snapshot anterior"""
+        clock = FakeClock()
+        responses = [json.dumps(SNAPSHOT).encode()]
+
+        def loader():
+            if not responses:
+                raise IOError("storage caído")
+            return responses.pop()
+
+        cache = latest.LatestCache(loader, ttl_seconds=60, clock=clock)
+        first = cache.get()
+        clock.now = 120
+
+        assert cache.get() is first
+
+    def test_load_latest_falls_back_to_newest_raw_blob(self, tmp_path):
+        """Test que sin latest.json se usa el vars_ más reciente"""
+        import datetime
+        store = LocalStore(tmp_path)
+        prefix = "raw/monetarias/year=2025/month=07/day=29"
+        store.write_bytes(f"{prefix}/vars_2025-07-29T09:05:00.json", b"[]")
+        store.write_bytes(f"{prefix}/vars_2025-07-29T10:05:00.json", json.dumps(SNAPSHOT))
+        store.write_bytes(f"{prefix}/vars_hist_1_2025-01-01.json", b"[]")
+
+        raw = latest.load_latest(store, today=datetime.date(2025, 7, 30))
+
+        assert json.loads(raw) == SNAPSHOT
+
+
+class TestLatestEndpoint:
+    """Test suite para el endpoint HTTP /api/latest"""
+
+    @pytest.fixture(autouse=True)
+    def cache(self):
+        cache = latest.LatestCache(lambda: json.dumps(SNAPSHOT).encode())
+        with patch("src.functions.shared_code.latest.get_cache", return_value=cache):
+            yield cache
+
+    def request(self, params=None, headers=None):
+        from function_app import latest_values
+        return latest_values(func.HttpRequest(method="GET", url="/api/latest", body=b"",
+                                              params=params or {}, headers=headers or {}))
+
+    def test_returns_all_variables(self):
+        """Test que sin filtros devuelve todas las variables"""
+        response = self.request()
+
+        assert response.status_code == 200
+        assert json.loads(response.get_body())["count"] == 2
+
+    def test_filters_by_id_and_serie(self):
+        """Test que se puede filtrar por idVariable y por cdSerie"""
+        by_id = json.loads(self.request({"id": "4"}).get_body())
+        by_serie = json.loads(self.request({"serie": "7935"}).get_body())
+
+        assert [r["idVariable"] for r in by_id["results"]] == [4]
+        assert [r["idVariable"] for r in by_serie["results"]] == [1]
+
+    def test_if_none_match_returns_304(self):
+        """Test que un ETag vigente devuelve 304 sin cuerpo"""
+        etag = self.request({"id": "1"}).headers["ETag"]
+
+        response = self.request({"id": "1"}, {"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.get_body() == b""
+        assert self.request({"id": "4"}, {"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,121 @@
+import datetime
+import json
+import threading
+
+import pytest
+
+from src.functions.shared_code import backfill, compactor, manifest, metrics
+from src.functions.shared_code.storage import LocalStore, MemoryStore, PreconditionFailed
+
+
+DAY = datetime.date(2025, 7, 29)
+RAW = "raw/monetarias/year=2025/month=07/day=29"
+
+
+def snapshot(fecha="2025-07-29", n=2):
+    return json.dumps({"results": [
+        {"idVariable": i, "cdSerie": str(7000 + i), "descripcion": f"Variable {i}", "fecha": fecha, "valor": 1.0}
+        for i in range(1, n + 1)
+    ]})
+
+
+class TestManifest:
+    """Test suite para los manifests de partición e índice"""
+
+    @pytest.fixture(params=["memory", "local"])
+    def store(self, request, tmp_path):
+        return MemoryStore() if request.param == "memory" else LocalStore(tmp_path)
+
+    def test_describe_entry(self, store):
+        """Test que la entrada tiene tamaño, registros, rango de fechas y hash"""
+        body = snapshot("2025-07-28", n=3)
+        store.write_bytes(f"{RAW}/vars_a.json", body)
+
+        entry = manifest.describe(store, f"{RAW}/vars_a.json")
+
+        assert entry["name"] == "vars_a.json"
+        assert entry["size"] == len(body)
+        assert entry["records"] == 3
+        assert entry["min_fecha"] == entry["max_fecha"] == "2025-07-28"
+        assert len(entry["sha256"]) == 64
+
+    @pytest.mark.parametrize("partition", ["year=2025/month=07/day=xx", "year=2025/month=13/day=01",
+                                           "year=2025/month=02/day=30"])
+    def test_malformed_partition_is_skipped(self, store, partition):
+        """Test que una partición inválida no hace fallar el manifest (ni reintentar el evento)"""
+        name = f"raw/monetarias/{partition}/vars_a.json"
+        store.write_bytes(name, snapshot())
+
+        assert manifest.day_of(name) is None
+        assert manifest.record_blobs(store, [name]) == {}
+
+    def test_conditional_write_detects_concurrent_change(self, store):
+        """Test que una escritura con ETag viejo falla"""
+        store.write_if_match("state/doc.json", "{}", None)
+        _, etag = store.read_versioned("state/doc.json")
+        store.write_if_match("state/doc.json", '{"a": 1}', etag)
+
+        with pytest.raises(PreconditionFailed):
+            store.write_if_match("state/doc.json", '{"a": 2}', etag)
+        with pytest.raises(PreconditionFailed):
+            store.write_if_match("state/doc.json", '{"a": 3}', None)
+
+    def test_concurrent_updates_keep_every_entry(self, store):
+        """Test que actualizaciones concurrentes del mismo manifest no pierden entradas"""
+        names = [f"{RAW}/vars_{i:02d}.json" for i in range(16)]
+        for name in names:
+            store.write_bytes(name, snapshot())
+
+        threads = [threading.Thread(target=manifest.record_blobs, args=(store, [name])) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert manifest.partition_blobs(store, DAY) == names
+        assert manifest.load_index(store)["partitions"]["2025-07-29"]["records"] == 32
+
+    def test_compactor_resolves_inputs_from_manifest(self, store):
+        """Test que el compactador usa el manifest en vez de listar la partición"""
+        store.write_bytes(f"{RAW}/vars_a.json", snapshot())
+        manifest.record_blobs(store, [f"{RAW}/vars_a.json"])
+        store.write_bytes(f"{RAW}/vars_b.json", snapshot())   # todavía sin evento
+
+        assert compactor.day_inputs(store, DAY) == [f"{RAW}/vars_a.json"]
+        assert compactor.day_inputs(store, DAY + datetime.timedelta(days=1)) == []
+
+    def test_open_partition_merges_manifest_with_listing(self, store):
+        """Test que si el manifest es anterior al cierre de la partición se completa con el listado"""
+        store.write_bytes(f"{RAW}/vars_a.json", snapshot())
+        manifest.record_blobs(store, [f"{RAW}/vars_a.json"])
+        manifest.update_json(store, manifest.manifest_path(DAY),
+                             lambda doc: dict(doc, updated_at="2025-07-29T23:50:00"))
+        store.write_bytes(f"{RAW}/vars_b.json", snapshot())   # su evento falló o todavía no llegó
+        previous = metrics.get_exporter()
+        exporter = metrics.set_exporter(metrics.InMemoryExporter())
+        try:
+            inputs = compactor.day_inputs(store, DAY)
+        finally:
+            metrics.set_exporter(previous)
+
+        assert inputs == [f"{RAW}/vars_a.json", f"{RAW}/vars_b.json"]
+        assert exporter.counters["manifest.unrecorded_blobs"] == 1
+
+    def test_index_prunes_partitions_by_fecha(self, store):
+        """Test que el índice elige las particiones por su rango de fechas"""
+        store.write_bytes(f"{RAW}/vars_a.json", snapshot("2025-06-30"))
+        store.write_bytes("raw/monetarias/year=2025/month=07/day=30/vars_b.json", snapshot("2025-07-30"))
+        manifest.rebuild(store, DAY, DAY + datetime.timedelta(days=1))
+
+        index = manifest.load_index(store)
+
+        assert manifest.days_with_fechas(index, datetime.date(2025, 6, 30), datetime.date(2025, 6, 30)) == [DAY]
+        assert manifest.days_with_fechas(index, datetime.date(2025, 7, 1), datetime.date(2025, 7, 29)) == []
+
+    def test_backfill_existing_chunks(self, store):
+        """Test que el backfill reconoce chunks ya escritos a partir de los manifests"""
+        backfill.write_chunk(store, {"idVariable": 7}, datetime.date(2025, 7, 1), datetime.date(2025, 7, 31),
+                             [{"fecha": "2025-07-29", "valor": 1.0}])
+        manifest.rebuild(store, DAY, DAY)
+
+        assert backfill.existing_chunks(store, datetime.date(2025, 7, 1), DAY) == {"7:2025-07-01:2025-07-31"}
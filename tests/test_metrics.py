@@ -0,0 +1,78 @@
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.functions.shared_code import metrics
+from src.functions.shared_code.storage import LocalStore
+
+
+@pytest.fixture
+def exporter():
+    previous = metrics.get_exporter()
+    yield metrics.set_exporter(metrics.InMemoryExporter())
+    metrics.set_exporter(previous)
+
+
+class TestMetrics:
+    """Test suite para la instrumentación por etapa"""
+
+    def test_timer_as_context_manager_and_decorator(self, exporter):
+        """Test que timer registra milisegundos como context manager y como decorador"""
+        with metrics.timer("stage_ms"):
+            pass
+
+        @metrics.timer("stage_ms")
+        def work():
+            return 42
+
+        assert work() == 42
+        assert work.__name__ == "work"
+        assert exporter.summary()["stage_ms"]["count"] == 2
+
+    def test_summary_reports_percentiles(self, exporter):
+        """Test que el exporter en memoria calcula p50/p99"""
+        for value in range(1, 101):
+            metrics.record("latency_ms", value)
+        metrics.incr("events", 3)
+
+        summary = exporter.summary()
+
+        assert summary["latency_ms"]["p50"] == 50
+        assert summary["latency_ms"]["p99"] == 99
+        assert summary["events"] == {"total": 3}
+
+    def test_default_exporter_uses_opentelemetry(self):
+        """Test que sin configuración se usa la API de OpenTelemetry"""
+        assert isinstance(metrics.OpenTelemetryExporter(), metrics.OpenTelemetryExporter)
+        metrics.OpenTelemetryExporter().record("x_ms", 1.0, "ms", {"success": True})
+
+    def test_ingest_records_every_stage(self, exporter, tmp_path):
+        """Test que ingest_bcra mide latencia, tamaño, decode, serialización y upload"""
+        from src.functions.ingest_bcra import main
+
+        payload = [{"idVariable": 1, "cdSerie": "7935", "descripcion": "Reservas",
+                    "fecha": "2025-07-29", "valor": 1.0}]
+        session = Mock()
+        session.get.return_value.json.return_value = payload
+        session.get.return_value.content = json.dumps(payload).encode()
+        with patch("src.functions.shared_code.clients.get_http_session", return_value=session), \
+             patch("src.functions.ingest_bcra.get_store", return_value=LocalStore(tmp_path)):
+            main(Mock())
+
+        summary = exporter.summary()
+        for stage in ("ingest.api_latency_ms", "ingest.response_bytes", "ingest.json_decode_ms",
+                      "ingest.serialize_ms", "ingest.upload_ms"):
+            assert summary[stage]["count"] == 1
+        assert summary["ingest.response_bytes"]["max"] == len(json.dumps(payload))
+
+    def test_blob_alert_records_handling_time(self, exporter):
+        """Test que blob_alert registra su tiempo de procesamiento"""
+        from function_app import blob_alert
+
+        event = Mock()
+        event.get_json.return_value = {"eventType": "Microsoft.Storage.BlobDeleted", "subject": "x"}
+        blob_alert(event)
+
+        assert exporter.summary()["blob_alert.handle_ms"]["count"] == 1
+        assert exporter.summary()["blob_alert.events_ignored"] == {"total": 1}
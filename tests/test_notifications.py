@@ -0,0 +1,235 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.functions.shared_code import notifications
+from src.functions.shared_code.storage import LocalStore, MemoryStore
+
+
+def blob(day):
+    return {"blob_name": f"raw/monetarias/year=2025/month=07/day={day}/vars_x.json",
+            "year": "2025", "month": "07", "day": day,
+            "processed_time": f"2025-07-{day}T10:00:00"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class WebhookServer:
+    """Webhook local que guarda los payloads recibidos"""
+
+    def __init__(self):
+        received = self.received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(200)
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RecordingSink:
+    """Sink que guarda los digests recibidos y puede fallar a pedido"""
+
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.received = []
+        self.sessions = []
+
+    async def send(self, session, digest):
+        self.sessions.append(session)
+        if self.fail:
+            raise ConnectionError(f"{self.name} caído")
+        self.received.append(digest)
+
+
+@pytest.fixture(params=["file", "store"])
+def buffer(request, tmp_path):
+    if request.param == "file":
+        return notifications.FileBuffer(str(tmp_path / "buffer.jsonl"))
+    return notifications.StoreBuffer(LocalStore(tmp_path))
+
+
+@pytest.fixture(autouse=True)
+def close_digests(monkeypatch):
+    """Cierra la sesión y el loop de cada digest creado en el test"""
+    created, init = [], notifications.NotificationDigest.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        created.append(self)
+
+    monkeypatch.setattr(notifications.NotificationDigest, "__init__", tracking_init)
+    yield
+    for digest in created:
+        digest.close()
+
+
+class TestNotificationDigest:
+    """Test suite para el digest de notificaciones por ventana"""
+
+    def test_flushes_after_max_items(self, buffer, caplog):
+        """Test que se envía un único digest al llegar a N blobs"""
+        digest = notifications.NotificationDigest(buffer, [notifications.LogSink()], max_items=3,
+                                                  clock=FakeClock())
+        caplog.set_level(logging.INFO)
+
+        assert digest.add(blob("29")) is None
+        assert digest.add(blob("29")) is None
+        sent = digest.add(blob("30"))
+
+        assert sent["total"] == 3
+        assert sent["partitions"] == {"2025-07-29": 2, "2025-07-30": 1}
+        assert buffer.stats() == (0, None)
+        assert len([r for r in caplog.records if "BCRA_NOTIFICATION" in r.getMessage()]) == 1
+
+    def test_flushes_when_window_elapses(self, buffer):
+        """Test que el digest se envía al cumplirse la ventana aunque haya pocos blobs"""
+        clock = FakeClock()
+        digest = notifications.NotificationDigest(buffer, [notifications.LogSink()],
+                                                  window_seconds=60, max_items=100, clock=clock)
+        digest.add(blob("29"))
+        assert digest.maybe_flush() is None
+
+        clock.now += 61
+
+        assert digest.maybe_flush()["total"] == 1
+
+    def test_digest_reports_failures(self, buffer):
+        """Test que el digest lista los blobs fallidos"""
+        digest = notifications.NotificationDigest(buffer, [notifications.LogSink()], clock=FakeClock())
+        digest.add(blob("29"))
+        digest.add(blob("29"), status="failed", error="schema inválido")
+
+        sent = digest.flush()
+
+        assert sent["failed"] == 1
+        assert sent["failures"][0]["error"] == "schema inválido"
+        assert "❌ Fallidos: 1" in notifications.format_digest(sent)
+
+    def test_webhook_sinks_receive_one_post_per_digest(self, tmp_path):
+        """Test que los webhooks Slack/Teams reciben un POST por digest"""
+        server = WebhookServer()
+        try:
+            sinks = [notifications.WebhookSink(server.url, "slack"),
+                     notifications.WebhookSink(server.url, "teams")]
+            digest = notifications.NotificationDigest(
+                notifications.FileBuffer(str(tmp_path / "b.jsonl")), sinks, max_items=2, clock=FakeClock())
+
+            digest.add(blob("29"))
+            digest.add(blob("29"))
+        finally:
+            server.close()
+
+        assert len(server.received) == 2
+        assert {"text", "@type"} <= set().union(*server.received)
+
+    def test_entries_are_requeued_when_every_sink_fails(self, tmp_path):
+        """Test que si ningún sink recibe el digest las entradas vuelven al buffer"""
+        buffer = notifications.FileBuffer(str(tmp_path / "b.jsonl"))
+        digest = notifications.NotificationDigest(
+            buffer, [notifications.WebhookSink("http://127.0.0.1:9/hook", timeout=1)], clock=FakeClock())
+        digest.add(blob("29"))
+
+        assert digest.flush() is None
+        assert buffer.stats()[0] == 1
+
+    def test_only_failed_sinks_get_the_requeued_entries(self, buffer):
+        """Test que si un solo sink falla las entradas se reencolan solo para ese sink"""
+        log, webhook = RecordingSink("log"), RecordingSink("webhook", fail=True)
+        digest = notifications.NotificationDigest(buffer, [log, webhook], clock=FakeClock())
+        digest.add(blob("29"))
+
+        assert digest.flush()["total"] == 1
+        assert buffer.stats()[0] == 1
+
+        webhook.fail = False
+        assert digest.flush()["total"] == 1
+        assert (len(log.received), len(webhook.received)) == (1, 1)
+        assert buffer.stats() == (0, None)
+
+    def test_digest_counts_quarantined_snapshots(self, buffer):
+        """Test que las cuarentenas se cuentan y listan aparte de los procesados"""
+        digest = notifications.NotificationDigest(buffer, [notifications.LogSink()], clock=FakeClock())
+        digest.add(blob("29"))
+        digest.add(dict(blob("29"), blob_name="quarantine/monetarias/year=2025/month=07/day=29/vars_x.json"),
+                   status="quarantined", error="quarantine")
+
+        sent = digest.flush()
+
+        assert (sent["total"], sent["succeeded"], sent["quarantined"]) == (2, 1, 1)
+        assert sent["failures"][0]["blob_name"].startswith("quarantine/")
+        assert "🚧 En cuarentena: 1" in notifications.format_digest(sent)
+
+    def test_add_many_checks_the_window_once(self, buffer):
+        """Test que add_many encola todo el lote y consulta stats() una sola vez"""
+        digest = notifications.NotificationDigest(buffer, [notifications.LogSink()], max_items=3,
+                                                  clock=FakeClock())
+        stats = buffer.stats
+        calls = []
+        buffer.stats = lambda: calls.append(1) or stats()
+
+        sent = digest.add_many([(blob("29"), "ok", None), (blob("29"), "ok", None),
+                                (blob("30"), "quarantined", "quarantine")])
+
+        assert len(calls) == 1
+        assert (sent["total"], sent["quarantined"]) == (3, 1)
+
+    def test_flushes_share_one_session(self, buffer):
+        """Test que los grupos de sinks y los flush sucesivos reutilizan la misma sesión"""
+        log, webhook = RecordingSink("log"), RecordingSink("webhook", fail=True)
+        digest = notifications.NotificationDigest(buffer, [log, webhook], clock=FakeClock())
+        digest.add(blob("29"))
+        digest.flush()
+        webhook.fail = False
+        digest.add(blob("30"))
+
+        digest.flush()
+
+        sessions = log.sessions + webhook.sessions
+        assert len(sessions) == 5
+        assert len({id(session) for session in sessions}) == 1
+
+    def test_concurrent_drains_claim_each_entry_once(self):
+        """Test que dos flush concurrentes no envían la misma entrada dos veces"""
+        store = MemoryStore()
+        first, second = notifications.StoreBuffer(store), notifications.StoreBuffer(store)
+        for day in ("27", "28", "29"):
+            first.append(dict(blob(day), buffered_at=1.0))
+        read_versioned, stolen = store.read_versioned, []
+
+        def racing_read(path):
+            # el otro flush drena después de nuestra lectura y antes de nuestro delete
+            result = read_versioned(path)
+            if not stolen:
+                store.read_versioned = read_versioned
+                stolen.extend(second.drain())
+                store.read_versioned = racing_read
+            return result
+
+        store.read_versioned = racing_read
+        drained = first.drain()
+
+        assert len(stolen) == 3 and drained == []
+        assert store.list(first.prefix) == []
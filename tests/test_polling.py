@@ -0,0 +1,120 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+from benchmarks.fake_bcra import FakeBCRA
+from src.functions.shared_code import metrics, polling, registry, scheduler
+from src.functions.shared_code.storage import AsyncStoreAdapter, LocalStore
+
+NOW = datetime.datetime(2025, 7, 29, 15, 5)
+TICK = datetime.timedelta(minutes=5)
+
+
+@pytest.fixture
+def exporter():
+    previous = metrics.get_exporter()
+    yield metrics.set_exporter(metrics.InMemoryExporter())
+    metrics.set_exporter(previous)
+
+
+def cambiarias(server, polling_mode="adaptive"):
+    return registry.Endpoint("cambiarias", server.cotizaciones_url, "0 */5 * * * *", "raw/cambiarias",
+                             "cotizaciones", "str", polling_mode)
+
+
+def run(store, endpoints, now):
+    import aiohttp
+
+    async def go():
+        async with aiohttp.ClientSession() as session:
+            return await scheduler.run_due(AsyncStoreAdapter(store), endpoints, now=now, session=session)
+
+    return asyncio.run(go())
+
+
+def learned_profile(hour=15):
+    profile = polling.PublicationProfile()
+    for day in range(polling.MIN_OBSERVATIONS):
+        end = datetime.datetime(2025, 7, 1 + day, hour, 10)
+        profile.observe(end - datetime.timedelta(minutes=5), end)
+    return profile
+
+
+class TestConditionalPolling:
+    """Test suite para los requests condicionales del scheduler"""
+
+    def test_not_modified_skips_ingest(self, tmp_path, exporter):
+        """Test que un 304 no descarga ni escribe y se cuenta como bytes ahorrados"""
+        store = LocalStore(tmp_path)
+        with FakeBCRA() as server:
+            first = run(store, [cambiarias(server)], NOW)
+            second = run(store, [cambiarias(server)], NOW + TICK)
+            server.advance()
+            third = run(store, [cambiarias(server)], NOW + 2 * TICK)
+
+        assert first["cambiarias"] and third["cambiarias"]
+        assert second == {"cambiarias": None}
+        assert len([p for p in store.list("raw/cambiarias/") if "/vars_" in p]) == 2
+        state = json.loads(store.read_bytes(polling.STATE_PATH))["cambiarias"]
+        assert [d["outcome"] for d in state["decisions"]] == ["new", "not_modified", "new"]
+        assert exporter.counters["polling.bytes_saved"] == state["body_bytes"]
+        assert exporter.counters["polling.decisions"] == 3
+        assert polling.PublicationProfile.from_dict(state["profile"]).observations == 1
+
+    def test_body_hash_when_server_ignores_validators(self, tmp_path):
+        """Test que sin ETag se compara el hash del cuerpo y no se vuelve a ingerir"""
+        store = LocalStore(tmp_path)
+        with FakeBCRA(etags=False) as server:
+            run(store, [cambiarias(server)], NOW)
+            second = run(store, [cambiarias(server)], NOW + TICK)
+
+        state = json.loads(store.read_bytes(polling.STATE_PATH))["cambiarias"]
+        assert second == {"cambiarias": None}
+        assert state["decisions"][-1]["outcome"] == "unchanged"
+        assert state["etag"] is None and state["body_sha256"]
+
+
+class TestAdaptivePolling:
+    """Test suite para el aprendizaje de las ventanas de publicación"""
+
+    def test_profile_learns_publication_window(self):
+        """Test que las publicaciones observadas marcan la ventana y sus vecinas como calientes"""
+        profile = learned_profile(hour=15)
+
+        assert profile.learned
+        assert profile.is_hot(datetime.datetime(2025, 7, 29, 15, 5))
+        assert profile.is_hot(datetime.datetime(2025, 7, 29, 14, 50))
+        assert not profile.is_hot(datetime.datetime(2025, 7, 29, 3, 0))
+
+    def test_decide_polls_often_in_window_and_backs_off_outside(self):
+        """Test que dentro de la ventana se consulta cada tick y fuera se espera cold_minutes"""
+        endpoint = registry.DEFAULT_ENDPOINTS[0]
+        state = {"profile": learned_profile(hour=15).to_dict()}
+
+        def decide(now, last_poll):
+            return polling.decide(endpoint, dict(state, last_poll=last_poll.isoformat()), now, False)
+
+        assert decide(NOW, NOW - TICK) == (True, "hot_window")
+        assert decide(NOW.replace(hour=3), NOW.replace(hour=2)) == (False, "backoff")
+        assert decide(NOW.replace(hour=5), NOW.replace(hour=3)) == (True, "backoff")
+        assert polling.decide(endpoint, {}, NOW, True) == (True, "learning")
+        assert polling.decide(endpoint._replace(polling="schedule"), state, NOW, False) == (False, "schedule")
+
+    def test_profile_is_seeded_from_raw_snapshots(self, tmp_path):
+        """Test que el primer perfil se aprende de los timestamps de los snapshots existentes"""
+        store = LocalStore(tmp_path)
+        for day in range(1, 8):
+            stamp = datetime.datetime(2025, 7, 20 + day, 16, 5)
+            store.write_bytes(f"raw/cambiarias/year=2025/month=07/day={20 + day}/vars_{stamp.isoformat()}.json",
+                              json.dumps({"results": []}))
+
+        with FakeBCRA() as server:
+            result = run(store, [cambiarias(server)], datetime.datetime(2025, 7, 29, 3, 0))
+
+        state = json.loads(store.read_bytes(polling.STATE_PATH))["cambiarias"]
+        profile = polling.PublicationProfile.from_dict(state["profile"])
+        assert profile.observations == 7 and profile.is_hot(datetime.datetime(2025, 7, 29, 15, 30))
+        # aprendido y fuera de ventana, sin corrida previa: primera consulta
+        assert result["cambiarias"] and state["decisions"][-1]["reason"] == "first_poll"
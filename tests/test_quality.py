@@ -0,0 +1,69 @@
+import math
+
+from src.functions.shared_code import cdc, quality
+
+
+def record(id_variable, valor=1.0, fecha="2025-07-29"):
+    return {"idVariable": id_variable, "cdSerie": str(7900 + id_variable), "descripcion": "Var",
+            "fecha": fecha, "valor": valor}
+
+
+class TestQuality:
+    """Test suite para la validación vectorizada de snapshots"""
+
+    def test_clean_snapshot_passes_untouched(self):
+        """Test que un snapshot válido pasa completo y sin copiar"""
+        records = [record(i, float(i)) for i in range(1, 100)]
+
+        result = quality.validate(records)
+
+        assert result.valid is records
+        assert result.rejected == []
+        assert result.report["quarantined"] == 0
+        assert set(result.report["checks"].values()) == {0}
+
+    def test_each_check_flags_its_records(self):
+        """Test que cada chequeo detecta su tipo de error"""
+        records = [
+            record(1),
+            {"idVariable": 2, "fecha": "2025-07-29"},                 # falta valor
+            record(3, valor="1,5"),                                   # tipo
+            record(4, valor=math.nan),                                # no finito
+            record(5, fecha="2025-02-30"),                            # fecha imposible
+            record(6.5),                                              # id no entero
+            record(1, valor=2.0),                                     # id repetido
+            record(7, valor=True),                                    # bool no es número
+        ]
+
+        result = quality.validate(records)
+
+        reasons = {str(r["record"]["idVariable"]) + ":" + str(r["record"].get("valor")): r["reasons"]
+                   for r in result.rejected}
+        assert reasons == {
+            "2:None": ["missing_fields"],
+            "3:1,5": ["bad_types"],
+            "4:nan": ["bad_types"],
+            "5:1.0": ["bad_fecha"],
+            "6.5:1.0": ["bad_types"],
+            "1:2.0": ["duplicate_id"],
+            "7:True": ["bad_types"],
+        }
+        assert result.valid == [records[0]]
+        assert result.report["checks"]["bad_types"] == 4
+
+    def test_jumps_are_reported_not_quarantined(self):
+        """Test que los saltos contra el snapshot anterior se reportan sin descartar"""
+        state = cdc.update_state({}, [record(1, 100.0), record(2, 100.0), record(3, 0.0)])
+        records = [record(1, 101.0), record(2, 400.0), record(3, 5.0), record(4, 9.0)]
+
+        result = quality.validate(records, state, max_jump=0.5)
+
+        assert result.valid is records
+        assert result.report["checks"]["jumps"] == 1
+        assert result.report["jump_ids"] == [2]
+
+    def test_empty_snapshot(self):
+        """Test que un snapshot vacío produce un reporte vacío"""
+        result = quality.validate([])
+
+        assert (result.valid, result.rejected, result.report["records"]) == ([], [], 0)
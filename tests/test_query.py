@@ -0,0 +1,116 @@
+import datetime
+import json
+import time
+
+import pytest
+
+from src.functions.shared_code import compactor, manifest
+from src.functions.shared_code.query import CuratedDataset, ResultCache
+from src.functions.shared_code.storage import LocalStore
+
+
+def write_day(store, day, rows):
+    raw = f"raw/monetarias/year={day.year}/month={day.month:02d}/day={day.day:02d}/vars_x.json"
+    store.write_bytes(raw, json.dumps(rows))
+    compactor.compact_day(store, day)
+
+
+def rows_for(day, n_variables=3, fecha=None):
+    return [
+        {"idVariable": i, "cdSerie": str(7000 + i), "descripcion": f"Variable {i}",
+         "fecha": (fecha or day).isoformat(), "valor": i * 100 + day.day}
+        for i in range(1, n_variables + 1)
+    ]
+
+
+@pytest.fixture
+def curated(tmp_path):
+    store = LocalStore(tmp_path)
+    start = datetime.date(2025, 6, 1)
+    for n in range(60):
+        day = start + datetime.timedelta(days=n)
+        write_day(store, day, rows_for(day))
+    return CuratedDataset(str(tmp_path / "processed/monetarias"), max_lag_days=5)
+
+
+class TestQuery:
+    """Test suite para la API de consulta sobre el Parquet curado"""
+
+    def test_get_series_returns_sorted_range(self, curated):
+        """Test que get_series devuelve solo la variable y el rango pedidos"""
+        table = curated.get_series(2, datetime.date(2025, 7, 1), datetime.date(2025, 7, 10))
+
+        assert set(table["id_variable"].to_pylist()) == {2}
+        fechas = table["fecha"].to_pylist()
+        assert fechas == sorted(fechas)
+        assert (fechas[0], fechas[-1]) == (datetime.date(2025, 7, 1), datetime.date(2025, 7, 10))
+
+    def test_partition_pruning_lists_only_needed_days(self, curated):
+        """Test que solo se leen las particiones del rango (más el lag de publicación)"""
+        files = curated.partition_files(datetime.date(2025, 7, 1), datetime.date(2025, 7, 10))
+
+        assert len(files) == 10
+
+    def test_index_selects_partitions_without_listing(self, tmp_path):
+        """Test que con el índice de manifests se eligen las particiones por rango de fecha"""
+        store = LocalStore(tmp_path)
+        for n in range(10):
+            day = datetime.date(2025, 7, 1) + datetime.timedelta(days=n)
+            write_day(store, day, rows_for(day))
+        manifest.rebuild(store, datetime.date(2025, 7, 1), datetime.date(2025, 7, 10))
+        dataset = CuratedDataset(str(tmp_path / "processed/monetarias"), index=manifest.load_index(store))
+
+        files = dataset.files_for_fechas(datetime.date(2025, 7, 3), datetime.date(2025, 7, 4))
+        table = dataset.get_series(1, datetime.date(2025, 7, 3), datetime.date(2025, 7, 4))
+
+        assert len(files) == 2
+        assert table["fecha"].to_pylist() == [datetime.date(2025, 7, 3), datetime.date(2025, 7, 4)]
+
+    def test_cross_section_prefers_latest_partition(self, curated, tmp_path):
+        """Test que un valor republicado en una partición posterior gana"""
+        store = LocalStore(tmp_path)
+        fecha = datetime.date(2025, 7, 20)
+        late = datetime.date(2025, 7, 22)
+        write_day(store, late, rows_for(late) + [dict(rows_for(fecha)[0], valor=999.0)])
+
+        table = curated.get_cross_section(fecha)
+
+        assert table["id_variable"].to_pylist() == [1, 2, 3]
+        assert float(table["valor"][0].as_py()) == 999.0
+
+    def test_results_are_cached_until_partition_changes(self, curated, tmp_path):
+        """Test que el cache devuelve el resultado hasta que se reescribe una partición"""
+        desde, hasta = datetime.date(2025, 6, 1), datetime.date(2025, 6, 5)
+        first = curated.get_series(1, desde, hasta)
+        assert curated.get_series(1, desde, hasta) is first
+        assert curated.cache.hits == 1
+
+        time.sleep(0.01)
+        day = datetime.date(2025, 6, 3)
+        write_day(LocalStore(tmp_path), day, [dict(rows_for(day)[0], valor=1.5)])
+
+        refreshed = curated.get_series(1, desde, hasta)
+        assert refreshed is not first
+        assert float(refreshed["valor"][2].as_py()) == 1.5
+
+    def test_cache_evicts_least_recently_used(self):
+        """Test que el cache respeta el límite de bytes"""
+        import pyarrow as pa
+
+        table = pa.table({"x": pa.array(range(1000), pa.int64())})
+        cache = ResultCache(max_bytes=table.nbytes * 2)
+        cache.put("a", table)
+        cache.put("b", table)
+        cache.get("a")
+        cache.put("c", table)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is table
+        assert cache.bytes <= cache.max_bytes
+
+    def test_missing_range_returns_empty_table(self, curated):
+        """Test que un rango sin particiones devuelve una tabla vacía con el schema curado"""
+        table = curated.get_series(1, datetime.date(2020, 1, 1), datetime.date(2020, 1, 31))
+
+        assert table.num_rows == 0
+        assert table.schema.names == ["id_variable", "codigo_serie", "descripcion", "fecha", "valor"]
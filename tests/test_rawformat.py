@@ -0,0 +1,74 @@
+import datetime
+import gzip
+import json
+
+import pytest
+
+from src.functions.shared_code import compactor, rawformat
+from src.functions.shared_code.storage import LocalStore
+
+
+RAW = "raw/monetarias/year=2025/month=07/day=29"
+PAYLOAD = {
+    "status": 200,
+    "results": [
+        {"idVariable": i, "cdSerie": str(7900 + i), "descripcion": f"Variable {i}",
+         "fecha": "2025-07-29", "valor": 1000.0 + i}
+        for i in range(1, 2501)
+    ],
+}
+
+
+class TestRawFormat:
+    """Test suite para los formatos de snapshot crudo comprimidos"""
+
+    @pytest.mark.parametrize("fmt", ["json", "ndjson.gz", "ndjson.zst"])
+    def test_roundtrip(self, tmp_path, fmt):
+        """Test que cada formato se escribe y se vuelve a leer con los mismos registros"""
+        store = LocalStore(tmp_path)
+        path = rawformat.write_snapshot(store, f"{RAW}/vars_2025-07-29T10:05:00", PAYLOAD, fmt)
+
+        assert path.endswith(rawformat.FORMATS[fmt]["ext"])
+        assert rawformat.format_for(path) == fmt
+        assert list(rawformat.read_records(store, path)) == PAYLOAD["results"]
+
+    def test_compressed_is_smaller(self):
+        """Test que NDJSON comprimido ocupa menos que el JSON original"""
+        plain = len(rawformat.encode(PAYLOAD, "json"))
+        assert len(rawformat.encode(PAYLOAD, "ndjson.gz")) < plain / 4
+        assert len(rawformat.encode(PAYLOAD, "ndjson.zst")) < plain / 4
+
+    def test_streaming_read_in_small_chunks(self):
+        """Test que el lector arma líneas completas aunque los chunks las corten"""
+        body = rawformat.encode(PAYLOAD, "ndjson.gz")
+        chunks = (body[i:i + 97] for i in range(0, len(body), 97))
+
+        records = list(rawformat.iter_records(chunks, "ndjson.gz"))
+
+        assert len(records) == 2500
+        assert records[-1]["idVariable"] == 2500
+
+    def test_already_decoded_transport(self):
+        """Test que si el transporte ya descomprimió (Content-Encoding) se leen las líneas en claro"""
+        plain = gzip.decompress(rawformat.encode(PAYLOAD, "ndjson.gz"))
+
+        records = list(rawformat.iter_records([plain], "ndjson.gz"))
+
+        assert records == PAYLOAD["results"]
+
+    def test_unknown_format_rejected(self):
+        """Test que un formato desconocido falla en vez de escribir basura"""
+        with pytest.raises(ValueError):
+            rawformat.encode(PAYLOAD, "xml")
+
+    def test_compactor_reads_mixed_formats(self, tmp_path):
+        """Test que el compactador lee snapshots .json y .ndjson.zst de la misma partición"""
+        store = LocalStore(tmp_path)
+        store.write_bytes(f"{RAW}/vars_2025-07-29T10:05:00.json", json.dumps(PAYLOAD))
+        newer = {"results": [dict(PAYLOAD["results"][0], valor=1.5)]}
+        rawformat.write_snapshot(store, f"{RAW}/vars_2025-07-29T11:05:00", newer, "ndjson.zst")
+
+        table = compactor.read_day(store, datetime.date(2025, 7, 29))
+
+        assert table.num_rows == 2500
+        assert float(table["valor"][0].as_py()) == 1.5
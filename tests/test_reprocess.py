@@ -0,0 +1,157 @@
+import datetime
+import io
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.functions.shared_code import compactor, indicators, reprocess
+from src.functions.shared_code.storage import LocalStore
+
+DAYS = [datetime.date(2025, 7, 27), datetime.date(2025, 7, 28), datetime.date(2025, 7, 29)]
+
+
+def raw_path(day, name="vars_x.json"):
+    return f"{compactor.partition_path(compactor.RAW_PREFIX, day)}/{name}"
+
+
+def seed(store, valor=1.0):
+    for n, day in enumerate(DAYS):
+        store.write_bytes(raw_path(day), json.dumps([
+            {"idVariable": 1, "cdSerie": "7935", "descripcion": "Reservas", "fecha": day.isoformat(),
+             "valor": valor + n},
+            {"idVariable": 2, "cdSerie": "7936", "descripcion": "Base", "fecha": day.isoformat(), "valor": 10.0},
+        ]))
+
+
+class TestReprocess:
+    """Test suite para el reprocesamiento reanudable por partición"""
+
+    def test_transform_in_parallel_writes_checkpoints(self, tmp_path):
+        """Test que transform compacta cada día en el pool y deja un checkpoint por partición"""
+        store = LocalStore(tmp_path)
+        seed(store)
+
+        summary = reprocess.reprocess("transform", DAYS[0], DAYS[-1], local_dir=str(tmp_path), processes=2)
+
+        assert (summary["done"], summary["skipped"], summary["failed"]) == (3, 0, 0)
+        assert [o["result"] for o in summary["outcomes"]] == [2, 2, 2]
+        for day in DAYS:
+            assert store.read_bytes(f"{compactor.partition_path(compactor.CURATED_PREFIX, day)}/part-0.parquet")
+            assert json.loads(store.read_bytes(reprocess.checkpoint_path("transform", day)))["inputs"] == 1
+
+    def test_rerun_only_touches_changed_partitions(self, tmp_path):
+        """Test que una segunda corrida saltea las particiones cuyo hash de entrada no cambió"""
+        store = LocalStore(tmp_path)
+        seed(store)
+        reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+        store.write_bytes(raw_path(DAYS[1], "vars_y.json"), json.dumps([
+            {"idVariable": 1, "fecha": "2025-07-28", "valor": 5.0}]))
+
+        with patch.object(compactor, "compact_day", wraps=compactor.compact_day) as spy:
+            summary = reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+
+        assert [o["status"] for o in summary["outcomes"]] == ["skipped", "done", "skipped"]
+        assert [c.args[1] for c in spy.call_args_list] == [DAYS[1]]
+
+        forced = reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1, force=True)
+        assert forced["done"] == 3
+
+    def test_interrupted_run_resumes(self, tmp_path):
+        """Test que tras un fallo se reanuda desde la partición que no terminó"""
+        store = LocalStore(tmp_path)
+        seed(store)
+        compact_day = compactor.compact_day
+
+        def flaky(store, day):
+            if day == DAYS[2]:
+                raise OSError("connection reset")
+            return compact_day(store, day)
+
+        with patch.object(compactor, "compact_day", side_effect=flaky):
+            first = reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+        second = reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+
+        assert [o["status"] for o in first["outcomes"]] == ["done", "done", "failed"]
+        assert [o["status"] for o in second["outcomes"]] == ["skipped", "skipped", "done"]
+        assert reprocess.main(["--stage", "transform", "--desde", "2025-07-27", "--hasta", "2025-07-29",
+                               "--local-dir", str(tmp_path), "--processes", "1"]) == 0
+
+    def test_validate_writes_report_without_touching_raw(self, tmp_path):
+        """Test que validate reporta los registros inválidos del histórico sin modificar raw"""
+        store = LocalStore(tmp_path)
+        seed(store)
+        store.write_bytes(raw_path(DAYS[0], "vars_y.json"), json.dumps([
+            {"idVariable": "x", "fecha": "2025-07-27", "valor": 1.0},
+            {"idVariable": 3, "fecha": "2025-13-01", "valor": 1.0}]))
+        before = store.read_bytes(raw_path(DAYS[0], "vars_y.json"))
+
+        summary = reprocess.reprocess("validate", DAYS[0], DAYS[0], store=store)
+
+        report = json.loads(store.read_bytes(
+            f"{compactor.partition_path(reprocess.QUALITY_PREFIX, DAYS[0])}/report.json"))
+        assert summary["outcomes"][0]["result"] == 2
+        assert (report["snapshots"], report["records"], report["valid"]) == (2, 4, 2)
+        assert report["checks"]["bad_types"] == 1 and report["checks"]["bad_fecha"] == 1
+        assert store.read_bytes(raw_path(DAYS[0], "vars_y.json")) == before
+
+    def test_derive_recomputes_pending_range_once(self, tmp_path):
+        """Test que derive recalcula los días pendientes juntos y saltea los ya aplicados"""
+        store = LocalStore(tmp_path)
+        seed(store)
+        reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+
+        with patch.object(indicators, "derive_range", wraps=indicators.derive_range) as spy:
+            summary = reprocess.reprocess("derive", DAYS[0], DAYS[-1], store=store, processes=4)
+            again = reprocess.reprocess("derive", DAYS[0], DAYS[-1], store=store, processes=4)
+
+        assert [c.args[1:] for c in spy.call_args_list] == [(DAYS[0], DAYS[-1])]
+        assert summary["done"] == 3 and again["skipped"] == 3
+        assert store.read_bytes(indicators.PANEL_PATH)
+
+    def test_derive_rewrites_revisions_outside_the_live_window(self, tmp_path):
+        """Test que derive reescribe una revisión vieja aunque el panel ya haya avanzado"""
+        store = LocalStore(tmp_path)
+        seed(store)
+        reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+        reprocess.reprocess("derive", DAYS[0], DAYS[-1], store=store, processes=1)
+        # la ingesta diaria lleva el panel más allá de window_days: esos días ya no están en él
+        later = DAYS[-1] + datetime.timedelta(days=indicators.IndicatorEngine().window_days + 30)
+        indicators.update(store, pa.table({"id_variable": pa.array([1], pa.int32()),
+                                           "fecha": pa.array([later], pa.date32()),
+                                           "valor": pa.array([99.0])}))
+        live = indicators.load_panel(store)
+
+        seed(store, valor=5.0)
+        reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+        summary = reprocess.reprocess("derive", DAYS[0], DAYS[-1], store=store, processes=1)
+
+        assert summary["done"] == 3
+        path = f"{compactor.partition_path(indicators.INDICATORS_PREFIX, DAYS[0])}/part-0.parquet"
+        table = pq.read_table(io.BytesIO(store.read_bytes(path)))
+        assert dict(zip(table["id_variable"].to_pylist(), table["valor"].to_pylist()))[1] == 5.0
+        panel = indicators.load_panel(store)
+        assert panel.start == live.start and np.array_equal(panel.values, live.values, equal_nan=True)
+
+    def test_failed_derive_leaves_no_checkpoints(self, tmp_path):
+        """Test que si el cálculo falla no se marca ninguna partición como aplicada"""
+        store = LocalStore(tmp_path)
+        seed(store)
+        reprocess.reprocess("transform", DAYS[0], DAYS[-1], store=store, processes=1)
+
+        with patch.object(indicators, "derive_range", side_effect=RuntimeError("boom")):
+            summary = reprocess.reprocess("derive", DAYS[0], DAYS[-1], store=store, processes=1)
+
+        assert summary["failed"] == 3
+        assert store.list(f"{reprocess.CHECKPOINT_PREFIX}/derive") == []
+
+    def test_empty_partitions(self, tmp_path):
+        """Test que los días sin datos se reportan como vacíos y no dejan checkpoint"""
+        store = LocalStore(tmp_path)
+
+        summary = reprocess.reprocess("transform", DAYS[0], DAYS[1], store=store, processes=1)
+
+        assert summary["empty"] == 2
+        assert store.list(reprocess.CHECKPOINT_PREFIX) == []
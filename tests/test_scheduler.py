@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.functions.shared_code import registry, scheduler
+from src.functions.shared_code.storage import AsyncStoreAdapter, LocalStore
+
+NOW = datetime.datetime(2025, 7, 29, 15, 5, 0, 500_000)
+
+
+def endpoints(server):
+    return [
+        registry.Endpoint("monetarias", server.base_url, "0 5 * * * *", "raw/monetarias", "results", "int"),
+        registry.Endpoint("cambiarias", server.cotizaciones_url, "0 */5 * * * *", "raw/cambiarias",
+                          "cotizaciones", "str"),
+    ]
+
+
+class TestRegistry:
+    """Test suite para el registro declarativo de endpoints"""
+
+    def test_schedule_fired_between(self):
+        """Test que una expresión NCRONTAB detecta disparos en el intervalo (start, end]"""
+        hourly = registry.Schedule("0 5 * * * *")
+
+        assert hourly.fired_between(datetime.datetime(2025, 7, 29, 14, 5, 1), NOW)
+        assert not hourly.fired_between(datetime.datetime(2025, 7, 29, 15, 5, 1), NOW)
+        assert not registry.Schedule("0 0 9-17 * * 1-5").fired_between(
+            datetime.datetime(2025, 7, 26, 8), datetime.datetime(2025, 7, 27, 23))   # sábado y domingo
+
+    def test_invalid_schedule_is_rejected(self):
+        """Test que un schedule mal formado falla al cargar el registro"""
+        spec = json.dumps([{"dataset": "x", "url": "https://h/x", "schedule": "0 61 * * * *"}])
+
+        with pytest.raises(ValueError):
+            registry.load_registry({"INGEST_ENDPOINTS": spec})
+
+    def test_load_registry_from_env(self):
+        """Test que INGEST_ENDPOINTS reemplaza los defaults y BCRA_API_URL pisa monetarias"""
+        spec = json.dumps([{"dataset": "monetarias", "url": "https://h/m"},
+                           {"dataset": "series", "url": "https://h/s", "schedule": "0 0 * * * *"}])
+
+        loaded = registry.load_registry({"INGEST_ENDPOINTS": spec, "BCRA_API_URL": "http://local/m"})
+
+        assert [(e.dataset, e.url, e.prefix) for e in loaded] == [
+            ("monetarias", "http://local/m", "raw/monetarias"), ("series", "https://h/s", "raw/series")]
+        assert registry.datasets(loaded) == {"monetarias", "series"}
+
+    def test_parse_cotizaciones(self):
+        """Test que las cotizaciones se normalizan a registros idVariable/fecha/valor"""
+        payload = {"status": 200, "results": {"fecha": "2025-07-29", "detalle": [
+            {"codigoMoneda": "USD", "descripcion": "Dólar", "tipoPase": 1.0, "tipoCotizacion": 1300.5}]}}
+
+        data, records = registry.records(registry.DEFAULT_ENDPOINTS[1], payload)
+
+        assert records == [{"idVariable": "USD", "descripcion": "Dólar", "fecha": "2025-07-29",
+                            "valor": 1300.5, "tipoPase": 1.0}]
+        assert data["fecha"] == "2025-07-29"
+
+
+class TestScheduler:
+    """Test suite para el scheduler que reparte los endpoints vencidos"""
+
+    def run(self, store, server, now=NOW, **kwargs):
+        import aiohttp
+
+        async def go():
+            async with aiohttp.ClientSession() as session:
+                return await scheduler.run_due(AsyncStoreAdapter(store), endpoints(server), now=now,
+                                               session=session, **kwargs)
+
+        return asyncio.run(go())
+
+    def test_due_endpoints_write_their_own_partitions(self, fake_bcra, tmp_path):
+        """Test que cada dataset vencido se escribe en su prefijo particionado"""
+        store = LocalStore(tmp_path)
+
+        results = self.run(store, fake_bcra)
+
+        assert set(results) == {"monetarias", "cambiarias"}
+        assert results["cambiarias"].startswith("raw/cambiarias/year=2025/month=07/day=29/vars_")
+        snapshot = json.loads(store.read_bytes(results["cambiarias"]))
+        assert [r["idVariable"] for r in snapshot["results"]] == ["USD", "EUR", "BRL"]
+        assert store.list("quarantine/") == []
+        assert json.loads(store.read_bytes(scheduler.LAST_RUN_PATH)) == {
+            "monetarias": NOW.isoformat(), "cambiarias": NOW.isoformat()}
+
+    def test_only_due_endpoints_run(self, fake_bcra, tmp_path):
+        """Test que en el siguiente tick solo corre el endpoint cuyo schedule disparó"""
+        store = LocalStore(tmp_path)
+        self.run(store, fake_bcra)
+        fake_bcra.advance()
+        before = len(fake_bcra.requests)
+
+        results = self.run(store, fake_bcra, now=NOW + datetime.timedelta(minutes=5))
+
+        assert list(results) == ["cambiarias"]
+        assert len(fake_bcra.requests) == before + 1
+
+    def test_failed_endpoint_is_retried_next_tick(self, fake_bcra, tmp_path):
+        """Test que un endpoint que falla no avanza su última corrida"""
+        store = LocalStore(tmp_path)
+
+        with patch.object(scheduler, "ingest_endpoint", wraps=scheduler.ingest_endpoint) as spy, \
+             patch.object(registry, "PARSERS", dict(registry.PARSERS, cotizaciones=lambda p: 1 / 0)):
+            with pytest.raises(ZeroDivisionError):
+                self.run(store, fake_bcra)
+        assert spy.call_count == 2
+
+        last_runs = json.loads(store.read_bytes(scheduler.LAST_RUN_PATH))
+        assert last_runs == {"monetarias": NOW.isoformat()}
+        assert [e.dataset for e in scheduler.due(endpoints(fake_bcra), last_runs,NOW + datetime.timedelta(minutes=5))] \
+            == ["cambiarias"]
+
+    def test_host_rate_limit_spaces_requests(self):
+        """Test que el token bucket por host limita la tasa de requests"""
+        clock = [0.0]
+
+        async def go():
+            bucket = scheduler.AsyncTokenBucket(rate=10, capacity=1, clock=lambda: clock[0])
+            waits = []
+
+            async def fake_sleep(seconds):
+                waits.append(seconds)
+                clock[0] += seconds
+
+            with patch("src.functions.shared_code.scheduler.asyncio.sleep", new=fake_sleep):
+                for _ in range(3):
+                    await bucket.acquire()
+            return waits
+
+        assert asyncio.run(go()) == pytest.approx([0.1, 0.1])
+
+    def test_host_rate_below_one_per_second(self):
+        """Test que un INGEST_HOST_RATE menor a 1 espacia los requests en lugar de colgarse"""
+        clock = [0.0]
+
+        async def go():
+            bucket = scheduler.AsyncTokenBucket(rate=0.5, clock=lambda: clock[0])
+
+            waits = []
+
+            async def fake_sleep(seconds):
+                waits.append(seconds)
+                clock[0] += seconds
+                assert len(waits) < 10, "acquire() never gets a token"
+
+            with patch("src.functions.shared_code.scheduler.asyncio.sleep", new=fake_sleep):
+                for _ in range(3):
+                    await bucket.acquire()
+            return waits
+
+        assert asyncio.run(go()) == pytest.approx([2.0, 2.0])
@@ -0,0 +1,132 @@
+import datetime
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from src.functions.shared_code import ingest, timeseries
+from src.functions.shared_code.storage import LocalStore, MemoryStore
+
+T0 = datetime.datetime(2025, 7, 29, 15, 5)
+T1 = T0 + datetime.timedelta(hours=1)
+T2 = T0 + datetime.timedelta(hours=2)
+
+
+def record(id_variable, fecha, valor):
+    return {"idVariable": id_variable, "cdSerie": str(id_variable), "descripcion": "x", "fecha": fecha, "valor": valor}
+
+
+@pytest.fixture
+def series(tmp_path):
+    return timeseries.SeriesStore(str(tmp_path / "series"), compact_tail=2)
+
+
+class TestSeriesStore:
+    """Test suite para las series por variable con lookups point-in-time"""
+
+    def test_point_in_time_lookups(self, series):
+        """Test que value devuelve el valor conocido a cada asof, incluyendo revisiones"""
+        series.append_records("monetarias", [record(1, "2025-07-28", 10.0)], T0)
+        series.append_records("monetarias", [record(1, "2025-07-28", 11.0), record(1, "2025-07-29", 12.0)], T1)
+
+        assert series.value("monetarias", 1, "2025-07-28") == 11.0
+        assert series.value("monetarias", 1, "2025-07-28", asof=T0) == 10.0
+        assert series.value("monetarias", 1, "2025-07-29", asof=T0) is None
+        assert series.value("monetarias", 1, "2025-07-27") is None
+        assert series.value("monetarias", 2, "2025-07-28") is None
+
+    def test_compaction_sorts_and_drops_redundant_versions(self, series):
+        """Test que compact ordena por (fecha, asof) y descarta re-observaciones sin cambios"""
+        series.append_records("monetarias", [record(1, "2025-07-29", 12.0)], T0)
+        series.append_records("monetarias", [record(1, "2025-07-28", 10.0)], T0)
+        series.append_records("monetarias", [record(1, "2025-07-29", 12.0)], T1)
+        series.append_records("monetarias", [record(1, "2025-07-29", 13.0)], T2)
+        before = series.reader("monetarias", 1)
+        kept = before.range("2025-07-01", "2025-07-31", asof=T1)
+
+        assert series.compact_all("monetarias") == {"1": 3}
+
+        reader = series.reader("monetarias", 1)
+        assert (len(reader.sorted), len(reader.tail)) == (3, 0)
+        assert list(reader.sorted["fecha"]) == [timeseries.to_fecha("2025-07-28")] + [timeseries.to_fecha("2025-07-29")] * 2
+        assert list(reader.range("2025-07-01", "2025-07-31", asof=T1)["valor"]) == list(kept["valor"]) == [10.0, 12.0]
+        assert series.value("monetarias", 1, "2025-07-29") == 13.0
+
+    def test_lookups_merge_sorted_part_and_tail(self, series):
+        """Test que los puntos agregados después de compactar se ven sin volver a compactar"""
+        series.append_records("monetarias", [record(1, "2025-07-28", 10.0)], T0)
+        series.compact_all("monetarias", force=True)
+        series.append_records("monetarias", [record(1, "2025-07-28", 9.0)], T1)
+
+        reader = series.reader("monetarias", 1)
+
+        assert (len(reader.sorted), len(reader.tail)) == (1, 1)
+        assert series.value("monetarias", 1, "2025-07-28") == 9.0
+        assert series.value("monetarias", 1, "2025-07-28", asof=T0) == 10.0
+
+    def test_sorted_points_are_zero_copy(self, series):
+        """Test que los rangos de la parte ordenada son vistas del archivo mapeado"""
+        rows = [record(1, (datetime.date(2025, 1, 1) + datetime.timedelta(days=d)).isoformat(), float(d))
+                for d in range(200)]
+        series.append_records("monetarias", rows, T0)
+        series.compact_all("monetarias", force=True)
+
+        base, tail = series.reader("monetarias", 1).points("2025-02-01", "2025-02-10")
+
+        assert len(base) == 10 and len(tail) == 0
+        assert not base.flags.owndata and not base["valor"].flags.writeable
+        assert np.array_equal(base["valor"], np.arange(31, 41, dtype=float))
+
+    def test_appends_during_compaction_are_not_lost(self, series):
+        """Test que compactar mientras ingest agrega filas no pierde ninguna"""
+        series.append_records("monetarias", [record(1, "2025-07-28", 0.0)], T0)
+        done = threading.Event()
+
+        def compact_loop():
+            while not done.is_set():
+                series.compact("monetarias", 1)
+
+        compactor = threading.Thread(target=compact_loop)
+        compactor.start()
+        try:
+            for n in range(1, 300):
+                series.append_records("monetarias", [record(1, "2025-07-28", float(n))],
+                                      T0 + datetime.timedelta(seconds=n))
+        finally:
+            done.set()
+            compactor.join()
+
+        assert series.compact("monetarias", 1) == 300
+        assert series.value("monetarias", 1, "2025-07-28") == 299.0
+
+
+class TestIngestSeries:
+    """Test suite para el append de puntos desde ingest"""
+
+    def test_ingest_appends_only_changed_points(self, tmp_path, monkeypatch):
+        """Test que ingest agrega a las series solo las variables que cambiaron"""
+        monkeypatch.setenv("SERIES_DIR", str(tmp_path / "series"))
+        store = MemoryStore()
+        ingest.ingest_snapshot(store, "monetarias", {"results": [record(1, "2025-07-29", 1.0), record(2, "2025-07-29", 2.0)]}, T0)
+        ingest.ingest_snapshot(store, "monetarias", {"results": [record(1, "2025-07-29", 1.5), record(2, "2025-07-29", 2.0)]}, T1)
+
+        series = timeseries.get_series_store()
+
+        assert len(series.reader("monetarias", 1)) == 2
+        assert len(series.reader("monetarias", 2)) == 1
+        assert series.value("monetarias", 1, "2025-07-29", asof=T0) == 1.0
+
+    def test_load_raw_rebuilds_from_snapshots(self, tmp_path):
+        """Test que load_raw reconstruye las series desde los snapshots crudos"""
+        store = LocalStore(tmp_path / "lake")
+        for moment, valor in ((T0, 1.0), (T1, 1.0), (T2, 2.0)):
+            store.write_bytes(f"raw/monetarias/year=2025/month=07/day=29/vars_{moment.isoformat()}.json",
+                              json.dumps({"results": [record(1, "2025-07-29", valor)]}))
+        series = timeseries.SeriesStore(str(tmp_path / "series"))
+
+        appended = timeseries.load_raw(store, series, datetime.date(2025, 7, 29), datetime.date(2025, 7, 29))
+
+        assert appended == 2
+        assert series.value("monetarias", 1, "2025-07-29", asof=T1) == 1.0
+        assert series.value("monetarias", 1, "2025-07-29") == 2.0